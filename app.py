@@ -4,13 +4,27 @@ Sistema de gerenciamento de pedidos para loja de Açaí
 Otimizado para TV com tema escuro e fontes grandes
 """
 
+import hashlib
+import queue
 import streamlit as st
-import random
-from datetime import datetime
-from time import sleep
+from datetime import date, datetime, time as day_time
+from html import escape
+from pathlib import Path
+from time import perf_counter
+from typing import Optional
 
 # Importa funções do banco de dados
 import database as db
+import metrics
+import simulator
+from board_render import (
+    SOURCE_EMOJIS, SOURCE_LABELS, STATUS_LABELS,
+    board_elapsed_minutes, format_elapsed_time, render_board_html, render_card
+)
+from item_parser import format_size
+from maintenance import Compactor
+from order_store import OrderStore
+from whatsapp_pipeline import WhatsAppPipeline
 
 # ============================================================================
 # CONFIGURAÇÃO DA PÁGINA
@@ -27,466 +41,239 @@ st.set_page_config(
 # ESTILOS CSS - TEMA DARK OTIMIZADO PARA TV
 # ============================================================================
 
-st.markdown("""
-<style>
-    /* ===== RESET E BASE ===== */
-    .stApp {
-        background: linear-gradient(135deg, #0E1117 0%, #1a1a2e 50%, #16213e 100%);
-    }
-    
-    /* Ocultar elementos padrão do Streamlit */
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    header {visibility: hidden;}
-    
-    /* ===== TIPOGRAFIA ===== */
-    html, body, [class*="css"] {
-        font-family: 'Segoe UI', 'Roboto', sans-serif;
-    }
-    
-    /* ===== HEADER PRINCIPAL ===== */
-    .main-header {
-        background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);
-        padding: 20px 40px;
-        border-radius: 16px;
-        margin-bottom: 30px;
-        box-shadow: 0 10px 40px rgba(102, 126, 234, 0.3);
-        display: flex;
-        justify-content: space-between;
-        align-items: center;
-    }
-    
-    .main-header h1 {
-        color: white;
-        font-size: 2.5rem;
-        font-weight: 800;
-        margin: 0;
-        text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
-        letter-spacing: 2px;
-    }
-    
-    .main-header .subtitle {
-        color: rgba(255,255,255,0.9);
-        font-size: 1.1rem;
-        margin: 0;
-    }
-    
-    .clock {
-        color: white;
-        font-size: 2rem;
-        font-weight: 600;
-        text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
-    }
-    
-    /* ===== CARDS DE MÉTRICAS ===== */
-    .metric-card {
-        background: linear-gradient(145deg, #1e2530 0%, #252d3a 100%);
-        border-radius: 16px;
-        padding: 25px;
-        text-align: center;
-        border: 1px solid rgba(255,255,255,0.1);
-        box-shadow: 0 8px 32px rgba(0,0,0,0.3);
-        transition: transform 0.3s ease, box-shadow 0.3s ease;
-    }
-    
-    .metric-card:hover {
-        transform: translateY(-5px);
-        box-shadow: 0 12px 40px rgba(0,0,0,0.4);
-    }
-    
-    .metric-card.novo {
-        border-left: 4px solid #FF4B4B;
-    }
-    
-    .metric-card.preparando {
-        border-left: 4px solid #FFA500;
-    }
-    
-    .metric-card.pronto {
-        border-left: 4px solid #00D26A;
-    }
-    
-    .metric-number {
-        font-size: 3.5rem;
-        font-weight: 800;
-        margin: 10px 0;
-    }
-    
-    .metric-number.novo { color: #FF4B4B; }
-    .metric-number.preparando { color: #FFA500; }
-    .metric-number.pronto { color: #00D26A; }
-    
-    .metric-label {
-        color: #8892a0;
-        font-size: 1.1rem;
-        text-transform: uppercase;
-        letter-spacing: 2px;
-    }
-    
-    /* ===== CARDS DE PEDIDOS ===== */
-    .order-card {
-        background: linear-gradient(145deg, #1e2530 0%, #252d3a 100%);
-        border-radius: 16px;
-        padding: 20px 25px;
-        margin-bottom: 15px;
-        border: 1px solid rgba(255,255,255,0.1);
-        box-shadow: 0 4px 20px rgba(0,0,0,0.2);
-        transition: all 0.3s ease;
-    }
-    
-    .order-card:hover {
-        transform: translateX(5px);
-        box-shadow: 0 6px 25px rgba(0,0,0,0.3);
-    }
-    
-    .order-card.status-novo {
-        border-left: 5px solid #FF4B4B;
-        background: linear-gradient(145deg, #2a1f1f 0%, #1e2530 100%);
-    }
-    
-    .order-card.status-preparando {
-        border-left: 5px solid #FFA500;
-        background: linear-gradient(145deg, #2a2a1f 0%, #1e2530 100%);
-    }
-    
-    .order-card.status-pronto {
-        border-left: 5px solid #00D26A;
-        background: linear-gradient(145deg, #1f2a1f 0%, #1e2530 100%);
-    }
-    
-    .order-header {
-        display: flex;
-        justify-content: space-between;
-        align-items: center;
-        margin-bottom: 15px;
-        padding-bottom: 15px;
-        border-bottom: 1px solid rgba(255,255,255,0.1);
-    }
-    
-    .order-id {
-        font-size: 1.8rem;
-        font-weight: 800;
-        color: white;
-    }
-    
-    .order-source {
-        padding: 8px 16px;
-        border-radius: 20px;
-        font-weight: 600;
-        font-size: 0.9rem;
-        text-transform: uppercase;
-    }
-    
-    .source-ifood {
-        background: linear-gradient(135deg, #EA1D2C 0%, #B71C1C 100%);
-        color: white;
-    }
-    
-    .source-99food {
-        background: linear-gradient(135deg, #FFCA28 0%, #F57C00 100%);
-        color: #1a1a1a;
-    }
-    
-    .source-whatsapp {
-        background: linear-gradient(135deg, #25D366 0%, #128C7E 100%);
-        color: white;
-    }
-    
-    .order-client {
-        color: #a0aec0;
-        font-size: 1.2rem;
-        margin-bottom: 10px;
-    }
-    
-    .order-description {
-        color: white;
-        font-size: 1.4rem;
-        font-weight: 500;
-        line-height: 1.5;
-        margin-bottom: 15px;
-    }
-    
-    .order-footer {
-        display: flex;
-        justify-content: space-between;
-        align-items: center;
-    }
-    
-    .order-time {
-        display: flex;
-        align-items: center;
-        gap: 8px;
-    }
-    
-    .time-icon {
-        font-size: 1.3rem;
-    }
-    
-    .time-value {
-        font-size: 1.3rem;
-        font-weight: 600;
-    }
-    
-    .time-value.urgent {
-        color: #FF4B4B;
-        animation: pulse 1s infinite;
-    }
-    
-    .time-value.warning {
-        color: #FFA500;
-    }
-    
-    .time-value.normal {
-        color: #00D26A;
-    }
-    
-    @keyframes pulse {
-        0%, 100% { opacity: 1; }
-        50% { opacity: 0.5; }
-    }
-    
-    .status-badge {
-        padding: 10px 20px;
-        border-radius: 25px;
-        font-weight: 700;
-        font-size: 1rem;
-        text-transform: uppercase;
-        letter-spacing: 1px;
-    }
-    
-    .badge-novo {
-        background: rgba(255, 75, 75, 0.2);
-        color: #FF4B4B;
-        border: 2px solid #FF4B4B;
-    }
-    
-    .badge-preparando {
-        background: rgba(255, 165, 0, 0.2);
-        color: #FFA500;
-        border: 2px solid #FFA500;
-    }
-    
-    .badge-pronto {
-        background: rgba(0, 210, 106, 0.2);
-        color: #00D26A;
-        border: 2px solid #00D26A;
-    }
-    
-    /* ===== BOTÕES DE AÇÃO ===== */
-    .stButton > button {
-        border-radius: 12px;
-        padding: 12px 24px;
-        font-weight: 600;
-        font-size: 1rem;
-        transition: all 0.3s ease;
-        border: none;
-        width: 100%;
-    }
-    
-    .stButton > button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 6px 20px rgba(0,0,0,0.3);
-    }
-    
-    /* ===== SIDEBAR DEBUG ===== */
-    [data-testid="stSidebar"] {
-        background: linear-gradient(180deg, #1a1a2e 0%, #16213e 100%);
-    }
-    
-    [data-testid="stSidebar"] .stButton > button {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        margin-bottom: 10px;
-    }
-    
-    /* ===== SEÇÃO VAZIA ===== */
-    .empty-state {
-        text-align: center;
-        padding: 80px 40px;
-        background: linear-gradient(145deg, #1e2530 0%, #252d3a 100%);
-        border-radius: 20px;
-        border: 2px dashed rgba(255,255,255,0.2);
-    }
-    
-    .empty-state .icon {
-        font-size: 5rem;
-        margin-bottom: 20px;
-    }
-    
-    .empty-state h2 {
-        color: #a0aec0;
-        font-size: 1.8rem;
-        margin-bottom: 10px;
-    }
-    
-    .empty-state p {
-        color: #6c7a89;
-        font-size: 1.2rem;
-    }
-    
-    /* ===== DIVIDER ===== */
-    .section-divider {
-        height: 2px;
-        background: linear-gradient(90deg, transparent, rgba(255,255,255,0.1), transparent);
-        margin: 30px 0;
-    }
-</style>
-""", unsafe_allow_html=True)
+# Tema servido como arquivo estático (`static/theme.css`, habilitado em
+# `.streamlit/config.toml`): cada rerun envia só a tag <link> e o navegador
+# reaproveita o CSS do cache. Sem static serving, o CSS é embutido como antes.
+THEME_CSS_PATH = Path(__file__).parent / "static" / "theme.css"
+THEME_CSS_URL = "app/static/theme.css"
+
+
+@st.cache_resource
+def theme_tag() -> str:
+    """Tag que carrega o tema, montada uma vez por processo."""
+    css = THEME_CSS_PATH.read_text(encoding="utf-8")
+    if st.get_option("server.enableStaticServing"):
+        # Versão no query string: o cache do navegador vale até o CSS mudar
+        version = hashlib.sha1(css.encode("utf-8")).hexdigest()[:10]
+        return f'<link rel="stylesheet" href="{THEME_CSS_URL}?v={version}">'
+    return f"<style>{css}</style>"
+
+
+st.markdown(theme_tag(), unsafe_allow_html=True)
 
 # ============================================================================
 # FUNÇÕES AUXILIARES
 # ============================================================================
 
-def format_elapsed_time(created_at: str) -> tuple[str, str]:
-    """
-    Calcula e formata o tempo decorrido desde a criação do pedido.
+@st.cache_resource
+def get_order_store() -> OrderStore:
+    """Store de pedidos compartilhado por todas as sessões (TVs) do processo."""
+    return OrderStore()
+
+
+@st.cache_resource
+def start_compactor() -> Compactor:
+    """Compactação em segundo plano (uma thread por processo do Streamlit)."""
+    return Compactor().start()
+
+
+@st.cache_resource
+def get_whatsapp_pipeline() -> WhatsAppPipeline:
+    """Extração das conversas do WhatsApp fora do rerun (threads próprias)."""
+    return WhatsAppPipeline().start()
+
+
+@st.cache_resource
+def setup_metrics() -> bool:
+    """Liga a instrumentação uma vez por processo (SAKA_METRICS=0 desliga)."""
+    if metrics.ENABLED_BY_DEFAULT:
+        metrics.enable()
+    return metrics.is_enabled()
+
+
+def toggle_metrics():
+    """Callback do checkbox de coleta do painel de performance."""
+    if st.session_state.metrics_enabled:
+        metrics.enable()
+    else:
+        metrics.disable()
+
+
+def render_performance_panel():
+    """Tabela da janela deslizante de cada operação e exportação Prometheus."""
+    st.checkbox("Coletar métricas", value=metrics.is_enabled(), key="metrics_enabled",
+                on_change=toggle_metrics)
+    
+    rows = metrics.snapshot()
+    if rows:
+        st.dataframe(
+            [
+                {
+                    "operação": row["operation"],
+                    "chamadas": row["count"],
+                    "p50 ms": round(row["p50_ms"], 2),
+                    "p95 ms": round(row["p95_ms"], 2),
+                    "p99 ms": round(row["p99_ms"], 2),
+                    "linhas": row["rows"],
+                    "erros": row["errors"]
+                }
+                for row in rows
+            ],
+            hide_index=True,
+            use_container_width=True
+        )
+    else:
+        st.caption("Nenhuma medição no último minuto")
+    
+    whatsapp = get_whatsapp_pipeline().snapshot()
+    st.caption(
+        f"IA WhatsApp: fila {whatsapp['queue_depth']} · p95 {whatsapp['latency_p95_ms']:.0f} ms · "
+        f"cache {whatsapp['cache_hits']}/{whatsapp['received']} · falhas {whatsapp['failed']}"
+    )
     
-    Returns:
-        Tupla com (tempo_formatado, classe_css)
-    """
-    try:
-        created = datetime.fromisoformat(created_at)
-        elapsed = datetime.now() - created
-        
-        total_minutes = int(elapsed.total_seconds() / 60)
-        hours = total_minutes // 60
-        minutes = total_minutes % 60
-        
-        if hours > 0:
-            time_str = f"{hours}h {minutes}min"
-        else:
-            time_str = f"{minutes}min"
-        
-        # Define classe CSS baseada no tempo
-        if total_minutes >= 30:
-            css_class = "urgent"
-        elif total_minutes >= 15:
-            css_class = "warning"
-        else:
-            css_class = "normal"
-            
-        return time_str, css_class
-    except:
-        return "0min", "normal"
+    st.download_button("📄 Exportar (Prometheus)", metrics.export_prometheus(),
+                       file_name="saka_metrics.prom", mime="text/plain", use_container_width=True)
 
 
-def get_source_class(source: str) -> str:
-    """Retorna a classe CSS para a fonte do pedido."""
-    return f"source-{source}"
+# ----- Ações: callbacks on_click, com um único rerun por clique -----
 
+def queue_toast(message: str, icon: str):
+    """Guarda um toast para exibir no rerun que segue o callback."""
+    st.session_state.setdefault("pending_toasts", []).append((message, icon))
 
-def get_status_badge_class(status: str) -> str:
-    """Retorna a classe CSS para o badge de status."""
-    return f"badge-{status}"
 
+def flush_toasts():
+    """Exibe os toasts pendentes (chamada no início do script e do fragmento)."""
+    for message, icon in st.session_state.pop("pending_toasts", []):
+        st.toast(message, icon=icon)
 
-def simulate_ifood_order():
-    """Simula um pedido do iFood."""
-    items = [
-        "1x Açaí 500ml Tradicional + Granola + Leite Condensado + Banana",
-        "2x Açaí 300ml + Morango + Leite em Pó",
-        "1x Açaí 700ml Premium + Frutas Variadas + Mel + Paçoca",
-        "1x Açaí 500ml + Nutella + Morango + Granola",
-        "2x Açaí 400ml Fitness + Whey + Banana + Aveia"
-    ]
-    clients = ["Maria Silva", "João Santos", "Ana Oliveira", "Pedro Costa", "Julia Lima"]
-    
-    db.create_order(
-        source=db.FONTE_IFOOD,
-        client_name=random.choice(clients),
-        description=random.choice(items)
-    )
 
+def mark_click():
+    """Marca o instante do clique para medir clique → tela atualizada."""
+    st.session_state.click_started = perf_counter()
 
-def simulate_99food_order():
-    """Simula um pedido do 99Food."""
-    items = [
-        "1x Açaí 600ml + Frutas da Estação + Granola + Mel",
-        "1x Açaí Bowl Grande + Banana + Morango + Kiwi",
-        "2x Açaí 350ml Tradicional + Leite Condensado",
-        "1x Açaí 500ml + Nutella + Amendoim + Leite em Pó",
-        "1x Combo Família (3x Açaí 400ml) + Coberturas Variadas"
-    ]
-    clients = ["Carlos Mendes", "Fernanda Souza", "Ricardo Lima", "Patrícia Santos", "Bruno Alves"]
+
+def record_click_latency():
+    """Registra o tempo desde o último clique, depois que o quadro foi montado."""
+    started = st.session_state.pop("click_started", None)
+    if started is not None and metrics.is_enabled():
+        metrics.histogram("app.click_to_render").record(perf_counter() - started)
+
+
+def render_search_results(query: str):
+    """Resultados da busca por cliente/descrição (quadro e arquivo)."""
+    results = db.search_orders(query)
+    if not results:
+        st.caption("Nenhum pedido encontrado")
+        return
     
-    db.create_order(
-        source=db.FONTE_99FOOD,
-        client_name=random.choice(clients),
-        description=random.choice(items)
-    )
+    for order in results:
+        status = "🗃️ arquivado" if order["archived"] else STATUS_LABELS.get(order["status"], order["status"])
+        elapsed, _ = format_elapsed_time(order["created_at"])
+        st.markdown(
+            f"**#{order['id']:03d}** · {SOURCE_EMOJIS.get(order['source'], '⚪')} "
+            f"{escape(order['client_name'])} · {status} · há {elapsed}  \n"
+            f"<small>{escape(order['description'])}</small>",
+            unsafe_allow_html=True
+        )
+
+
+def simulate_order(factory, label: str, icon: str):
+    """Callback dos botões do simulador: cria o pedido antes do rerun."""
+    mark_click()
+    get_order_store().create_order(*factory())
+    queue_toast(f"✅ Pedido {label} simulado!", icon)
 
 
-def simulate_whatsapp_order():
-    """Simula um pedido do WhatsApp (processado pela IA)."""
-    # Simula JSON processado pela IA
-    orders = [
-        {"client": "Thiago Ferreira", "items": "2x Açaí 500ml + 1x Suco Natural Laranja 500ml"},
-        {"client": "Amanda Costa", "items": "1x Açaí 700ml com tudo + 1x Água de Coco"},
-        {"client": "Rafael Martins", "items": "3x Açaí 300ml Kids + Confete + Granola"},
-        {"client": "Camila Rocha", "items": "1x Açaí 1L para viagem + Potes extras de cobertura"},
-        {"client": "Lucas Pereira", "items": "2x Açaí Fitness 500ml + Whey + Banana + Sem açúcar"}
-    ]
+def simulate_whatsapp_message():
+    """
+    Callback do botão WhatsApp: manda uma conversa para o pipeline da IA.
     
-    order = random.choice(orders)
-    db.create_order(
-        source=db.FONTE_WHATSAPP,
-        client_name=order["client"],
-        description=order["items"]
-    )
+    Não espera a extração; o pedido entra no quadro quando o pipeline o
+    grava (o store percebe a escrita no próximo ciclo do fragmento).
+    """
+    mark_click()
+    try:
+        get_whatsapp_pipeline().submit(simulator.whatsapp_chat_message())
+    except queue.Full:
+        queue_toast("Fila da IA do WhatsApp cheia, tente de novo", "⚠️")
+        return
+    queue_toast("💬 Conversa do WhatsApp enviada para a IA", "🟢")
+
+
+def mark_all_ready():
+    """Callback: todos os pedidos em preparo passam para pronto."""
+    mark_click()
+    result = get_order_store().transition_orders(None, db.STATUS_PREPARANDO, db.STATUS_PRONTO)
+    queue_toast(f"✅ {len(result['updated'])} pedidos marcados como prontos", "✅")
+
+
+def archive_finished():
+    """Callback: move os finalizados para o arquivo."""
+    mark_click()
+    archived = get_order_store().clear_old_orders(hours=0)
+    queue_toast(f"🗃️ {archived} pedidos arquivados", "✅")
 
 
 # ============================================================================
 # SIDEBAR - PAINEL DEBUG
 # ============================================================================
 
+start_compactor()
+setup_metrics()
+flush_toasts()
+
 with st.sidebar:
     st.markdown("## 🔧 Painel Debug")
     st.markdown("---")
     st.markdown("### Simular Pedidos")
     
-    if st.button("🔴 Simular Pedido iFood", use_container_width=True):
-        simulate_ifood_order()
-        st.toast("✅ Pedido iFood simulado!", icon="🔴")
-        sleep(0.3)
-        st.rerun()
+    st.button("🔴 Simular Pedido iFood", use_container_width=True,
+              on_click=simulate_order, args=(simulator.random_ifood_order, "iFood", "🔴"))
+    st.button("🟡 Simular Pedido 99Food", use_container_width=True,
+              on_click=simulate_order, args=(simulator.random_99food_order, "99Food", "🟡"))
+    st.button("🟢 Simular WhatsApp (IA)", use_container_width=True, on_click=simulate_whatsapp_message)
     
-    if st.button("🟡 Simular Pedido 99Food", use_container_width=True):
-        simulate_99food_order()
-        st.toast("✅ Pedido 99Food simulado!", icon="🟡")
-        sleep(0.3)
-        st.rerun()
+    st.markdown("---")
+    st.markdown("### Buscar Pedido")
     
-    if st.button("🟢 Simular WhatsApp (IA)", use_container_width=True):
-        simulate_whatsapp_order()
-        st.toast("✅ Pedido WhatsApp simulado!", icon="🟢")
-        sleep(0.3)
-        st.rerun()
+    search_query = st.text_input("Cliente, item ou número", placeholder="Amanda, Nutella, #42...",
+                                 key="search_query")
+    if search_query.strip():
+        render_search_results(search_query)
     
     st.markdown("---")
     st.markdown("### Configurações")
     
     show_finished = st.checkbox("Mostrar finalizados", value=False)
-    auto_refresh = st.checkbox("Auto-refresh (30s)", value=True)
+    auto_refresh = st.checkbox("Auto-refresh (tempo real)", value=True)
+    compact_mode = st.checkbox("Modo TV (grade em HTML único)", value=True, key="compact_mode")
+    show_kpis = st.checkbox("📊 Indicadores da cozinha", value=False)
+    show_prep = st.checkbox("🧾 O que preparar", value=False)
+    show_history = st.checkbox("⏪ Quadro em outro horário", value=False)
     
     st.markdown("---")
     st.markdown("### Manutenção")
     
-    if st.button("🗑️ Limpar Finalizados", use_container_width=True):
-        deleted = db.clear_old_orders(hours=0)
-        st.toast(f"🗑️ {deleted} pedidos removidos", icon="✅")
-        sleep(0.3)
-        st.rerun()
+    st.button("✅ Todos em preparo → Pronto", use_container_width=True, on_click=mark_all_ready)
+    st.button("🗃️ Arquivar Finalizados", use_container_width=True, on_click=archive_finished)
+    
+    st.markdown("---")
+    
+    with st.expander("⏱️ Performance", expanded=False):
+        render_performance_panel()
 
 # ============================================================================
 # HEADER PRINCIPAL COM RELÓGIO AO VIVO (COMPONENT)
 # ============================================================================
 
-current_date = datetime.now().strftime("%d/%m/%Y")
-
 # Usamos um componente HTML dedicado para garantir que o JS execute sem bloqueios
 import streamlit.components.v1 as components
 
-header_html = f"""
+# HTML constante: relógio e data são atualizados pelo próprio script no
+# navegador. Como o conteúdo nunca muda entre reruns, o iframe não é
+# remontado (sem recarregar nem piscar o relógio).
+HEADER_HTML = """
 <div style="
     background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);
     padding: 20px 40px;
@@ -505,162 +292,422 @@ header_html = f"""
     </div>
     <div style="text-align: right;">
         <div id="live-clock" style="font-size: 2.5rem; font-weight: 600; text-shadow: 2px 2px 4px rgba(0,0,0,0.3);">--:--:--</div>
-        <div style="font-size: 1.1rem; color: rgba(255,255,255,0.9);">{current_date}</div>
+        <div id="live-date" style="font-size: 1.1rem; color: rgba(255,255,255,0.9);">--/--/----</div>
     </div>
 </div>
 
 <script>
-    function updateClock() {{
+    const dateEl = document.getElementById('live-date');
+    function updateClock() {
         const now = new Date();
         const hrs = String(now.getHours()).padStart(2, '0');
         const mins = String(now.getMinutes()).padStart(2, '0');
         const secs = String(now.getSeconds()).padStart(2, '0');
         document.getElementById('live-clock').innerText = hrs + ':' + mins + ':' + secs;
-    }}
+        // A data só é reescrita quando muda (virada do dia)
+        const date = now.toLocaleDateString('pt-BR');
+        if (dateEl.innerText !== date) {
+            dateEl.innerText = date;
+        }
+    }
     setInterval(updateClock, 1000);
     updateClock();
 </script>
 """
 
 # Renderiza o header. Altura de 140px é suficiente para evitar rolagem interna no componente
-components.html(header_html, height=150)
+components.html(HEADER_HTML, height=150)
 
 
 # ============================================================================
-# MÉTRICAS - CONTADORES DE STATUS
+# INDICADORES DA COZINHA (SOMENTE TABELAS AGREGADAS)
 # ============================================================================
 
-counts = db.get_orders_count_by_status()
+# Os indicadores mudam devagar: não precisam acompanhar o ciclo do quadro
+KPI_REFRESH_SECONDS = 30
+KPI_WINDOW_HOURS = 24
 
-col1, col2, col3 = st.columns(3)
 
-with col1:
-    st.markdown(f"""
-    <div class="metric-card novo">
-        <div class="metric-label">🔔 Novos Pedidos</div>
-        <div class="metric-number novo">{counts.get(db.STATUS_NOVO, 0)}</div>
-        <div class="metric-label">Aguardando confirmação</div>
-    </div>
-    """, unsafe_allow_html=True)
-
-with col2:
-    st.markdown(f"""
-    <div class="metric-card preparando">
-        <div class="metric-label">👨‍🍳 Em Preparo</div>
-        <div class="metric-number preparando">{counts.get(db.STATUS_PREPARANDO, 0)}</div>
-        <div class="metric-label">Na cozinha</div>
-    </div>
-    """, unsafe_allow_html=True)
-
-with col3:
-    st.markdown(f"""
-    <div class="metric-card pronto">
-        <div class="metric-label">✅ Prontos</div>
-        <div class="metric-number pronto">{counts.get(db.STATUS_PRONTO, 0)}</div>
-        <div class="metric-label">Aguardando entrega</div>
-    </div>
-    """, unsafe_allow_html=True)
+def format_prep_minutes(value: Optional[float]) -> str:
+    """Tempo de preparo para exibição ("—" sem pedidos prontos no período)."""
+    return "—" if value is None else f"{value:.1f} min"
+
+
+@st.fragment(run_every=KPI_REFRESH_SECONDS)
+def render_kpi_dashboard():
+    """Preparo médio/p90, pedidos por hora e cancelamentos das últimas 24 horas."""
+    with metrics.stage("app.render.kpis"):
+        kpis = db.get_kitchen_kpis(KPI_WINDOW_HOURS)
+        total = kpis["total"]
+        
+        st.markdown(f"### 📊 Indicadores da cozinha (últimas {KPI_WINDOW_HOURS}h)")
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Preparo médio (novo → pronto)", format_prep_minutes(total["prep_avg_min"]))
+        col2.metric("Preparo p90", format_prep_minutes(total["prep_p90_min"]))
+        col3.metric("Pedidos por hora", f"{total['orders_per_hour']:.1f}")
+        col4.metric("Taxa de cancelamento", f"{total['cancel_rate']:.1%}")
+        
+        if not kpis["by_source"]:
+            st.caption("Nenhum pedido no período")
+            return
+        
+        st.dataframe(
+            [
+                {
+                    "fonte": f"{SOURCE_EMOJIS.get(source, '⚪')} {SOURCE_LABELS.get(source, source)}",
+                    "pedidos": source_kpis["orders"],
+                    "pedidos/hora": round(source_kpis["orders_per_hour"], 1),
+                    "preparo médio": format_prep_minutes(source_kpis["prep_avg_min"]),
+                    "preparo p90": format_prep_minutes(source_kpis["prep_p90_min"]),
+                    "cancelamento": f"{source_kpis['cancel_rate']:.1%}"
+                }
+                for source, source_kpis in kpis["by_source"].items()
+            ],
+            hide_index=True,
+            use_container_width=True
+        )
+        
+        # Pedidos por hora (horário local), uma série por fonte
+        labels = [SOURCE_LABELS.get(source, source) for source in kpis["by_source"]]
+        by_hour: dict[int, dict] = {}
+        for row in kpis["hourly"]:
+            hour = by_hour.setdefault(row["hour_start"], {
+                "hora": db.from_epoch_ms(row["hour_start"]).strftime("%d/%m %Hh"),
+                **dict.fromkeys(labels, 0)
+            })
+            hour[SOURCE_LABELS.get(row["source"], row["source"])] = row["orders"]
+        st.bar_chart([by_hour[hour] for hour in sorted(by_hour)], x="hora", y=labels)
+
+
+if show_kpis:
+    render_kpi_dashboard()
 
-st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
 
 # ============================================================================
-# LISTA DE PEDIDOS
+# O QUE PREPARAR (ITENS ESTRUTURADOS DOS PEDIDOS PENDENTES)
 # ============================================================================
 
-orders = db.get_all_orders(include_finished=show_finished)
+PREP_REFRESH_SECONDS = 5
 
-if not orders:
-    st.markdown("""
-    <div class="empty-state">
-        <div class="icon">🍨</div>
-        <h2>Nenhum pedido no momento</h2>
-        <p>Use o painel Debug na barra lateral para simular novos pedidos</p>
-    </div>
-    """, unsafe_allow_html=True)
-else:
-    for order in orders:
-        order_id = order['id']
-        source = order['source']
-        client = order['client_name']
-        description = order['description']
-        status = order['status']
-        created_at = order['created_at']
-        
-        elapsed_time, time_class = format_elapsed_time(created_at)
-        
-        # Emoji da fonte
-        source_emoji = {"ifood": "🔴", "99food": "🟡", "whatsapp": "🟢"}.get(source, "⚪")
-        source_label = {"ifood": "iFood", "99food": "99Food", "whatsapp": "WhatsApp"}.get(source, source)
+
+@st.fragment(run_every=PREP_REFRESH_SECONDS)
+def render_prep_summary():
+    """Totais de copos por tamanho e de coberturas dos pedidos novos e em preparo."""
+    with metrics.stage("app.render.prep_summary"):
+        summary = db.get_prep_summary()
         
-        # Status labels
-        status_labels = {
-            "novo": "🔔 NOVO",
-            "preparando": "👨‍🍳 PREPARANDO", 
-            "pronto": "✅ PRONTO",
-            "saiu": "🚀 SAIU",
-            "cancelado": "❌ CANCELADO"
-        }
+        st.markdown("### 🧾 O que preparar (novos e em preparo)")
+        if not summary["items"]:
+            st.caption("Nada pendente")
+            return
         
-        # Card do pedido
-        st.markdown(f"""
-        <div class="order-card status-{status}">
-            <div class="order-header">
-                <span class="order-id">#{order_id:03d}</span>
-                <span class="order-source {get_source_class(source)}">{source_emoji} {source_label}</span>
+        col_items, col_toppings = st.columns(2)
+        with col_items:
+            st.dataframe(
+                [
+                    {"qtd": item["quantity"], "tamanho": format_size(item["size_ml"]), "produto": item["product"]}
+                    for item in summary["items"]
+                ],
+                hide_index=True,
+                use_container_width=True
+            )
+        with col_toppings:
+            st.dataframe(
+                [{"qtd": topping["quantity"], "cobertura": topping["topping"]} for topping in summary["toppings"]],
+                hide_index=True,
+                use_container_width=True
+            )
+
+
+if show_prep:
+    render_prep_summary()
+
+
+# ============================================================================
+# QUADRO EM OUTRO HORÁRIO (LOG DE EVENTOS)
+# ============================================================================
+
+def render_board_history():
+    """Quadro de hoje reconstruído do log de eventos no horário escolhido."""
+    st.markdown("### ⏪ Quadro em outro horário")
+    moment = st.time_input("Horário (hoje)", value=day_time(20, 0), step=300, key="history_time")
+    instant = int(datetime.combine(date.today(), moment).timestamp() * 1000)
+    
+    with metrics.stage("app.render.board_history"):
+        orders = db.get_board_at(instant)
+        if not orders:
+            st.caption("Nenhum pedido ativo nesse horário")
+            return
+        st.markdown(render_board_html(orders, now=instant), unsafe_allow_html=True)
+
+
+if show_history:
+    render_board_history()
+
+
+# ============================================================================
+# QUADRO DE PEDIDOS (FRAGMENTO ATUALIZADO POR MUDANÇA)
+# ============================================================================
+
+# Intervalo de verificação do marcador de mudanças do banco
+REFRESH_INTERVAL_SECONDS = 1
+
+
+def board_key(show_finished: bool, compact_mode: bool) -> tuple:
+    """
+    O que o quadro desenhado depende: revisão do store, minuto corrente
+    (tempo decorrido dos cards) e as opções da tela.
+    """
+    return (get_order_store().revision, db.now_ms() // db.MS_PER_MINUTE, show_finished, compact_mode)
+
+
+# Ações disponíveis por status no modo TV: rótulo -> novo status
+ORDER_ACTIONS = {
+    db.STATUS_NOVO: {"🔄 Confirmar": db.STATUS_PREPARANDO, "❌ Cancelar": db.STATUS_CANCELADO},
+    db.STATUS_PREPARANDO: {"✅ Pronto": db.STATUS_PRONTO, "❌ Cancelar": db.STATUS_CANCELADO},
+    db.STATUS_PRONTO: {"🚀 Saiu": db.STATUS_SAIU, "❌ Cancelar": db.STATUS_CANCELADO}
+}
+
+# Toast exibido para cada novo status: (mensagem, ícone)
+ACTION_TOASTS = {
+    db.STATUS_PREPARANDO: ("Pedido #{order_id} confirmado!", "🔄"),
+    db.STATUS_PRONTO: ("Pedido #{order_id} pronto!", "✅"),
+    db.STATUS_SAIU: ("Pedido #{order_id} saiu para entrega!", "🚀"),
+    db.STATUS_CANCELADO: ("Pedido #{order_id} cancelado", "❌")
+}
+
+
+def apply_transition(order_id: int, status: str, new_status: str) -> bool:
+    """
+    Callback das ações de um pedido: aplica a transição antes do rerun.
+    
+    A mudança só vale se o pedido ainda estiver no status exibido na tela.
+    Se outra tela chegou antes, avisa e deixa o store já atualizado mostrar
+    o status atual daquele card.
+    """
+    mark_click()
+    result = get_order_store().transition_order(order_id, status, new_status)
+    if result["updated"]:
+        message, icon = ACTION_TOASTS[new_status]
+        queue_toast(message.format(order_id=order_id), icon)
+        return True
+    
+    current = result["conflicts"].get(order_id)
+    if current is None:
+        queue_toast(f"Pedido #{order_id} não está mais no quadro", "⚠️")
+    else:
+        queue_toast(f"Pedido #{order_id} já foi atualizado em outra tela ({current})", "⚠️")
+    return False
+
+
+def apply_order_action(order_id: int, status: str, widget_key: str):
+    """Callback do controle de ações do modo TV: aplica a ação escolhida."""
+    label = st.session_state.get(widget_key)
+    new_status = ORDER_ACTIONS.get(status, {}).get(label)
+    if new_status is None:
+        return
+    
+    apply_transition(order_id, status, new_status)
+
+
+def render_action_controls(orders: list[dict]):
+    """Um controle compacto por pedido ativo, em vez de quatro botões."""
+    actionable = [order for order in orders if order["status"] in ORDER_ACTIONS]
+    if not actionable:
+        return
+    
+    cols = st.columns(4)
+    for index, order in enumerate(actionable):
+        # A chave inclui o status para o controle voltar ao estado vazio após a ação
+        widget_key = f"action_{order['id']}_{order['status']}"
+        with cols[index % 4]:
+            st.segmented_control(
+                f"#{order['id']:03d} · {order['client_name']}",
+                options=list(ORDER_ACTIONS[order["status"]]),
+                key=widget_key,
+                on_change=apply_order_action,
+                args=(order["id"], order["status"], widget_key)
+            )
+
+
+def change_page(step: int, next_cursor: Optional[list] = None):
+    """Callback da navegação entre páginas do quadro com finalizados."""
+    pager = st.session_state.finished_pager
+    if step > 0:
+        # Guarda o cursor de início de cada página visitada para poder voltar
+        pager["cursors"] = pager["cursors"][:pager["index"] + 1] + [next_cursor]
+    pager["index"] = max(0, pager["index"] + step)
+
+
+def render_page_controls(next_cursor: Optional[list]):
+    """Botões Anterior/Próxima do quadro com finalizados."""
+    pager = st.session_state.finished_pager
+    col_prev, col_info, col_next = st.columns([1, 2, 1])
+    
+    with col_prev:
+        st.button("◀ Anterior", key="page_prev", use_container_width=True,
+                  disabled=pager["index"] == 0, on_click=change_page, args=(-1,))
+    with col_info:
+        st.markdown(f"<div style='text-align:center'>Página {pager['index'] + 1}</div>",
+                    unsafe_allow_html=True)
+    with col_next:
+        st.button("Próxima ▶", key="page_next", use_container_width=True,
+                  disabled=next_cursor is None, on_click=change_page, args=(1, next_cursor))
+
+
+def load_board(show_finished: bool) -> dict:
+    """
+    Retorna contadores e pedidos do quadro.
+    
+    O quadro ativo vem do `OrderStore` compartilhado, sem SQL quando nada
+    mudou. Com "Mostrar finalizados", só a página visível (até
+    `db.PAGE_SIZE` pedidos) é lida, e apenas quando a revisão ou a página
+    mudam; o histórico inteiro nunca é carregado.
+    """
+    store = get_order_store()
+    counts = store.get_counts()
+    
+    if not show_finished:
+        return {"counts": counts, "orders": store.get_orders(), "next_cursor": None}
+    
+    pager = st.session_state.setdefault("finished_pager", {"cursors": [None], "index": 0})
+    after = pager["cursors"][pager["index"]]
+    page_key = (store.revision, pager["index"], tuple(after or ()))
+    
+    cached = st.session_state.get("finished_page")
+    if cached is None or cached["key"] != page_key:
+        cached = {"key": page_key, **db.get_orders_page(include_finished=True, after=after)}
+        st.session_state.finished_page = cached
+    
+    return {"counts": counts, "orders": cached["orders"], "next_cursor": cached["next_cursor"]}
+
+
+@st.fragment
+def render_board(show_finished: bool, compact_mode: bool):
+    """Renderiza métricas e lista de pedidos; cliques reexecutam só o fragmento."""
+    # Ações dentro do fragmento reexecutam só o fragmento: os toasts saem aqui
+    flush_toasts()
+    st.session_state.board_key = board_key(show_finished, compact_mode)
+    
+    with metrics.stage("app.load_board"):
+        board = load_board(show_finished)
+    
+    # ----- Métricas: contadores de status -----
+    counts = board["counts"]
+
+    with metrics.stage("app.render.metrics"):
+        col1, col2, col3 = st.columns(3)
+
+        with col1:
+            st.markdown(f"""
+            <div class="metric-card novo">
+                <div class="metric-label">🔔 Novos Pedidos</div>
+                <div class="metric-number novo">{counts.get(db.STATUS_NOVO, 0)}</div>
+                <div class="metric-label">Aguardando confirmação</div>
             </div>
-            <div class="order-client">👤 {client}</div>
-            <div class="order-description">{description}</div>
-            <div class="order-footer">
-                <div class="order-time">
-                    <span class="time-icon">⏱️</span>
-                    <span class="time-value {time_class}">{elapsed_time}</span>
-                </div>
-                <span class="status-badge {get_status_badge_class(status)}">{status_labels.get(status, status)}</span>
+            """, unsafe_allow_html=True)
+
+        with col2:
+            st.markdown(f"""
+            <div class="metric-card preparando">
+                <div class="metric-label">👨‍🍳 Em Preparo</div>
+                <div class="metric-number preparando">{counts.get(db.STATUS_PREPARANDO, 0)}</div>
+                <div class="metric-label">Na cozinha</div>
             </div>
+            """, unsafe_allow_html=True)
+
+        with col3:
+            st.markdown(f"""
+            <div class="metric-card pronto">
+                <div class="metric-label">✅ Prontos</div>
+                <div class="metric-number pronto">{counts.get(db.STATUS_PRONTO, 0)}</div>
+                <div class="metric-label">Aguardando entrega</div>
+            </div>
+            """, unsafe_allow_html=True)
+
+    st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
+
+    # ----- Lista de pedidos -----
+    orders = board["orders"]
+
+    if not orders:
+        st.markdown("""
+        <div class="empty-state">
+            <div class="icon">🍨</div>
+            <h2>Nenhum pedido no momento</h2>
+            <p>Use o painel Debug na barra lateral para simular novos pedidos</p>
         </div>
         """, unsafe_allow_html=True)
-        
-        # Botões de ação
-        if status not in ["saiu", "cancelado"]:
-            cols = st.columns(4)
-            
-            with cols[0]:
-                if status == "novo":
-                    if st.button("🔄 Confirmar", key=f"confirm_{order_id}", use_container_width=True):
-                        db.update_order_status(order_id, db.STATUS_PREPARANDO)
-                        st.toast(f"Pedido #{order_id} confirmado!", icon="🔄")
-                        sleep(0.3)
-                        st.rerun()
+    elif compact_mode:
+        # Grade inteira em um único elemento; cards inalterados vêm do cache
+        with metrics.stage("app.render.board_html"):
+            board_html = render_board_html(orders)
+        st.markdown(board_html, unsafe_allow_html=True)
+        with metrics.stage("app.render.action_controls"):
+            render_action_controls(orders)
+    else:
+        with metrics.stage("app.render.cards"):
+            # Tempo decorrido de todo o quadro em uma passada, contra o mesmo instante
+            elapsed_by_order = board_elapsed_minutes(orders)
             
-            with cols[1]:
-                if status == "preparando":
-                    if st.button("✅ Pronto", key=f"ready_{order_id}", use_container_width=True):
-                        db.update_order_status(order_id, db.STATUS_PRONTO)
-                        st.toast(f"Pedido #{order_id} pronto!", icon="✅")
-                        sleep(0.3)
-                        st.rerun()
-            
-            with cols[2]:
-                if status == "pronto":
-                    if st.button("🚀 Saiu", key=f"out_{order_id}", use_container_width=True):
-                        db.update_order_status(order_id, db.STATUS_SAIU)
-                        st.toast(f"Pedido #{order_id} saiu para entrega!", icon="🚀")
-                        sleep(0.3)
-                        st.rerun()
-            
-            with cols[3]:
-                if st.button("❌ Cancelar", key=f"cancel_{order_id}", use_container_width=True):
-                    db.update_order_status(order_id, db.STATUS_CANCELADO)
-                    st.toast(f"Pedido #{order_id} cancelado", icon="❌")
-                    sleep(0.3)
-                    st.rerun()
-        
-        st.markdown("---")
+            for order, elapsed_minutes in zip(orders, elapsed_by_order):
+                order_id = order['id']
+                status = order['status']
+                
+                # Card do pedido (mesmo HTML da grade, com cliente e descrição escapados)
+                st.markdown(render_card(
+                    order_id,
+                    status,
+                    elapsed_minutes,
+                    order['source'],
+                    order['client_name'],
+                    order['description']
+                ), unsafe_allow_html=True)
+                
+                # Botões de ação
+                if status not in ["saiu", "cancelado"]:
+                    cols = st.columns(4)
+                    
+                    with cols[0]:
+                        if status == "novo":
+                            st.button("🔄 Confirmar", key=f"confirm_{order_id}", use_container_width=True,
+                                      on_click=apply_transition, args=(order_id, status, db.STATUS_PREPARANDO))
+                    
+                    with cols[1]:
+                        if status == "preparando":
+                            st.button("✅ Pronto", key=f"ready_{order_id}", use_container_width=True,
+                                      on_click=apply_transition, args=(order_id, status, db.STATUS_PRONTO))
+                    
+                    with cols[2]:
+                        if status == "pronto":
+                            st.button("🚀 Saiu", key=f"out_{order_id}", use_container_width=True,
+                                      on_click=apply_transition, args=(order_id, status, db.STATUS_SAIU))
+                    
+                    with cols[3]:
+                        st.button("❌ Cancelar", key=f"cancel_{order_id}", use_container_width=True,
+                                  on_click=apply_transition, args=(order_id, status, db.STATUS_CANCELADO))
+                
+                st.markdown("---")
+
+    if show_finished:
+        render_page_controls(board["next_cursor"])
+    
+    record_click_latency()
+
+
+@st.fragment(run_every=REFRESH_INTERVAL_SECONDS)
+def watch_board(show_finished: bool, compact_mode: bool):
+    """
+    Verifica a cada ciclo se o quadro desenhado ficou velho.
+    
+    Com a cozinha parada, o ciclo custa só a leitura da revisão do store
+    (em memória, com `PRAGMA data_version` no máximo a cada
+    `store.check_interval`): nada é redesenhado nem enviado ao navegador.
+    """
+    if st.session_state.get("board_key") != board_key(show_finished, compact_mode):
+        st.rerun()
 
-# ============================================================================
-# AUTO-REFRESH
-# ============================================================================
 
+render_board(show_finished, compact_mode)
 if auto_refresh:
-    sleep(30)
-    st.rerun()
+    watch_board(show_finished, compact_mode)
@@ -0,0 +1,272 @@
+"""
+Saka Delivery KDS - Backends de Armazenamento de Pedidos
+Interface comum para as operações básicas do quadro, com implementações
+em arquivo SQLite, SQLite em memória compartilhada e Python puro
+"""
+
+import itertools
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left, insort
+from pathlib import Path
+from typing import Optional, Union
+
+import database as db
+
+# Prefixo dos bancos SQLite em memória (o nome distingue bancos do mesmo processo)
+MEMORY_URI = "file:saka-mem-{name}?mode=memory&cache=shared"
+
+ACTIVE_STATUSES = tuple(status for status, rank in db.STATUS_RANK.items() if rank <= db.ACTIVE_MAX_RANK)
+
+
+class OrderBackend(ABC):
+    """
+    Operações básicas de pedidos, com a mesma semântica de `database.py`.
+    
+    Os pedidos são dicionários com pelo menos id, source, client_name,
+    description, status, created_at e updated_at (epoch ms). Mudanças de
+    status respeitam `db.STATUS_TRANSITIONS`.
+    """
+    
+    name = "backend"
+    
+    @abstractmethod
+    def create_order(self, source: str, client_name: str, description: str) -> int:
+        """Cria um pedido "novo" e devolve o ID."""
+    
+    @abstractmethod
+    def get_all_orders(self, include_finished: bool = False) -> list[dict]:
+        """Pedidos do quadro em ordem de exibição (status, depois chegada)."""
+    
+    @abstractmethod
+    def get_order_by_id(self, order_id: int) -> Optional[dict]:
+        """Pedido no quadro ou no arquivo; None se não existir."""
+    
+    @abstractmethod
+    def update_order_status(self, order_id: int, new_status: str) -> bool:
+        """Muda o status se a transição for permitida."""
+    
+    @abstractmethod
+    def delete_order(self, order_id: int) -> bool:
+        """Remove um pedido do quadro."""
+    
+    @abstractmethod
+    def get_orders_count_by_status(self) -> dict[str, int]:
+        """Contagem dos pedidos ativos por status."""
+    
+    @abstractmethod
+    def clear_old_orders(self, hours: int = 24) -> int:
+        """Arquiva finalizados há mais de `hours` horas e devolve quantos saíram do quadro."""
+    
+    def close(self) -> None:
+        """Libera os recursos do backend."""
+
+
+# ============================================================================
+# SQLITE (ARQUIVO E MEMÓRIA COMPARTILHADA)
+# ============================================================================
+
+class SQLiteBackend(OrderBackend):
+    """
+    Delega para as funções de `database.py` apontadas para `path`.
+    
+    Usa `db.use_database`, então várias instâncias com bancos diferentes
+    convivem no mesmo processo (inclusive em threads paralelas) sem mexer
+    em `db.DB_PATH`.
+    """
+    
+    name = "sqlite"
+    
+    def __init__(self, path: Union[str, Path, None] = None):
+        self.path = str(path or db.DB_PATH)
+        with db.use_database(self.path):
+            db.ensure_schema()
+    
+    def create_order(self, source: str, client_name: str, description: str) -> int:
+        with db.use_database(self.path):
+            return db.create_order(source, client_name, description)
+    
+    def get_all_orders(self, include_finished: bool = False) -> list[dict]:
+        with db.use_database(self.path):
+            return db.get_all_orders(include_finished)
+    
+    def get_order_by_id(self, order_id: int) -> Optional[dict]:
+        with db.use_database(self.path):
+            return db.get_order_by_id(order_id)
+    
+    def update_order_status(self, order_id: int, new_status: str) -> bool:
+        with db.use_database(self.path):
+            return db.update_order_status(order_id, new_status)
+    
+    def delete_order(self, order_id: int) -> bool:
+        with db.use_database(self.path):
+            return db.delete_order(order_id)
+    
+    def get_orders_count_by_status(self) -> dict[str, int]:
+        with db.use_database(self.path):
+            return db.get_orders_count_by_status()
+    
+    def clear_old_orders(self, hours: int = 24) -> int:
+        with db.use_database(self.path):
+            return db.clear_old_orders(hours)
+    
+    def close(self) -> None:
+        db.close_database(self.path)
+
+
+class SQLiteMemoryBackend(SQLiteBackend):
+    """
+    Mesmo esquema e mesmas consultas do arquivo, em um banco SQLite em memória.
+    
+    O banco existe enquanto houver uma conexão aberta; o backend guarda uma
+    conexão ociosa até `close()`. Instâncias com o mesmo `name` no mesmo
+    processo compartilham os dados.
+    """
+    
+    name = "sqlite-memory"
+    _counter = itertools.count(1)
+    
+    def __init__(self, name: Optional[str] = None):
+        uri = MEMORY_URI.format(name=name or f"{id(self):x}-{next(self._counter)}")
+        self._keeper: Optional[sqlite3.Connection] = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        super().__init__(uri)
+    
+    def close(self) -> None:
+        super().close()
+        if self._keeper is not None:
+            self._keeper.close()
+            self._keeper = None
+
+
+# ============================================================================
+# PYTHON PURO (ÍNDICES EM MEMÓRIA)
+# ============================================================================
+
+class MemoryBackend(OrderBackend):
+    """
+    Pedidos em dicionários, sem SQL nem serialização.
+    
+    - `_orders`: pedidos do quadro por ID; `_archive`: pedidos arquivados
+    - `_by_status`: por status, lista de (created_at, id) mantida ordenada
+      com `bisect`, que dá a ordem de exibição sem ordenar a cada leitura
+    
+    Não grava eventos, KPIs nem itens: serve para testes e comparações do
+    núcleo do quadro. Os dados somem com o objeto.
+    """
+    
+    name = "memory"
+    
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._orders: dict[int, dict] = {}
+        self._archive: dict[int, dict] = {}
+        self._by_status: dict[str, list[tuple[int, int]]] = {status: [] for status in db.STATUS_RANK}
+        self._next_id = 1
+    
+    def create_order(self, source: str, client_name: str, description: str) -> int:
+        now = db.now_ms()
+        with self._lock:
+            order_id = self._next_id
+            self._next_id += 1
+            self._orders[order_id] = {
+                "id": order_id,
+                "source": source,
+                "client_name": client_name,
+                "description": description,
+                "status": db.STATUS_NOVO,
+                "status_rank": db.STATUS_RANK[db.STATUS_NOVO],
+                "created_at": now,
+                "updated_at": now
+            }
+            insort(self._by_status[db.STATUS_NOVO], (now, order_id))
+        return order_id
+    
+    def get_all_orders(self, include_finished: bool = False) -> list[dict]:
+        statuses = db.STATUS_RANK if include_finished else ACTIVE_STATUSES
+        with self._lock:
+            return [
+                dict(self._orders[order_id])
+                for status in statuses
+                for _, order_id in self._by_status[status]
+            ]
+    
+    def get_order_by_id(self, order_id: int) -> Optional[dict]:
+        with self._lock:
+            order = self._orders.get(order_id) or self._archive.get(order_id)
+            return dict(order) if order else None
+    
+    def _unindex(self, order: dict) -> None:
+        ids = self._by_status[order["status"]]
+        del ids[bisect_left(ids, (order["created_at"], order["id"]))]
+    
+    def update_order_status(self, order_id: int, new_status: str) -> bool:
+        with self._lock:
+            order = self._orders.get(order_id)
+            if order is None or not db.can_transition(order["status"], new_status):
+                return False
+            
+            self._unindex(order)
+            order["status"] = new_status
+            order["status_rank"] = db.STATUS_RANK[new_status]
+            order["updated_at"] = db.now_ms()
+            insort(self._by_status[new_status], (order["created_at"], order_id))
+        return True
+    
+    def delete_order(self, order_id: int) -> bool:
+        with self._lock:
+            order = self._orders.pop(order_id, None)
+            if order is None:
+                return False
+            self._unindex(order)
+        return True
+    
+    def get_orders_count_by_status(self) -> dict[str, int]:
+        with self._lock:
+            return {status: len(self._by_status[status]) for status in ACTIVE_STATUSES}
+    
+    def clear_old_orders(self, hours: int = 24) -> int:
+        now = db.now_ms()
+        cutoff = now - int(hours * db.MS_PER_HOUR)
+        with self._lock:
+            old = [
+                order for status in db.FINISHED_STATUSES
+                for _, order_id in self._by_status[status]
+                if (order := self._orders[order_id])["updated_at"] <= cutoff
+            ]
+            for order in old:
+                self._unindex(order)
+                del self._orders[order["id"]]
+                archived = {key: value for key, value in order.items() if key != "status_rank"}
+                self._archive[order["id"]] = {**archived, "archived_at": now}
+        return len(old)
+    
+    def close(self) -> None:
+        with self._lock:
+            self._orders.clear()
+            self._archive.clear()
+            for ids in self._by_status.values():
+                ids.clear()
+
+
+BACKENDS = {
+    SQLiteBackend.name: SQLiteBackend,
+    SQLiteMemoryBackend.name: SQLiteMemoryBackend,
+    MemoryBackend.name: MemoryBackend
+}
+
+
+def open_backend(kind: str, path: Union[str, Path, None] = None) -> OrderBackend:
+    """
+    Cria um backend pelo nome ("sqlite", "sqlite-memory" ou "memory").
+    
+    Args:
+        kind: Nome do backend (chave de `BACKENDS`)
+        path: Arquivo do banco, só para "sqlite" (padrão: `db.DB_PATH`)
+    
+    Raises:
+        ValueError: Nome desconhecido
+    """
+    if kind not in BACKENDS:
+        raise ValueError(f"Backend desconhecido: {kind} (use {', '.join(BACKENDS)})")
+    return SQLiteBackend(path) if kind == SQLiteBackend.name else BACKENDS[kind]()
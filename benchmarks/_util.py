@@ -0,0 +1,63 @@
+"""
+Saka Delivery KDS - Utilitários compartilhados pelos benchmarks
+Cria bancos temporários e mede tempos por chamada
+"""
+
+import sys
+import time
+from pathlib import Path
+from typing import Callable, ContextManager
+
+# Permite importar os módulos do projeto ao rodar `python benchmarks/<script>.py`
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from metrics import percentile  # noqa: E402 (reexportado para os benchmarks)
+
+
+def temp_database() -> ContextManager[Path]:
+    """
+    Aponta o módulo `database` para um arquivo temporário durante o bloco.
+    
+    Ver `db.temporary_database`: o caminho também vai para SAKA_DB_PATH,
+    para que subprocessos usem o mesmo arquivo.
+    """
+    import database as db
+    
+    return db.temporary_database(prefix="saka-bench-")
+
+
+def finish_orders(order_ids: list[int]) -> None:
+    """Leva pedidos novos até "saiu" pelos passos da máquina de estados."""
+    import database as db
+    
+    steps = (db.STATUS_NOVO, db.STATUS_PREPARANDO, db.STATUS_PRONTO, db.STATUS_SAIU)
+    for current, following in zip(steps, steps[1:]):
+        db.transition_orders(order_ids, current, following)
+
+
+def summarize_latencies(latencies: list[float], elapsed: float) -> dict:
+    """
+    Resume latências (em segundos) de uma operação.
+    
+    Returns:
+        Dicionário com contagem, vazão (ops/s) e p50/p95/p99/máximo em ms
+    """
+    return {
+        "count": len(latencies),
+        "ops_per_second": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies, default=0.0) * 1000
+    }
+
+
+def time_per_call(func: Callable[[], object], iterations: int) -> float:
+    """Executa `func` repetidas vezes e retorna o tempo médio por chamada em µs."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - start
+    return elapsed / iterations * 1_000_000
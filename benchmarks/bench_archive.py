@@ -0,0 +1,56 @@
+"""
+Benchmark: custo das consultas do quadro conforme cresce o histórico,
+com os finalizados na tabela quente vs. movidos para o arquivo.
+
+Uso:
+    python benchmarks/bench_archive.py [--orders-per-day N] [--active N]
+"""
+
+import argparse
+
+from _util import finish_orders, temp_database, time_per_call
+
+import database as db
+import simulator
+
+HISTORY_DAYS = (0, 7, 30)
+
+
+def read_board():
+    """As duas leituras feitas a cada renderização do quadro."""
+    db.get_all_orders()
+    db.get_orders_count_by_status()
+
+
+def read_with_finished():
+    """Leitura do quadro com 'Mostrar finalizados'."""
+    db.get_all_orders(include_finished=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders-per-day", type=int, default=300)
+    parser.add_argument("--active", type=int, default=40)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    
+    print(f"{'histórico':<12} {'quadro (quente)':>18} {'quadro (arquivado)':>20} {'c/ finalizados (quente)':>25} {'c/ finalizados (arquivado)':>27}")
+    for days in HISTORY_DAYS:
+        with temp_database():
+            finished = db.create_orders_bulk(
+                simulator.random_order() for _ in range(days * args.orders_per_day)
+            )
+            finish_orders(finished)
+            db.create_orders_bulk(simulator.random_order() for _ in range(args.active))
+            
+            hot = time_per_call(read_board, args.iterations)
+            hot_finished = time_per_call(read_with_finished, max(1, args.iterations // 10))
+            db.archive_finished_orders()
+            archived = time_per_call(read_board, args.iterations)
+            archived_finished = time_per_call(read_with_finished, max(1, args.iterations // 10))
+        
+        print(f"{days:>3} dias     {hot:15.0f} µs {archived:17.0f} µs {hot_finished:22.0f} µs {archived_finished:24.0f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark: latência e vazão das operações do quadro em cada backend de
+`backends.py` (arquivo SQLite, SQLite em memória e Python puro).
+
+Cada backend recebe a mesma carga: --orders pedidos criados, o quadro lido
+a cada 10 criações, cada pedido levado até "saiu" e, no fim, o arquivamento.
+Depois a mesma carga roda em --threads threads sobre o mesmo backend.
+
+Uso:
+    python benchmarks/bench_backends.py [--orders N] [--threads N]
+"""
+
+import argparse
+import random
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from _util import summarize_latencies
+
+import backends
+import database as db
+import simulator
+
+OPERATIONS = ("create_order", "update_order_status", "get_all_orders", "get_orders_count_by_status")
+STEPS = (db.STATUS_PREPARANDO, db.STATUS_PRONTO, db.STATUS_SAIU)
+
+
+def run_workload(backend: backends.OrderBackend, orders: list[tuple], samples: dict[str, list[float]]) -> None:
+    """Cria, lê e finaliza os pedidos, guardando a latência de cada chamada."""
+    def timed(name: str, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        samples[name].append(time.perf_counter() - start)
+        return result
+    
+    order_ids = []
+    for index, order in enumerate(orders, start=1):
+        order_ids.append(timed("create_order", backend.create_order, *order))
+        if index % 10 == 0:
+            timed("get_all_orders", backend.get_all_orders)
+            timed("get_orders_count_by_status", backend.get_orders_count_by_status)
+    
+    for status in STEPS:
+        for order_id in order_ids:
+            timed("update_order_status", backend.update_order_status, order_id, status)
+
+
+def measure(kind: str, orders: list[tuple], threads: int) -> tuple[dict[str, dict], float, int]:
+    """Roda a carga em `threads` threads num backend novo; devolve resumo, segundos e arquivados."""
+    with tempfile.TemporaryDirectory(prefix="saka-bench-") as tmp:
+        backend = backends.open_backend(kind, Path(tmp) / "bench.db")
+        per_thread = [defaultdict(list) for _ in range(threads)]
+        workers = [
+            threading.Thread(target=run_workload, args=(backend, orders[index::threads], per_thread[index]))
+            for index in range(threads)
+        ]
+        
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+        archived = backend.clear_old_orders(hours=0)
+        backend.close()
+    
+    merged = {name: [seconds for samples in per_thread for seconds in samples[name]] for name in OPERATIONS}
+    return {name: summarize_latencies(merged[name], elapsed) for name in OPERATIONS}, elapsed, archived
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+    
+    random.seed(7)
+    orders = [simulator.random_order() for _ in range(args.orders)]
+    calls = args.orders * (1 + len(STEPS)) + args.orders // 10 * 2
+    
+    for threads in (1, args.threads):
+        print(f"\n{args.orders} pedidos, {threads} thread(s)")
+        print(f"{'backend':<15} {'operação':<28} {'p50 µs':>9} {'p95 µs':>9} {'p99 µs':>9}")
+        for kind in backends.BACKENDS:
+            summary, elapsed, archived = measure(kind, orders, threads)
+            assert archived == args.orders, f"{kind}: arquivou {archived} de {args.orders}"
+            for name in OPERATIONS:
+                stats = summary[name]
+                print(f"{kind:<15} {name:<28} {stats['p50_ms'] * 1000:9.0f} "
+                      f"{stats['p95_ms'] * 1000:9.0f} {stats['p99_ms'] * 1000:9.0f}")
+            print(f"{kind:<15} {'vazão total':<28} {calls / elapsed:>21.0f} chamadas/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Benchmark: N chamadas de create_order() vs. uma chamada de create_orders_bulk().
+
+Uso:
+    python benchmarks/bench_bulk_insert.py [--orders N] [--chunk-size N]
+"""
+
+import argparse
+import time
+
+from _util import temp_database
+
+import database as db
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--chunk-size", type=int, default=db.BULK_CHUNK_SIZE)
+    args = parser.parse_args()
+    
+    payload = [
+        (db.FONTE_IFOOD, f"Cliente {i}", "1x Açaí 500ml Tradicional + Granola + Banana")
+        for i in range(args.orders)
+    ]
+    
+    with temp_database():
+        start = time.perf_counter()
+        for order in payload:
+            db.create_order(*order)
+        single = time.perf_counter() - start
+    
+    with temp_database():
+        start = time.perf_counter()
+        order_ids = db.create_orders_bulk(payload, chunk_size=args.chunk_size)
+        bulk = time.perf_counter() - start
+        assert len(order_ids) == args.orders
+    
+    print(f"{args.orders}x create_order():        {single * 1000:9.1f} ms ({args.orders / single:9.0f} pedidos/s)")
+    print(f"create_orders_bulk(chunk={args.chunk_size}): {bulk * 1000:9.1f} ms ({args.orders / bulk:9.0f} pedidos/s)")
+    print(f"Ganho: {single / bulk:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark: latência clique → tela atualizada das ações do quadro.
+
+Antes, cada clique fazia a escrita, st.toast, sleep(0.3) e st.rerun(): uma
+execução completa desperdiçada, 300 ms parados e uma segunda execução.
+Agora a escrita roda em um callback on_click e a tela sai no único rerun.
+
+Com o Streamlit instalado, clica em "Confirmar" via AppTest (modo com
+botões por card) e compara:
+- depois: tempo medido do clique até o fim do rerun;
+- antes (estimado): o mesmo rerun + 300 ms + mais uma execução completa.
+
+Uso:
+    python benchmarks/bench_clicks.py [--orders N] [--clicks N]
+"""
+
+import argparse
+import time
+
+from _util import ROOT, percentile, temp_database
+
+import database as db
+import metrics
+import simulator
+
+LEGACY_SLEEP_SECONDS = 0.3
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=50)
+    parser.add_argument("--clicks", type=int, default=20)
+    args = parser.parse_args()
+    
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        print("Streamlit não instalado: benchmark de cliques ignorado")
+        return
+    
+    with temp_database():
+        order_ids = db.create_orders_bulk(simulator.random_order() for _ in range(args.orders))
+        
+        app = AppTest.from_file(str(ROOT / "app.py"), default_timeout=60)
+        app.session_state["compact_mode"] = False
+        app.run()
+        
+        plain_runs = []
+        for _ in range(args.clicks):
+            start = time.perf_counter()
+            app.run()
+            plain_runs.append(time.perf_counter() - start)
+        
+        click_runs = []
+        for order_id in order_ids[: args.clicks]:
+            start = time.perf_counter()
+            app.button(key=f"confirm_{order_id}").click().run()
+            click_runs.append(time.perf_counter() - start)
+    
+    plain = percentile(plain_runs, 50)
+    after = [run * 1000 for run in click_runs]
+    before = [(run + LEGACY_SLEEP_SECONDS + plain) * 1000 for run in click_runs]
+    in_app = metrics.histogram("app.click_to_render").window()
+    
+    print(f"{args.clicks} cliques em 'Confirmar' com {args.orders} pedidos no quadro")
+    print(f"{'':<28} {'p50 ms':>9} {'p95 ms':>9}")
+    print(f"{'antes (estimado)':<28} {percentile(before, 50):9.1f} {percentile(before, 95):9.1f}")
+    print(f"{'depois (on_click)':<28} {percentile(after, 50):9.1f} {percentile(after, 95):9.1f}")
+    print(f"{'app.click_to_render':<28} {in_app['p50_ms']:9.1f} {in_app['p95_ms']:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Benchmark: custo por chamada de abrir uma conexão nova vs. usar o pool.
+
+Uso:
+    python benchmarks/bench_connection.py [--iterations N]
+"""
+
+import argparse
+import sqlite3
+
+from _util import temp_database, time_per_call
+
+import database as db
+
+
+def get_order_by_id_unpooled(order_id: int):
+    """Reproduz o comportamento antigo: conecta, consulta e fecha a cada chamada."""
+    conn = sqlite3.connect(str(db.DB_PATH))
+    conn.row_factory = sqlite3.Row
+    row = conn.execute("SELECT * FROM orders WHERE id = ?", (order_id,)).fetchone()
+    conn.close()
+    return dict(row) if row else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+    
+    with temp_database():
+        order_id = db.create_order(db.FONTE_IFOOD, "Maria Silva", "1x Açaí 500ml + Granola")
+        for _ in range(49):
+            db.create_order(db.FONTE_99FOOD, "Bruno Alves", "2x Açaí 350ml Tradicional")
+        
+        # Cada chamada confirma um pedido novo diferente (novo -> preparando)
+        pending = iter(db.create_orders_bulk(
+            (db.FONTE_IFOOD, "Carla Souza", "1x Açaí 300ml") for _ in range(args.iterations // 5)
+        ))
+        
+        results = {
+            "get_order_by_id (conexão nova)": time_per_call(
+                lambda: get_order_by_id_unpooled(order_id), args.iterations),
+            "get_order_by_id (pool)": time_per_call(
+                lambda: db.get_order_by_id(order_id), args.iterations),
+            "get_orders_count_by_status (pool)": time_per_call(
+                db.get_orders_count_by_status, args.iterations),
+            "update_order_status (pool)": time_per_call(
+                lambda: db.update_order_status(next(pending), db.STATUS_PREPARANDO), args.iterations // 5),
+        }
+    
+    for name, micros in results.items():
+        print(f"{name:<40} {micros:10.1f} µs/chamada")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Benchmark: recarga completa do quadro vs. leitura incremental por revisão.
+
+Uso:
+    python benchmarks/bench_delta.py [--orders N] [--iterations N]
+"""
+
+import argparse
+
+from _util import temp_database, time_per_call
+
+import database as db
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+    
+    with temp_database():
+        for i in range(args.orders):
+            db.create_order(db.FONTE_IFOOD, f"Cliente {i}", "1x Açaí 500ml + Granola")
+        
+        # Um cliente incremental que está uma única mudança atrás
+        order_id = db.create_order(db.FONTE_WHATSAPP, "Amanda Costa", "1x Açaí 700ml com tudo")
+        since = db.get_revision() - 1
+        
+        full = time_per_call(db.get_all_orders, args.iterations)
+        delta = time_per_call(lambda: db.get_orders_changed_since(since), args.iterations)
+        idle = time_per_call(db.get_revision, args.iterations)
+    
+    print(f"Quadro com {args.orders + 1} pedidos ativos (pedido #{order_id} alterado)")
+    print(f"{'get_all_orders()':<40} {full:10.1f} µs/chamada")
+    print(f"{'get_orders_changed_since(1 mudança)':<40} {delta:10.1f} µs/chamada")
+    print(f"{'get_revision() (sem mudanças)':<40} {idle:10.1f} µs/chamada")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark: quadro em um instante passado reconstruído a partir do snapshot
+mais próximo + cauda de eventos vs. reaplicar o log inteiro.
+
+Gera uma noite sintética (`replay.synthetic_night`), reaplica no banco
+temporário pelas funções públicas (com snapshots a cada
+`db.SNAPSHOT_EVERY_EVENTS` eventos) e consulta instantes aleatórios da
+noite pelos dois caminhos, conferindo que o resultado é o mesmo.
+
+Uso:
+    python benchmarks/bench_events.py [--orders N] [--instants N]
+"""
+
+import argparse
+import random
+import time
+
+from _util import temp_database
+
+import database as db
+import replay
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=3000)
+    parser.add_argument("--instants", type=int, default=50)
+    args = parser.parse_args()
+    
+    timeline = replay.synthetic_night(args.orders, hours=6, seed=7)
+    
+    with temp_database():
+        result = replay.replay(timeline)
+        
+        with db.pooled_connection() as conn:
+            first_at, last_at = conn.execute("SELECT MIN(at), MAX(at) FROM order_events").fetchone()
+            snapshots, snapshot_bytes = conn.execute(
+                "SELECT COUNT(*), SUM(LENGTH(board)) FROM order_snapshots"
+            ).fetchone()
+        
+        rng = random.Random(7)
+        instants = [rng.randint(first_at, last_at) for _ in range(args.instants)]
+        timings = {True: 0.0, False: 0.0}
+        for instant in instants:
+            boards = {}
+            for use_snapshots in (True, False):
+                start = time.perf_counter()
+                boards[use_snapshots] = db.get_board_at(instant, include_finished=True, use_snapshots=use_snapshots)
+                timings[use_snapshots] += time.perf_counter() - start
+            assert boards[True] == boards[False], f"Reconstruções divergem em {instant}"
+    
+    events = result["events"]
+    print(f"Noite sintética: {args.orders} pedidos, {events} eventos "
+          f"(replay a {events / result['elapsed']:.0f} eventos/s, {result['skipped']} ignorados)")
+    print(f"Snapshots: {snapshots} ({(snapshot_bytes or 0) / 1024:.0f} KiB no total)")
+    print(f"{'get_board_at()':<34} {'média por instante':>20}")
+    print(f"{'snapshot + cauda':<34} {timings[True] / len(instants) * 1e6:17.0f} µs")
+    print(f"{'log inteiro':<34} {timings[False] / len(instants) * 1e6:17.0f} µs")
+
+
+if __name__ == "__main__":
+    main()
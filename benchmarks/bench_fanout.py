@@ -0,0 +1,333 @@
+"""
+Benchmark: latência de fan-out do `/events` (Server-Sent Events) da API do
+quadro para 1, 10 e 100 telas, com um enxame de telas falsas locais.
+
+A API roda em um processo próprio sobre um banco temporário. Este processo
+grava pedidos direto no SQLite e cada tela falsa mede o tempo entre a
+chamada de `db.create_order` e a chegada do pedido no seu delta. No fim de
+cada etapa, o quadro montado por cada tela (snapshot + deltas) é comparado
+com `GET /orders`.
+
+Depois, duas verificações:
+    lentos:     telas que param de ler durante uma rajada; as demais não
+                podem atrasar, e as lentas devem convergir (snapshot) ao voltar
+    reconexão:  uma tela cai, perde deltas e volta com Last-Event-ID;
+                deve receber só o que perdeu, sem snapshot
+
+Uso:
+    python benchmarks/bench_fanout.py [--subscribers 1,10,100] [--writes N]
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import socket
+import time
+from typing import Optional
+
+from _util import percentile, temp_database
+
+import database as db
+import simulator
+from board_api import BoardAPI
+from http_server import read_headers
+
+HOST = "127.0.0.1"
+BOARD_SIZE = 40
+WRITE_SPACING_SECONDS = 0.05
+
+# Fila por tela no servidor durante o benchmark: pequena para a rajada estourar
+BENCH_QUEUE_SIZE = 16
+SLOW_DISPLAYS = 5
+SLOW_PHASE_DISPLAYS = 10
+BURST_WRITES = 60
+BURST_ORDERS = 200
+RECONNECT_WRITES = 5
+
+STALLED_RECEIVE_BUFFER = 4096
+
+# Snapshots de quadros grandes chegam em uma única linha `data:`
+READ_LIMIT_BYTES = 32 * 1024 * 1024
+SETTLE_SECONDS = 0.5
+
+
+def serve_api(ports: multiprocessing.Queue, queue_size: int) -> None:
+    """Processo do servidor: sobe a API, informa a porta e serve até ser encerrado."""
+    async def serve() -> None:
+        api = BoardAPI()
+        api.stream.queue_size = queue_size
+        ports.put(await api.start(HOST, 0))
+        await asyncio.Event().wait()
+    
+    asyncio.run(serve())
+
+
+class FakeDisplay:
+    """Tela falsa: monta o quadro a partir do stream e mede a chegada dos pedidos."""
+    
+    def __init__(self, sent_at: dict[int, float]):
+        self.sent_at = sent_at
+        self.board: dict[int, str] = {}
+        self.arrivals: dict[int, float] = {}
+        self.last_event_id: Optional[str] = None
+        self.snapshots = 0
+        self.deltas = 0
+        self.ready = asyncio.Event()
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+        self._sock: Optional[socket.socket] = None
+    
+    async def connect(self, stalled: bool = False) -> None:
+        """
+        Abre GET /events e começa a ler.
+        
+        Com `stalled=True`, a tela não lê: o socket tem buffer de recepção
+        pequeno e só passa para o asyncio em `resume()`, então o que o
+        servidor manda fica parado no kernel, como em uma TV travada.
+        """
+        loop = asyncio.get_running_loop()
+        request = f"GET /events HTTP/1.1\r\nHost: {HOST}\r\nAccept: text/event-stream\r\n"
+        if self.last_event_id:
+            request += f"Last-Event-ID: {self.last_event_id}\r\n"
+        
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if stalled:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, STALLED_RECEIVE_BUFFER)
+        sock.setblocking(False)
+        await loop.sock_connect(sock, (HOST, PORT))
+        await loop.sock_sendall(sock, (request + "\r\n").encode("latin-1"))
+        self._sock = sock
+        if not stalled:
+            await self.resume()
+    
+    async def resume(self) -> None:
+        """Passa o socket para o asyncio e processa tudo o que chegou até aqui."""
+        self._reader, self._writer = await asyncio.open_connection(sock=self._sock, limit=READ_LIMIT_BYTES)
+        self._task = asyncio.create_task(self._read())
+    
+    def latencies(self) -> list[float]:
+        """Da chamada de escrita até a chegada, para os pedidos medidos que já chegaram."""
+        return [
+            self.arrivals[order_id] - sent for order_id, sent in self.sent_at.items()
+            if order_id in self.arrivals
+        ]
+    
+    def received_all(self) -> bool:
+        return all(order_id in self.arrivals for order_id in self.sent_at)
+    
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._writer.close()
+    
+    async def _read(self) -> None:
+        await self._reader.readline()
+        await read_headers(self._reader)
+        fields: dict[str, str] = {}
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                return
+            line = line.decode("utf-8").rstrip("\n")
+            if not line:
+                if "data" in fields:
+                    self._apply(fields)
+                fields = {}
+            elif not line.startswith(":"):
+                name, _, value = line.partition(":")
+                fields[name] = value.removeprefix(" ")
+    
+    def _apply(self, fields: dict[str, str]) -> None:
+        arrived = time.perf_counter()
+        payload = json.loads(fields["data"])
+        self.last_event_id = fields.get("id", self.last_event_id)
+        
+        if fields.get("event") == "snapshot":
+            self.board = {order["id"]: order["status"] for order in payload["orders"]}
+            self.snapshots += 1
+        else:
+            for order in payload["new"]:
+                self.board[order["id"]] = order["status"]
+                self.arrivals[order["id"]] = arrived
+            for order in payload["status"]:
+                if order["status"] in db.FINISHED_STATUSES:
+                    self.board.pop(order["id"], None)
+                else:
+                    self.board[order["id"]] = order["status"]
+            for order_id in payload["removed"]:
+                self.board.pop(order_id, None)
+            self.deltas += 1
+        self.ready.set()
+
+
+async def fetch_json(path: str) -> dict:
+    reader, writer = await asyncio.open_connection(HOST, PORT)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {HOST}\r\nConnection: close\r\n\r\n".encode("latin-1"))
+    await reader.readline()
+    headers = await read_headers(reader)
+    body = await reader.readexactly(int(headers.get("content-length", 0)))
+    writer.close()
+    return json.loads(body)
+
+
+async def server_board() -> dict[int, str]:
+    return {order["id"]: order["status"] for order in (await fetch_json("/orders"))["orders"]}
+
+
+async def write_orders(count: int, sent_at: dict[int, float], bulk: int = 1) -> None:
+    """Grava `count` vezes (um pedido ou um lote) e avança o pedido mais antigo a cada escrita."""
+    for _ in range(count):
+        start = time.perf_counter()
+        if bulk == 1:
+            order_ids = [await asyncio.to_thread(db.create_order, *simulator.random_order())]
+        else:
+            orders = [simulator.random_order() for _ in range(bulk)]
+            order_ids = await asyncio.to_thread(db.create_orders_bulk, orders)
+        # Uma medida por escrita (o primeiro pedido do lote)
+        sent_at[order_ids[0]] = start
+        
+        oldest = (await asyncio.to_thread(db.get_all_orders))[0]
+        following = db.STATUS_TRANSITIONS[oldest["status"]][0]
+        await asyncio.to_thread(db.transition_order, oldest["id"], oldest["status"], following)
+        await asyncio.sleep(WRITE_SPACING_SECONDS)
+
+
+async def wait_for(condition, timeout: float = 10.0) -> bool:
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            return False
+        await asyncio.sleep(0.01)
+    return True
+
+
+async def open_displays(count: int, sent_at: dict[int, float]) -> list[FakeDisplay]:
+    displays = [FakeDisplay(sent_at) for _ in range(count)]
+    await asyncio.gather(*(display.connect() for display in displays))
+    await asyncio.gather(*(display.ready.wait() for display in displays))
+    return displays
+
+
+async def measure_level(subscribers: int, writes: int) -> dict:
+    sent_at: dict[int, float] = {}
+    displays = await open_displays(subscribers, sent_at)
+    
+    await write_orders(writes, sent_at)
+    await wait_for(lambda: all(display.received_all() for display in displays))
+    await asyncio.sleep(SETTLE_SECONDS)
+    board = await server_board()
+    latencies = [seconds for display in displays for seconds in display.latencies()]
+    in_sync = all(display.board == board for display in displays)
+    await asyncio.gather(*(display.close() for display in displays))
+    
+    return {
+        "subscribers": subscribers,
+        "delivered": len(latencies),
+        "expected": subscribers * writes,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies, default=0.0) * 1000,
+        "in_sync": in_sync
+    }
+
+
+async def check_slow_displays() -> dict:
+    """Rajada de lotes com telas paradas; as paradas voltam a ler no fim."""
+    sent_at: dict[int, float] = {}
+    healthy = await open_displays(SLOW_PHASE_DISPLAYS, sent_at)
+    stalled = [FakeDisplay({}) for _ in range(SLOW_DISPLAYS)]
+    await asyncio.gather(*(display.connect(stalled=True) for display in stalled))
+    before = (await fetch_json("/health"))["stream"]
+    
+    await write_orders(BURST_WRITES, sent_at, bulk=BURST_ORDERS)
+    await wait_for(lambda: all(display.received_all() for display in healthy))
+    after = (await fetch_json("/health"))["stream"]
+    
+    await asyncio.gather(*(display.resume() for display in stalled))
+    await asyncio.sleep(SETTLE_SECONDS)
+    board = await server_board()
+    await wait_for(lambda: all(display.board == board for display in stalled))
+    result = {
+        "healthy_p95_ms": percentile([seconds for display in healthy for seconds in display.latencies()], 95) * 1000,
+        "resyncs": after["resyncs"] - before["resyncs"],
+        "healthy_in_sync": all(display.board == board for display in healthy),
+        "stalled_in_sync": all(display.board == board for display in stalled),
+        "stalled_snapshots": sum(display.snapshots for display in stalled)
+    }
+    await asyncio.gather(*(display.close() for display in healthy + stalled))
+    return result
+
+
+async def check_reconnect() -> dict:
+    """Tela cai, perde algumas escritas e volta com Last-Event-ID."""
+    sent_at: dict[int, float] = {}
+    display = (await open_displays(1, sent_at))[0]
+    await write_orders(1, sent_at)
+    await wait_for(display.received_all)
+    await display.close()
+    
+    await write_orders(RECONNECT_WRITES, sent_at)
+    snapshots, deltas = display.snapshots, display.deltas
+    await display.connect()
+    await wait_for(display.received_all)
+    await asyncio.sleep(SETTLE_SECONDS)
+    result = {
+        "replayed": display.deltas - deltas,
+        "snapshot_on_reconnect": display.snapshots > snapshots,
+        "in_sync": display.board == await server_board()
+    }
+    await display.close()
+    return result
+
+
+async def run(levels: list[int], writes: int) -> None:
+    print(f"{'telas':>6} {'entregas':>13} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'máx ms':>8}  quadro confere")
+    for subscribers in levels:
+        result = await measure_level(subscribers, writes)
+        print(f"{subscribers:>6} {result['delivered']:>6}/{result['expected']:<6} {result['p50_ms']:8.1f} "
+              f"{result['p95_ms']:8.1f} {result['p99_ms']:8.1f} {result['max_ms']:8.1f}  "
+              f"{'sim' if result['in_sync'] else 'NÃO'}")
+    
+    slow = await check_slow_displays()
+    print(f"\nLentos: {SLOW_DISPLAYS} telas paradas + {SLOW_PHASE_DISPLAYS} normais, "
+          f"{BURST_WRITES} lotes de {BURST_ORDERS} pedidos")
+    print(f"  p95 das normais {slow['healthy_p95_ms']:.1f} ms; {slow['resyncs']} filas estouradas; "
+          f"normais conferem: {'sim' if slow['healthy_in_sync'] else 'NÃO'}; "
+          f"paradas conferem ao voltar: {'sim' if slow['stalled_in_sync'] else 'NÃO'} "
+          f"({slow['stalled_snapshots']} snapshots)")
+    
+    reconnect = await check_reconnect()
+    print(f"Reconexão: {reconnect['replayed']} deltas reenviados, "
+          f"snapshot: {'sim' if reconnect['snapshot_on_reconnect'] else 'não'}, "
+          f"quadro confere: {'sim' if reconnect['in_sync'] else 'NÃO'}")
+
+
+def main() -> None:
+    global PORT
+    
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--subscribers", default="1,10,100")
+    parser.add_argument("--writes", type=int, default=30)
+    args = parser.parse_args()
+    
+    with temp_database():
+        db.create_orders_bulk(simulator.random_order() for _ in range(BOARD_SIZE))
+        # spawn: o servidor não herda as conexões SQLite deste processo
+        context = multiprocessing.get_context("spawn")
+        ports = context.Queue()
+        server = context.Process(target=serve_api, args=(ports, BENCH_QUEUE_SIZE), daemon=True)
+        server.start()
+        try:
+            PORT = ports.get(timeout=30)
+            asyncio.run(run([int(value) for value in args.subscribers.split(",")], args.writes))
+        finally:
+            server.terminate()
+            server.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark: custo de importar database.py a frio e do primeiro uso do banco.
+
+Cada medição roda em um interpretador novo. O import não deve tocar no
+disco; as migrações só rodam na primeira operação (uma vez por processo).
+
+Uso:
+    python benchmarks/bench_import.py [--runs N]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from _util import ROOT
+
+SNIPPETS = {
+    "interpretador vazio": "pass",
+    "import database": "import database",
+    "import + 1º uso (banco novo)": "import database; database.get_revision()",
+    "import + 1º uso (banco existente)": "import database; database.get_revision()",
+}
+
+
+def run_python(code: str, env: dict) -> float:
+    """Executa `code` em um interpretador novo e retorna o tempo em ms."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory(prefix="saka-bench-") as tmp:
+        timings = {}
+        for name, code in SNIPPETS.items():
+            samples = []
+            for run in range(args.runs):
+                if "novo" in name:
+                    db_path = Path(tmp) / f"novo-{run}.db"
+                elif "existente" in name:
+                    db_path = Path(tmp) / "existente.db"
+                else:
+                    db_path = Path(tmp) / "nunca-aberto.db"
+                env = {**os.environ, "SAKA_DB_PATH": str(db_path)}
+                samples.append(run_python(code, env))
+            timings[name] = min(samples)
+        
+        untouched = not (Path(tmp) / "nunca-aberto.db").exists()
+    
+    baseline = timings.pop("interpretador vazio")
+    for name, ms in timings.items():
+        print(f"{name:<36} {ms - baseline:8.1f} ms (além do interpretador)")
+    print(f"\nimport sem efeitos colaterais em disco: {'sim' if untouched else 'não'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Benchmark: indicadores da cozinha lidos das tabelas agregadas vs.
+calculados varrendo o histórico de pedidos a cada renderização.
+
+Uso:
+    python benchmarks/bench_kpis.py [--orders N] [--iterations N]
+"""
+
+import argparse
+
+from _util import finish_orders, temp_database, time_per_call
+
+import database as db
+import simulator
+
+# O que o painel precisaria calcular sem as tabelas agregadas (sem o p90,
+# que exigiria ainda ordenar todos os tempos de preparo)
+SQL_SCAN = """
+    SELECT source, COUNT(*), SUM(status = 'cancelado'), AVG(updated_at - created_at)
+    FROM (
+        SELECT source, status, created_at, updated_at FROM orders WHERE created_at >= ?
+        UNION ALL
+        SELECT source, status, created_at, updated_at FROM orders_archive WHERE created_at >= ?
+    )
+    GROUP BY source
+"""
+
+
+def scan_history() -> list:
+    """Agregação direta sobre pedidos quentes e arquivados das últimas 24h."""
+    since = db.now_ms() - 24 * db.MS_PER_HOUR
+    with db.pooled_connection() as conn:
+        return conn.execute(SQL_SCAN, (since, since)).fetchall()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--iterations", type=int, default=100)
+    args = parser.parse_args()
+    
+    with temp_database():
+        order_ids = db.create_orders_bulk(simulator.random_order() for _ in range(args.orders))
+        finish_orders(order_ids[: args.orders * 9 // 10])
+        db.archive_finished_orders()
+        
+        buckets = time_per_call(db.get_kitchen_kpis, args.iterations)
+        scan = time_per_call(scan_history, max(1, args.iterations // 10))
+    
+    print(f"{args.orders} pedidos nas últimas 24h (90% finalizados e arquivados)")
+    print(f"{'get_kitchen_kpis() (tabelas agregadas)':<45} {buckets:10.0f} µs")
+    print(f"{'varredura do histórico (sem p90)':<45} {scan:10.0f} µs")
+
+
+if __name__ == "__main__":
+    main()
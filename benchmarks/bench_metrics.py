@@ -0,0 +1,52 @@
+"""
+Benchmark: custo da instrumentação ligada e desligada.
+
+Mede get_all_orders() e get_revision() com a coleta desligada (funções
+originais) e ligada (histogramas), além do custo de um metrics.stage()
+vazio nos dois modos.
+
+Uso:
+    python benchmarks/bench_metrics.py [--orders N] [--iterations N]
+"""
+
+import argparse
+
+from _util import temp_database, time_per_call
+
+import database as db
+import metrics
+
+
+def empty_stage() -> None:
+    """Um trecho vazio medido com metrics.stage()."""
+    with metrics.stage("bench.empty"):
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+    
+    with temp_database():
+        db.create_orders_bulk((db.FONTE_IFOOD, f"Cliente {i}", "1x Açaí 500ml") for i in range(args.orders))
+        
+        results = {}
+        for label, switch in (("desligada", metrics.disable), ("ligada", metrics.enable)):
+            switch()
+            results[label] = {
+                "get_all_orders()": time_per_call(lambda: db.get_all_orders(), args.iterations),
+                "get_revision()": time_per_call(lambda: db.get_revision(), args.iterations),
+                "metrics.stage() vazio": time_per_call(empty_stage, args.iterations * 10)
+            }
+        metrics.disable()
+    
+    print(f"{'operação':<28} {'desligada':>12} {'ligada':>12} {'diferença':>12}")
+    for name in results["desligada"]:
+        off, on = results["desligada"][name], results["ligada"][name]
+        print(f"{name:<28} {off:9.2f} µs {on:9.2f} µs {on - off:+9.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Benchmark: lista completa com finalizados vs. uma página por chave (keyset).
+
+Uso:
+    python benchmarks/bench_pagination.py [--orders N] [--iterations N]
+"""
+
+import argparse
+
+from _util import finish_orders, temp_database, time_per_call
+
+import database as db
+import simulator
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+    
+    with temp_database():
+        order_ids = db.create_orders_bulk(simulator.random_order() for _ in range(args.orders))
+        finish_orders(order_ids[: args.orders * 9 // 10])
+        
+        # Cursor de uma página no fim do histórico
+        deep_cursor = None
+        for _ in range(args.orders // db.PAGE_SIZE - 1):
+            deep_cursor = db.get_orders_page(after=deep_cursor)["next_cursor"]
+        
+        full = time_per_call(lambda: db.get_all_orders(include_finished=True), args.iterations)
+        first = time_per_call(lambda: db.get_orders_page(), args.iterations * 10)
+        deep = time_per_call(lambda: db.get_orders_page(after=deep_cursor), args.iterations * 10)
+    
+    print(f"{args.orders} pedidos no quadro (90% finalizados), páginas de {db.PAGE_SIZE}")
+    print(f"{'get_all_orders(include_finished=True)':<42} {full:10.0f} µs")
+    print(f"{'get_orders_page() primeira página':<42} {first:10.0f} µs")
+    print(f"{'get_orders_page() última página':<42} {deep:10.0f} µs")
+
+
+if __name__ == "__main__":
+    main()
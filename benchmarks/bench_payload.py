@@ -0,0 +1,63 @@
+"""
+Benchmark: bytes enviados ao navegador por rerun completo, antes e depois
+do tema estático e do header constante.
+
+Antes, cada rerun reenviava o bloco <style> inteiro e um header com a data
+embutida. Agora vai só a tag <link> (o CSS fica no cache do navegador) e o
+header é sempre idêntico, então o iframe do relógio não é remontado.
+A grade de pedidos (modo TV) entra na conta para dar a proporção.
+
+Uso:
+    python benchmarks/bench_payload.py [--orders N]
+"""
+
+import argparse
+import hashlib
+
+from _util import ROOT
+
+import board_render
+import database as db
+import simulator
+
+THEME_CSS = (ROOT / "static" / "theme.css").read_text(encoding="utf-8")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=50)
+    args = parser.parse_args()
+    
+    # Lê o HEADER_HTML de app.py sem executar o Streamlit
+    source = (ROOT / "app.py").read_text(encoding="utf-8")
+    header = source.split('HEADER_HTML = """', 1)[1].split('"""', 1)[0]
+    
+    now = db.now_ms()
+    orders = [
+        {"id": i + 1, "source": source_name, "client_name": client, "description": description,
+         "status": db.STATUS_NOVO, "created_at": now - i * 60_000}
+        for i, (source_name, client, description) in enumerate(
+            simulator.random_order() for _ in range(args.orders)
+        )
+    ]
+    grid = len(board_render.render_board_html(orders).encode())
+    
+    version = hashlib.sha1(THEME_CSS.encode()).hexdigest()[:10]
+    css_before = len(f"<style>\n{THEME_CSS}</style>".encode())
+    css_after = len(f'<link rel="stylesheet" href="app/static/theme.css?v={version}">'.encode())
+    header_bytes = len(header.encode())
+    
+    before = css_before + header_bytes + grid
+    after = css_after + header_bytes + grid
+    
+    print(f"Rerun completo com {args.orders} pedidos (modo TV)")
+    print(f"{'':<22} {'antes':>10} {'depois':>10}")
+    print(f"{'tema CSS':<22} {css_before:>8} B {css_after:>8} B")
+    print(f"{'header (iframe)':<22} {header_bytes:>8} B {header_bytes:>8} B  (depois: idêntico, sem remontar)")
+    print(f"{'grade de pedidos':<22} {grid:>8} B {grid:>8} B")
+    print(f"{'total':<22} {before:>8} B {after:>8} B  ({(after - before) / before:+.0%})")
+    print(f"\nCSS baixado uma vez por sessão e depois servido do cache: {len(THEME_CSS.encode())} B")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark: painel "O que preparar" lido de `order_items` vs. reinterpretar
+as descrições dos pedidos pendentes a cada renderização.
+
+A reinterpretação é medida sem cache (o que cada render faria) e com o
+cache de `parse_description`; em ambos os casos ainda é preciso ler as
+descrições e somar em Python.
+
+Uso:
+    python benchmarks/bench_prep.py [--iterations N]
+"""
+
+import argparse
+
+from _util import temp_database, time_per_call
+
+import database as db
+import simulator
+from item_parser import parse_description
+
+PENDING_SIZES = (50, 200, 1_000)
+
+
+def reparse_pending(parse) -> dict:
+    """Lê as descrições pendentes e soma itens e coberturas em Python."""
+    with db.pooled_connection() as conn:
+        rows = conn.execute(
+            "SELECT description FROM orders WHERE status_rank <= ?", (db.PREP_MAX_RANK,)
+        ).fetchall()
+    
+    items: dict[tuple, int] = {}
+    toppings: dict[str, int] = {}
+    for (description,) in rows:
+        for item in parse(description):
+            key = (item.product, item.size_ml)
+            items[key] = items.get(key, 0) + item.quantity
+            for topping in item.toppings:
+                toppings[topping] = toppings.get(topping, 0) + item.quantity
+    return {"items": items, "toppings": toppings}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=100)
+    args = parser.parse_args()
+    
+    uncached = parse_description.__wrapped__
+    
+    print(f"{'pendentes':>10} {'order_items':>13} {'parse s/ cache':>15} {'parse c/ cache':>15}")
+    for size in PENDING_SIZES:
+        with temp_database():
+            db.create_orders_bulk(simulator.random_order() for _ in range(size))
+            
+            stored = time_per_call(db.get_prep_summary, args.iterations)
+            raw = time_per_call(lambda: reparse_pending(uncached), args.iterations)
+            cached = time_per_call(lambda: reparse_pending(parse_description), args.iterations)
+            print(f"{size:>10} {stored:10.0f} µs {raw:12.0f} µs {cached:12.0f} µs")
+    
+    info = parse_description.cache_info()
+    print(f"\nCache de parse_description: {info.hits} acertos, {info.misses} faltas "
+          f"({info.currsize} descrições distintas)")
+
+
+if __name__ == "__main__":
+    main()
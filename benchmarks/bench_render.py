@@ -0,0 +1,142 @@
+"""
+Benchmark: montagem do quadro card a card vs. grade em HTML único com cache.
+
+Mede, para 10, 50 e 200 pedidos ativos:
+- o HTML montado como no loop antigo (um st.markdown por card);
+- o tempo decorrido com parsing ISO card a card vs. epoch ms em lote;
+- render_board_html() com o cache de cards vazio e já aquecido;
+- se o Streamlit estiver instalado, o tempo de uma execução completa do
+  app.py via AppTest nos dois modos (cards + botões vs. modo TV).
+
+Uso:
+    python benchmarks/bench_render.py [--iterations N]
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from _util import ROOT, temp_database, time_per_call
+
+import board_render
+import database as db
+import simulator
+
+SIZES = (10, 50, 200)
+
+
+def legacy_cards(orders: list[dict]) -> list[str]:
+    """Reproduz o HTML do loop antigo: um f-string (e um elemento) por card."""
+    cards = []
+    for order in orders:
+        elapsed_time, time_class = board_render.format_minutes(
+            board_render.elapsed_minutes(order["created_at"], db.now_ms())
+        )
+        cards.append(f"""
+        <div class="order-card status-{order['status']}">
+            <div class="order-header">
+                <span class="order-id">#{order['id']:03d}</span>
+                <span class="order-source source-{order['source']}">{order['source']}</span>
+            </div>
+            <div class="order-client">👤 {order['client_name']}</div>
+            <div class="order-description">{order['description']}</div>
+            <div class="order-footer">
+                <div class="order-time">
+                    <span class="time-icon">⏱️</span>
+                    <span class="time-value {time_class}">{elapsed_time}</span>
+                </div>
+                <span class="status-badge badge-{order['status']}">{order['status']}</span>
+            </div>
+        </div>
+        """)
+    return cards
+
+
+def make_orders(count: int) -> list[dict]:
+    """Pedidos sintéticos no formato de db.get_all_orders()."""
+    now = db.now_ms()
+    return [
+        {"id": i + 1, "source": source, "client_name": client, "description": description,
+         "status": db.STATUS_NOVO, "created_at": now - i * 45_000}
+        for i, (source, client, description) in enumerate(
+            simulator.random_order() for _ in range(count)
+        )
+    ]
+
+
+def iso_elapsed(created_ats: list[str]) -> list[tuple[str, str]]:
+    """Formato antigo: fromisoformat + datetime.now() para cada card."""
+    results = []
+    for created_at in created_ats:
+        seconds = (datetime.now() - datetime.fromisoformat(created_at)).total_seconds()
+        results.append(board_render.format_minutes(max(0, int(seconds // 60))))
+    return results
+
+
+def batched_elapsed(orders: list[dict]) -> list[tuple[str, str]]:
+    """Formato atual: inteiros, um único `now` para o quadro inteiro."""
+    return [board_render.format_minutes(m) for m in board_render.board_elapsed_minutes(orders)]
+
+
+def bench_apptest(count: int) -> dict[str, float]:
+    """Tempo de uma execução do app.py (ms) em cada modo, se o Streamlit existir."""
+    from streamlit.testing.v1 import AppTest
+    
+    results = {}
+    with temp_database():
+        db.create_orders_bulk(simulator.random_order() for _ in range(count))
+        for compact in (False, True):
+            app = AppTest.from_file(str(ROOT / "app.py"), default_timeout=60)
+            app.session_state["compact_mode"] = compact
+            app.run()
+            start = time.perf_counter()
+            app.run()
+            results["modo TV" if compact else "cards + botões"] = (time.perf_counter() - start) * 1000
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    
+    for count in SIZES:
+        orders = make_orders(count)
+        legacy = time_per_call(lambda: legacy_cards(orders), args.iterations)
+        
+        def cold():
+            board_render.render_card.cache_clear()
+            board_render.render_board_html(orders)
+        
+        cold_time = time_per_call(cold, args.iterations)
+        warm_time = time_per_call(lambda: board_render.render_board_html(orders), args.iterations)
+        
+        iso_dates = [
+            (datetime.now() - timedelta(seconds=i * 45)).isoformat() for i in range(count)
+        ]
+        iso_time = time_per_call(lambda: iso_elapsed(iso_dates), args.iterations)
+        batched_time = time_per_call(lambda: batched_elapsed(orders), args.iterations)
+        
+        legacy_bytes = sum(len(card.encode()) for card in legacy_cards(orders))
+        batched_bytes = len(board_render.render_board_html(orders).encode())
+        
+        print(f"{count:>4} pedidos | loop antigo {legacy:8.1f} µs ({count} elementos + até {count * 4} botões, "
+              f"{legacy_bytes / 1024:.1f} KiB) | HTML único frio {cold_time:8.1f} µs, "
+              f"com cache {warm_time:8.1f} µs (1 elemento + {count} controles, {batched_bytes / 1024:.1f} KiB)")
+        print(f"{'':>4}         | tempo decorrido: ISO card a card {iso_time:8.1f} µs, "
+              f"epoch ms em lote {batched_time:8.1f} µs")
+    
+    try:
+        import streamlit  # noqa: F401
+    except ImportError:
+        print("\nStreamlit não instalado: medição de execução completa do app ignorada")
+        return
+    
+    print("\nExecução completa do app.py (AppTest):")
+    for count in SIZES:
+        timings = bench_apptest(count)
+        print(f"{count:>4} pedidos | " + " | ".join(f"{mode}: {ms:.0f} ms" for mode, ms in timings.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark: busca textual com FTS5 vs. LIKE '%...%' conforme cresce o histórico.
+
+O LIKE para cedo quando o termo aparece em quase todo pedido ("açaí"), mas
+varre o histórico inteiro quando a busca é seletiva (um cliente específico,
+um item que ninguém pediu) — justamente o caso do balcão. O FTS5 responde
+pelo índice invertido e ranqueia no máximo `SEARCH_CANDIDATES` pedidos.
+
+Uso:
+    python benchmarks/bench_search.py [--iterations N]
+"""
+
+import argparse
+
+from _util import finish_orders, temp_database, time_per_call
+
+import database as db
+import simulator
+
+HISTORY_SIZES = (1_000, 10_000, 50_000)
+
+# Termo comum, nome de cliente frequente, pedido único antigo e nenhum resultado
+QUERIES = ("açaí", "amanda", "joana prado", "pistache")
+
+SQL_LIKE = """
+    SELECT id FROM (
+        SELECT id, client_name, description FROM orders
+        UNION ALL
+        SELECT id, client_name, description FROM orders_archive
+    )
+    WHERE (client_name || ' ' || description) LIKE ?
+    ORDER BY id DESC
+    LIMIT ?
+"""
+
+
+def like_search(text: str) -> list:
+    """Alternativa sem índice: varre quadro e arquivo com LIKE (sensível a acentos)."""
+    with db.pooled_connection() as conn:
+        return conn.execute(SQL_LIKE, (f"%{text}%", db.SEARCH_LIMIT)).fetchall()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+    
+    print(f"{'histórico':>10} {'consulta':<16} {'FTS5':>10} {'LIKE':>10}")
+    for size in HISTORY_SIZES:
+        with temp_database():
+            # O pedido mais antigo do histórico: o LIKE só o encontra no fim da varredura
+            db.create_order(db.FONTE_WHATSAPP, "Joana Prado", "1x Açaí 300ml com banana")
+            order_ids = db.create_orders_bulk(simulator.random_order() for _ in range(size))
+            finish_orders(order_ids[: size * 9 // 10])
+            db.archive_finished_orders()
+            
+            for query in QUERIES:
+                fts = time_per_call(lambda: db.search_orders(query), args.iterations)
+                like = time_per_call(lambda: like_search(query), args.iterations)
+                print(f"{size:>10} {query:<16} {fts:7.0f} µs {like:7.0f} µs")
+
+
+if __name__ == "__main__":
+    main()
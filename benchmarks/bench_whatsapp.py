@@ -0,0 +1,109 @@
+"""
+Benchmark: extração de conversas do WhatsApp em linha vs. pipeline com
+pool de workers e cache por conteúdo.
+
+O extrator substituto recebe uma pausa (`--delay`) que imita o tempo de
+resposta da IA. "Em linha" é o que um handler ingênuo faria: extrair e
+gravar uma mensagem de cada vez, na mesma thread. Enquanto cada cenário
+roda, uma thread lê o quadro (`db.get_all_orders`) para mostrar que a
+extração não o atrasa.
+
+Uso:
+    python benchmarks/bench_whatsapp.py [--messages N] [--delay S]
+"""
+
+import argparse
+import functools
+import random
+import threading
+import time
+
+from _util import percentile, temp_database
+
+import database as db
+import simulator
+from whatsapp_pipeline import WhatsAppPipeline, extract_standin, to_order
+
+
+def unique_messages(count: int) -> list[str]:
+    """Conversas todas diferentes (sem acerto de cache)."""
+    return [f"{simulator.whatsapp_chat_message()}\n(atendimento {index})" for index in range(count)]
+
+
+def repeated_messages(count: int) -> list[str]:
+    """Conversas sorteadas dos modelos do simulador (repetem bastante)."""
+    return [simulator.whatsapp_chat_message() for _ in range(count)]
+
+
+def run_inline(messages: list[str], extractor) -> list[float]:
+    """Extrai e grava uma mensagem por vez; devolve a latência de cada uma."""
+    start = time.perf_counter()
+    latencies = []
+    for message in messages:
+        db.create_order(*to_order(extractor(message)))
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def run_pipeline(messages: list[str], extractor, workers: int, cache_size: int) -> list[float]:
+    """Enfileira tudo de uma vez no pipeline; devolve quando cada pedido ficou gravado."""
+    pipeline = WhatsAppPipeline(extractor=extractor, workers=workers, cache_size=cache_size).start()
+    start = time.perf_counter()
+    latencies: list[float] = []
+    futures = [pipeline.submit(message) for message in messages]
+    for future in futures:
+        future.add_done_callback(lambda _: latencies.append(time.perf_counter() - start))
+    for future in futures:
+        future.result()
+    pipeline.stop()
+    return latencies
+
+
+def board_reader(stop: threading.Event, samples: list[float]) -> None:
+    """Lê o quadro continuamente, guardando a latência de cada leitura."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        db.get_all_orders()
+        samples.append(time.perf_counter() - start)
+        time.sleep(0.005)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--delay", type=float, default=0.02, help="Tempo de resposta simulado da IA (s)")
+    args = parser.parse_args()
+    
+    random.seed(7)
+    extractor = functools.partial(extract_standin, delay=args.delay)
+    scenarios = [
+        ("em linha", unique_messages, lambda messages: run_inline(messages, extractor)),
+        ("pipeline 1 worker", unique_messages, lambda messages: run_pipeline(messages, extractor, 1, 0)),
+        ("pipeline 4 workers", unique_messages, lambda messages: run_pipeline(messages, extractor, 4, 0)),
+        ("pipeline 8 workers", unique_messages, lambda messages: run_pipeline(messages, extractor, 8, 0)),
+        ("pipeline 8 + cache", repeated_messages, lambda messages: run_pipeline(messages, extractor, 8, 4096))
+    ]
+    
+    print(f"{args.messages} mensagens, IA simulada com {args.delay * 1000:.0f} ms por extração")
+    print(f"{'cenário':<22} {'msgs/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'quadro p95 ms':>14}")
+    for name, make_messages, run in scenarios:
+        messages = make_messages(args.messages)
+        with temp_database():
+            stop = threading.Event()
+            board_samples: list[float] = []
+            reader = threading.Thread(target=board_reader, args=(stop, board_samples))
+            reader.start()
+            
+            start = time.perf_counter()
+            latencies = run(messages)
+            elapsed = time.perf_counter() - start
+            
+            stop.set()
+            reader.join()
+        
+        print(f"{name:<22} {len(messages) / elapsed:8.0f} {percentile(latencies, 50) * 1000:9.1f} "
+              f"{percentile(latencies, 95) * 1000:9.1f} {percentile(board_samples, 95) * 1000:14.2f}")
+
+
+if __name__ == "__main__":
+    main()
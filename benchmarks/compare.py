@@ -0,0 +1,61 @@
+"""
+Compara dois resultados JSON de benchmarks/load_test.py (ex.: main vs. branch).
+
+Uso:
+    python benchmarks/compare.py base.json novo.json [--threshold 20]
+
+Sai com código 1 se alguma operação piorar mais que --threshold por cento
+em p95 ou em vazão.
+"""
+
+import argparse
+import json
+import sys
+
+
+def change(old: float, new: float) -> float:
+    """Variação percentual de `old` para `new`."""
+    return (new - old) / old * 100 if old else 0.0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=20.0, help="Piora tolerada em %%")
+    args = parser.parse_args()
+    
+    with open(args.base, encoding="utf-8") as file:
+        base = json.load(file)
+    with open(args.new, encoding="utf-8") as file:
+        new = json.load(file)
+    
+    print(f"base: {base['meta']['commit']}  novo: {new['meta']['commit']}\n")
+    print(f"{'operação':<20} {'ops/s':>18} {'p50 ms':>18} {'p95 ms':>18} {'p99 ms':>18}")
+    
+    regressions = []
+    for name in sorted(set(base["results"]) | set(new["results"])):
+        old_stats = base["results"].get(name)
+        new_stats = new["results"].get(name)
+        if old_stats is None or new_stats is None:
+            print(f"{name:<20} (presente em apenas um dos resultados)")
+            continue
+        
+        cells = []
+        for key in ("ops_per_second", "p50_ms", "p95_ms", "p99_ms"):
+            cells.append(f"{new_stats[key]:9.2f} ({change(old_stats[key], new_stats[key]):+5.0f}%)")
+        print(f"{name:<20} " + " ".join(f"{cell:>18}" for cell in cells))
+        
+        if change(old_stats["p95_ms"], new_stats["p95_ms"]) > args.threshold:
+            regressions.append(f"{name}: p95")
+        if -change(old_stats["ops_per_second"], new_stats["ops_per_second"]) > args.threshold:
+            regressions.append(f"{name}: vazão")
+    
+    if regressions:
+        print(f"\nRegressões acima de {args.threshold:.0f}%: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""
+Teste de carga: cargas mistas sobre database.py usando as massas do simulador.
+
+Cada worker (thread, opcionalmente em vários processos) sorteia operações
+conforme os pesos de --mix:
+
+    create_burst       rajada de --burst-size pedidos via create_order()
+    status_transition  avança um pedido criado pelo worker (novo -> ... -> saiu) via CAS
+    board_read         get_all_orders() + get_orders_count_by_status()
+
+Além disso, o primeiro worker chama clear_old_orders(hours=0) a cada
+--clear-every segundos (operação clear_old).
+
+Uso:
+    python benchmarks/load_test.py [--threads 4] [--processes 1] [--duration 10]
+                                   [--mix create_burst=2,status_transition=5,board_read=10]
+                                   [--output resultado.json]
+
+O JSON salvo pode ser comparado entre commits com benchmarks/compare.py.
+"""
+
+import argparse
+import json
+import multiprocessing
+import platform
+import random
+import sqlite3
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+from _util import ROOT, summarize_latencies, temp_database
+
+import database as db
+import simulator
+
+DEFAULT_MIX = "create_burst=2,status_transition=5,board_read=10"
+
+# Próximo status de cada pedido durante a transição
+NEXT_STATUS = {
+    db.STATUS_NOVO: db.STATUS_PREPARANDO,
+    db.STATUS_PREPARANDO: db.STATUS_PRONTO,
+    db.STATUS_PRONTO: db.STATUS_SAIU
+}
+
+# Chance de um pedido ser cancelado em vez de avançar
+CANCEL_PROBABILITY = 0.05
+
+
+def parse_mix(text: str) -> dict[str, float]:
+    """Converte 'op=peso,op=peso' em dicionário."""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def run_worker(worker_id: int, duration: float, mix: dict[str, float], burst_size: int,
+               clear_every: float, seed: int) -> dict:
+    """
+    Executa operações sorteadas até o fim do tempo.
+    
+    Returns:
+        {"latencies": {op: [segundos, ...]}, "errors": {op: n}}
+    """
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    latencies: dict[str, list[float]] = {}
+    errors: dict[str, int] = {}
+    my_orders: dict[int, str] = {}  # pedidos deste worker e seu status atual
+    
+    def create_burst():
+        for _ in range(burst_size):
+            order_id = db.create_order(*rng.choice(simulator.RANDOM_ORDER_FACTORIES)())
+            my_orders[order_id] = db.STATUS_NOVO
+    
+    def status_transition():
+        if not my_orders:
+            create_burst()
+            return
+        order_id = rng.choice(list(my_orders))
+        status = my_orders[order_id]
+        new_status = db.STATUS_CANCELADO if rng.random() < CANCEL_PROBABILITY else NEXT_STATUS[status]
+        db.transition_order(order_id, status, new_status)
+        if new_status in db.FINISHED_STATUSES:
+            del my_orders[order_id]
+        else:
+            my_orders[order_id] = new_status
+    
+    def board_read():
+        db.get_all_orders()
+        db.get_orders_count_by_status()
+    
+    operations = {
+        "create_burst": create_burst,
+        "status_transition": status_transition,
+        "board_read": board_read,
+        "clear_old": lambda: db.clear_old_orders(hours=0)
+    }
+    
+    deadline = time.perf_counter() + duration
+    next_clear = time.perf_counter() + clear_every if clear_every and worker_id == 0 else None
+    
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        if next_clear is not None and time.perf_counter() >= next_clear:
+            name = "clear_old"
+            next_clear += clear_every
+        
+        start = time.perf_counter()
+        try:
+            operations[name]()
+        except sqlite3.OperationalError:
+            errors[name] = errors.get(name, 0) + 1
+            continue
+        latencies.setdefault(name, []).append(time.perf_counter() - start)
+    
+    db.close_connections()
+    return {"latencies": latencies, "errors": errors}
+
+
+def run_process(process_id: int, threads: int, duration: float, mix: dict[str, float],
+                burst_size: int, clear_every: float, seed: int) -> dict:
+    """Executa `threads` workers em paralelo e junta os resultados."""
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = [
+            pool.submit(run_worker, process_id * threads + i, duration, mix, burst_size,
+                        clear_every, seed + process_id * 1000 + i)
+            for i in range(threads)
+        ]
+        results = [future.result() for future in futures]
+    return merge_results(results)
+
+
+def merge_results(results: list[dict]) -> dict:
+    """Concatena latências e soma erros de vários workers."""
+    merged = {"latencies": {}, "errors": {}}
+    for result in results:
+        for name, values in result["latencies"].items():
+            merged["latencies"].setdefault(name, []).extend(values)
+        for name, count in result["errors"].items():
+            merged["errors"][name] = merged["errors"].get(name, 0) + count
+    return merged
+
+
+def git_commit() -> str:
+    """Commit atual do repositório (ou 'desconhecido')."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecido"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Teste de carga do Saka Delivery KDS")
+    parser.add_argument("--threads", type=int, default=4, help="Threads por processo")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=10, help="Duração em segundos")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Pesos das operações")
+    parser.add_argument("--burst-size", type=int, default=5, help="Pedidos por create_burst")
+    parser.add_argument("--clear-every", type=float, default=2.0, help="Segundos entre clear_old (0 desliga)")
+    parser.add_argument("--initial-orders", type=int, default=100, help="Pedidos ativos antes de começar")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Arquivo JSON para salvar o resultado")
+    args = parser.parse_args()
+    
+    mix = parse_mix(args.mix)
+    worker_args = (args.threads, args.duration, mix, args.burst_size, args.clear_every, args.seed)
+    
+    with temp_database():
+        db.create_orders_bulk(simulator.random_order() for _ in range(args.initial_orders))
+        
+        start = time.perf_counter()
+        if args.processes > 1:
+            # spawn: cada processo abre suas próprias conexões (nada herdado via fork)
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=args.processes, mp_context=context) as pool:
+                futures = [pool.submit(run_process, p, *worker_args) for p in range(args.processes)]
+                merged = merge_results([future.result() for future in futures])
+        else:
+            merged = run_process(0, *worker_args)
+        elapsed = time.perf_counter() - start
+    
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version
+        },
+        "config": {
+            "threads": args.threads,
+            "processes": args.processes,
+            "duration": args.duration,
+            "mix": mix,
+            "burst_size": args.burst_size,
+            "clear_every": args.clear_every,
+            "initial_orders": args.initial_orders
+        },
+        "results": {
+            name: {**summarize_latencies(values, elapsed), "errors": merged["errors"].get(name, 0)}
+            for name, values in sorted(merged["latencies"].items())
+        }
+    }
+    
+    print(f"{'operação':<20} {'ops/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'erros':>6}")
+    for name, stats in report["results"].items():
+        print(f"{name:<20} {stats['ops_per_second']:10.1f} {stats['p50_ms']:9.2f} "
+              f"{stats['p95_ms']:9.2f} {stats['p99_ms']:9.2f} {stats['errors']:6d}")
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2, ensure_ascii=False)
+        print(f"\nResultado salvo em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
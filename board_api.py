@@ -0,0 +1,402 @@
+"""
+Saka Delivery KDS - API JSON do Quadro
+Serve o quadro ativo, as contagens e as mudanças de status por HTTP, para
+tablets dos entregadores e telas que não precisam da interface Streamlit
+
+Uso:
+    python board_api.py serve [--host 0.0.0.0] [--port 8503]
+    python board_api.py loadtest [--pollers 10,100,500,1000] [--interval 1] [--duration 10]
+
+Rotas:
+    GET  /orders              quadro ativo: {"revision", "orders", "counts"}
+    GET  /orders/counts       contagem por status: {"revision", "counts"}
+    GET  /orders/{id}         um pedido (ativo ou arquivado)
+    POST /orders/{id}/status  {"from": status mostrado, "to": novo status}
+    GET  /transitions         máquina de estados (status -> destinos)
+    GET  /events              mudanças do quadro por Server-Sent Events (ver board_stream.py)
+    GET  /health              estatísticas da API
+
+As rotas do quadro respondem com `ETag` derivado da revisão do banco. Um
+GET com `If-None-Match` igual à revisão atual recebe 304 sem corpo. A
+revisão vem do `OrderStore`, que só consulta o SQLite (`PRAGMA
+data_version`) a cada `WATCH_INTERVAL_SECONDS`; fora disso, o 304 é
+respondido da memória. O JSON de cada rota é serializado uma vez por
+revisão e reaproveitado por todos os clientes.
+
+Telas que preferem receber as mudanças a consultar usam `/events`: a
+mesma verificação de mudanças do store alimenta todas as conexões.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import threading
+import time
+from typing import Optional
+
+import database as db
+import metrics
+import simulator
+from board_stream import WATCH_INTERVAL_SECONDS, BoardStream
+from http_server import method_not_allowed, read_headers, serve_connection
+from order_store import OrderStore
+
+DEFAULT_PORT = 8503
+
+# Carga do teste: pedidos ativos no início e escritas por segundo durante o teste
+LOADTEST_BOARD_SIZE = 60
+LOADTEST_WRITES_PER_SECOND = 0.5
+
+
+# ============================================================================
+# SERVIDOR
+# ============================================================================
+
+class BoardAPI:
+    """
+    Servidor HTTP/1.1 (keep-alive) sobre um `OrderStore`.
+    
+    Leituras vêm do store e mudanças de status passam por ele; as duas
+    rodam em uma thread (`asyncio.to_thread`), pois o refresh do store lê
+    o SQLite e a mudança de status grava nele.
+    
+    O corpo de `/orders` e `/orders/counts` fica em cache por revisão: a
+    primeira requisição depois de uma mudança serializa o JSON e as
+    seguintes (de qualquer cliente) reenviam os mesmos bytes.
+    
+    O store padrão verifica mudanças a cada `WATCH_INTERVAL_SECONDS`, o
+    ritmo em que o `BoardStream` empurra deltas para `/events`.
+    """
+    
+    def __init__(self, store: Optional[OrderStore] = None):
+        self.store = store or OrderStore(check_interval=WATCH_INTERVAL_SECONDS)
+        self.stream = BoardStream(self.store)
+        self.stats = {
+            "requests": 0, "not_modified": 0, "rendered": 0,
+            "transitions": 0, "conflicts": 0
+        }
+        # rota -> (revisão, etag, corpo JSON)
+        self._cache: dict[str, tuple[int, str, bytes]] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+    
+    async def start(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> int:
+        """Inicia o servidor HTTP. Retorna a porta efetiva."""
+        await self.stream.start()
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server.sockets[0].getsockname()[1]
+    
+    async def stop(self) -> None:
+        """Para de aceitar conexões e encerra as conexões de `/events`."""
+        await self.stream.stop()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+    
+    async def _revision(self) -> int:
+        """Revisão atual do store (o refresh pode ler o banco)."""
+        return await asyncio.to_thread(lambda: self.store.revision)
+    
+    async def _board_body(self, route: str) -> tuple[str, bytes]:
+        """ETag e JSON da rota na revisão atual, serializando só se a revisão mudou."""
+        revision = await self._revision()
+        cached = self._cache.get(route)
+        if cached is None or cached[0] != revision:
+            board = await asyncio.to_thread(self.store.get_board)
+            revision = board["revision"]
+            payload = board if route == "/orders" else {"revision": revision, "counts": board["counts"]}
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            cached = self._cache[route] = (revision, f'"{revision}"', body)
+            self.stats["rendered"] += 1
+        return cached[1], cached[2]
+    
+    async def _route(
+        self,
+        method: str,
+        path: str,
+        headers: dict[str, str],
+        body: bytes
+    ) -> tuple[int, object, dict[str, str]]:
+        """Despacha uma requisição e retorna (status HTTP, corpo JSON, cabeçalhos extras)."""
+        self.stats["requests"] += 1
+        if path in ("/orders", "/orders/counts"):
+            if method != "GET":
+                return method_not_allowed("GET")
+            etag, payload = await self._board_body(path)
+            extra = {"ETag": etag, "Cache-Control": "no-cache"}
+            if _etag_matches(headers.get("if-none-match"), etag):
+                self.stats["not_modified"] += 1
+                return 304, None, extra
+            return 200, payload, extra
+        
+        if path == "/events":
+            # GET /events é atendido pelo stream antes de chegar aqui
+            return method_not_allowed("GET")
+        
+        if path == "/transitions":
+            if method != "GET":
+                return method_not_allowed("GET")
+            return 200, db.STATUS_TRANSITIONS, {}
+        
+        if path == "/health":
+            if method != "GET":
+                return method_not_allowed("GET")
+            return 200, {
+                "status": "ok",
+                "revision": await self._revision(),
+                **self.stats,
+                "stream": self.stream.snapshot_stats()
+            }, {}
+        
+        parts = path.strip("/").split("/")
+        if parts[0] != "orders" or len(parts) not in (2, 3) or not parts[1].isdigit():
+            return 404, {"error": "Rota não encontrada"}, {}
+        order_id = int(parts[1])
+        
+        if len(parts) == 2:
+            if method != "GET":
+                return method_not_allowed("GET")
+            order = await asyncio.to_thread(self.store.get_order, order_id)
+            if order is None:
+                return 404, {"error": "Pedido não encontrado"}, {}
+            return 200, order, {}
+        
+        if parts[2] != "status":
+            return 404, {"error": "Rota não encontrada"}, {}
+        if method != "POST":
+            return method_not_allowed("POST")
+        return await self._route_transition(order_id, body)
+    
+    async def _route_transition(self, order_id: int, body: bytes) -> tuple[int, dict, dict[str, str]]:
+        """Compare-and-set do status: 200, 404, 409 (status mudou) ou 422 (transição inválida)."""
+        try:
+            payload = json.loads(body or b"null")
+        except json.JSONDecodeError:
+            return 400, {"error": "JSON inválido"}, {}
+        expected = payload.get("from") if isinstance(payload, dict) else None
+        new_status = payload.get("to") if isinstance(payload, dict) else None
+        if not isinstance(expected, str) or not isinstance(new_status, str):
+            return 422, {"error": "Campos obrigatórios: from, to"}, {}
+        
+        try:
+            result = await asyncio.to_thread(self.store.transition_order, order_id, expected, new_status)
+        except ValueError as exc:
+            return 422, {"error": str(exc)}, {}
+        
+        if result["updated"]:
+            self.stats["transitions"] += 1
+            return 200, {"order_id": order_id, "status": new_status, "revision": await self._revision()}, {}
+        
+        current = result["conflicts"].get(order_id)
+        if current is None:
+            return 404, {"error": "Pedido não encontrado no quadro"}, {}
+        self.stats["conflicts"] += 1
+        return 409, {"error": "O pedido mudou de status", "order_id": order_id, "status": current}, {}
+    
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Atende requisições HTTP/1.1 (com keep-alive); `/events` passa a conexão ao stream."""
+        await serve_connection(reader, writer, self._route, streams={"/events": self.stream.serve})
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    """Compara `If-None-Match` (lista separada por vírgulas, `*` ou ETags fracas) com a ETag atual."""
+    if not header:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in tags or etag in tags
+
+
+# ============================================================================
+# TESTE DE CARGA (TABLETS CONSULTANDO O QUADRO)
+# ============================================================================
+
+async def run_poller(host: str, port: int, interval: float, end: float, latencies: list[float], statuses: dict) -> None:
+    """
+    Consulta GET /orders a cada `interval` segundos, como um tablet.
+    
+    Reenvia a última ETag em `If-None-Match`, então só baixa o quadro
+    quando ele mudou. Começa em um instante aleatório do primeiro intervalo
+    para não sincronizar com os outros clientes.
+    """
+    loop = asyncio.get_running_loop()
+    await asyncio.sleep(random.uniform(0, interval))
+    reader, writer = await asyncio.open_connection(host, port)
+    etag = ""
+    next_poll = loop.time()
+    
+    try:
+        while loop.time() < end:
+            request = f"GET /orders HTTP/1.1\r\nHost: {host}\r\n"
+            if etag:
+                request += f"If-None-Match: {etag}\r\n"
+            
+            start = time.perf_counter()
+            writer.write((request + "\r\n").encode("latin-1"))
+            await writer.drain()
+            status = (await reader.readline()).split(b" ", 2)[1].decode()
+            headers = await read_headers(reader)
+            await reader.readexactly(int(headers.get("content-length", 0)))
+            latencies.append(time.perf_counter() - start)
+            
+            statuses[status] = statuses.get(status, 0) + 1
+            etag = headers.get("etag", etag)
+            next_poll += interval
+            await asyncio.sleep(max(0.0, next_poll - loop.time()))
+    finally:
+        writer.close()
+
+
+def _kitchen_writer(stop: threading.Event, writes_per_second: float) -> None:
+    """
+    Uma escrita por tick: cria um pedido ou avança o mais antigo de um status.
+    
+    Cada pedido passa por três transições até sair, então criar em 1/4 dos
+    ticks mantém o tamanho do quadro mais ou menos estável.
+    """
+    while not stop.wait(1 / writes_per_second):
+        if random.random() < 0.25:
+            db.create_order(*simulator.random_order())
+            continue
+        status = random.choice((db.STATUS_NOVO, db.STATUS_PREPARANDO, db.STATUS_PRONTO))
+        oldest = next((order for order in db.get_all_orders() if order["status"] == status), None)
+        if oldest is not None:
+            db.transition_order(oldest["id"], status, db.STATUS_TRANSITIONS[status][0])
+
+
+def _serve_process(host: str, ports: multiprocessing.Queue) -> None:
+    """Processo do servidor no teste de carga: informa a porta e serve até ser encerrado."""
+    async def serve() -> None:
+        api = BoardAPI()
+        ports.put(await api.start(host, 0))
+        await asyncio.Event().wait()
+    
+    asyncio.run(serve())
+
+
+async def _fetch_json(host: str, port: int, path: str) -> dict:
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode("latin-1"))
+    await reader.readline()
+    headers = await read_headers(reader)
+    body = await reader.readexactly(int(headers.get("content-length", 0)))
+    writer.close()
+    return json.loads(body)
+
+
+async def _poll_level(host: str, port: int, pollers: int, interval: float, duration: float) -> dict:
+    """Roda `pollers` clientes por `duration` segundos e resume o que o servidor entregou."""
+    loop = asyncio.get_running_loop()
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+    before = await _fetch_json(host, port, "/health")
+    
+    end = loop.time() + duration
+    await asyncio.gather(*(run_poller(host, port, interval, end, latencies, statuses) for _ in range(pollers)))
+    after = await _fetch_json(host, port, "/health")
+    
+    target = pollers / interval
+    # Cada cliente faz em média duration / interval consultas dentro da janela
+    served = len(latencies) / duration
+    return {
+        "pollers": pollers,
+        "target_rps": target,
+        "served_rps": served,
+        "not_modified": statuses.get("304", 0),
+        "full": statuses.get("200", 0),
+        "errors": sum(count for status, count in statuses.items() if status not in ("200", "304")),
+        "rendered": after["rendered"] - before["rendered"],
+        "p50_ms": metrics.percentile(latencies, 50) * 1000,
+        "p95_ms": metrics.percentile(latencies, 95) * 1000,
+        "p99_ms": metrics.percentile(latencies, 99) * 1000,
+        # Acompanha o ritmo pedido e responde bem antes do próximo poll
+        "keeps_up": served >= 0.95 * target and metrics.percentile(latencies, 95) < interval / 2
+    }
+
+
+def run_load_test(levels: list[int], interval: float, duration: float, writes: float) -> list[dict]:
+    """
+    Sobe a API em um processo próprio, sobre um banco temporário, e mede
+    cada quantidade de tablets com a cozinha gravando `writes` vezes por segundo.
+    
+    Os clientes rodam em um único laço asyncio neste processo; com milhares
+    de clientes, o próprio gerador pode virar o gargalo.
+    """
+    host = "127.0.0.1"
+    with db.temporary_database(prefix="saka-api-"):
+        db.create_orders_bulk(simulator.random_order() for _ in range(LOADTEST_BOARD_SIZE))
+        
+        # spawn: o filho não herda as conexões SQLite abertas neste processo
+        context = multiprocessing.get_context("spawn")
+        ports = context.Queue()
+        server = context.Process(target=_serve_process, args=(host, ports), daemon=True)
+        server.start()
+        stop = threading.Event()
+        writer = threading.Thread(target=_kitchen_writer, args=(stop, writes), daemon=True)
+        try:
+            port = ports.get(timeout=30)
+            writer.start()
+            return [
+                asyncio.run(_poll_level(host, port, pollers, interval, duration))
+                for pollers in levels
+            ]
+        finally:
+            stop.set()
+            if writer.is_alive():
+                writer.join()
+            server.terminate()
+            server.join()
+
+
+# ============================================================================
+# LINHA DE COMANDO
+# ============================================================================
+
+async def _serve(host: str, port: int) -> None:
+    """Executa a API até ser interrompida."""
+    if metrics.ENABLED_BY_DEFAULT:
+        metrics.enable()
+    api = BoardAPI()
+    port = await api.start(host, port)
+    print(f"API do quadro ouvindo em http://{host}:{port} (banco: {db.DB_PATH})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await api.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="API JSON do quadro do Saka Delivery KDS")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    serve = commands.add_parser("serve", help="Serve o quadro por HTTP")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    
+    loadtest = commands.add_parser("loadtest", help="Mede quantos tablets um processo atende")
+    loadtest.add_argument("--pollers", default="10,100,500,1000", help="Quantidades de clientes, separadas por vírgula")
+    loadtest.add_argument("--interval", type=float, default=1.0, help="Segundos entre consultas de cada cliente")
+    loadtest.add_argument("--duration", type=float, default=10, help="Duração de cada etapa em segundos")
+    loadtest.add_argument("--writes", type=float, default=LOADTEST_WRITES_PER_SECOND, help="Escritas da cozinha por segundo")
+    
+    args = parser.parse_args()
+    
+    if args.command == "serve":
+        try:
+            asyncio.run(_serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+    else:
+        levels = [int(value) for value in args.pollers.split(",")]
+        results = run_load_test(levels, args.interval, args.duration, args.writes)
+        print(f"{'tablets':>8} {'req/s alvo':>11} {'req/s':>9} {'304':>7} {'200':>6} "
+              f"{'JSONs':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  acompanha")
+        for result in results:
+            print(f"{result['pollers']:>8} {result['target_rps']:11.0f} {result['served_rps']:9.0f} "
+                  f"{result['not_modified']:>7} {result['full']:>6} {result['rendered']:>6} "
+                  f"{result['p50_ms']:8.2f} {result['p95_ms']:8.2f} {result['p99_ms']:8.2f}  "
+                  f"{'sim' if result['keeps_up'] else 'não'}")
+
+
+if __name__ == "__main__":
+    main()
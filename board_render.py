@@ -0,0 +1,150 @@
+"""
+Saka Delivery KDS - Renderização do Quadro em HTML
+Monta a grade de pedidos como um único payload HTML, reaproveitando o
+HTML de cada card enquanto pedido, status e minuto decorrido não mudam
+"""
+
+from functools import lru_cache
+from html import escape
+from typing import Optional, Union
+
+from database import MS_PER_MINUTE, now_ms, to_epoch_ms
+
+# Rótulos exibidos nos cards
+SOURCE_EMOJIS = {"ifood": "🔴", "99food": "🟡", "whatsapp": "🟢"}
+SOURCE_LABELS = {"ifood": "iFood", "99food": "99Food", "whatsapp": "WhatsApp"}
+STATUS_LABELS = {
+    "novo": "🔔 NOVO",
+    "preparando": "👨‍🍳 PREPARANDO",
+    "pronto": "✅ PRONTO",
+    "saiu": "🚀 SAIU",
+    "cancelado": "❌ CANCELADO"
+}
+
+# Quantos cards distintos ficam em cache (cada minuto decorrido gera um novo)
+CARD_CACHE_SIZE = 4096
+
+# Template pré-compilado do card (sem indentação, para o Markdown não virar bloco de código)
+CARD_TEMPLATE = (
+    '<div class="order-card status-{status}">'
+    '<div class="order-header">'
+    '<span class="order-id">#{order_id:03d}</span>'
+    '<span class="order-source source-{source}">{source_emoji} {source_label}</span>'
+    '</div>'
+    '<div class="order-client">👤 {client}</div>'
+    '<div class="order-description">{description}</div>'
+    '<div class="order-footer">'
+    '<div class="order-time">'
+    '<span class="time-icon">⏱️</span>'
+    '<span class="time-value {time_class}">{elapsed}</span>'
+    '</div>'
+    '<span class="status-badge badge-{status}">{status_label}</span>'
+    '</div>'
+    '</div>'
+)
+
+GRID_TEMPLATE = '<div class="order-grid">{cards}</div>'
+
+
+def elapsed_minutes(created_at: int, now: int) -> int:
+    """Minutos inteiros decorridos entre dois instantes em epoch ms."""
+    return max(0, (now - created_at) // MS_PER_MINUTE)
+
+
+def board_elapsed_minutes(orders: list[dict], now: Optional[int] = None) -> list[int]:
+    """
+    Minutos decorridos de todos os pedidos do quadro em uma única passada.
+    
+    Todos usam o mesmo `now`, então cards renderizados no mesmo ciclo nunca
+    discordam sobre o minuto corrente; datas já são inteiros, sem parsing.
+    """
+    now = now_ms() if now is None else now
+    return [max(0, (now - order["created_at"]) // MS_PER_MINUTE) for order in orders]
+
+
+@lru_cache(maxsize=1440)
+def format_minutes(total_minutes: int) -> tuple[str, str]:
+    """
+    Formata minutos decorridos e escolhe a classe de urgência.
+    
+    Returns:
+        Tupla com (tempo_formatado, classe_css)
+    """
+    hours = total_minutes // 60
+    minutes = total_minutes % 60
+    
+    if hours > 0:
+        time_str = f"{hours}h {minutes}min"
+    else:
+        time_str = f"{minutes}min"
+    
+    # Define classe CSS baseada no tempo
+    if total_minutes >= 30:
+        css_class = "urgent"
+    elif total_minutes >= 15:
+        css_class = "warning"
+    else:
+        css_class = "normal"
+    
+    return time_str, css_class
+
+
+def format_elapsed_time(created_at: Union[int, str]) -> tuple[str, str]:
+    """
+    Calcula e formata o tempo decorrido desde a criação de um pedido avulso.
+    
+    Aceita epoch ms ou datas ISO legadas; datas inválidas contam como 0min.
+    Para o quadro inteiro, prefira `board_elapsed_minutes`.
+    
+    Returns:
+        Tupla com (tempo_formatado, classe_css)
+    """
+    created_ms = to_epoch_ms(created_at)
+    now = now_ms()
+    return format_minutes(elapsed_minutes(now if created_ms is None else created_ms, now))
+
+
+@lru_cache(maxsize=CARD_CACHE_SIZE)
+def render_card(order_id: int, status: str, minutes: int, source: str, client: str, description: str) -> str:
+    """
+    HTML de um card de pedido.
+    
+    A chave efetiva do cache é (id, status, minuto decorrido): cliente,
+    fonte e descrição não mudam depois que o pedido é criado.
+    """
+    elapsed, time_class = format_minutes(minutes)
+    return CARD_TEMPLATE.format(
+        order_id=order_id,
+        status=escape(status),
+        source=escape(source),
+        source_emoji=SOURCE_EMOJIS.get(source, "⚪"),
+        source_label=escape(SOURCE_LABELS.get(source, source)),
+        client=escape(client),
+        description=escape(description),
+        time_class=time_class,
+        elapsed=elapsed,
+        status_label=STATUS_LABELS.get(status, escape(status))
+    )
+
+
+def render_board_html(orders: list[dict], now: Optional[int] = None) -> str:
+    """
+    Monta a grade completa de pedidos em um único payload HTML.
+    
+    Args:
+        orders: Pedidos já na ordem de exibição
+        now: Instante de referência em epoch ms para o tempo decorrido (padrão: agora)
+    """
+    minutes = board_elapsed_minutes(orders, now)
+    cards = [
+        render_card(
+            order["id"],
+            order["status"],
+            elapsed,
+            order["source"],
+            order["client_name"],
+            order["description"]
+        )
+        for order, elapsed in zip(orders, minutes)
+    ]
+    return GRID_TEMPLATE.format(cards="".join(cards))
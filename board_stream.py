@@ -0,0 +1,238 @@
+"""
+Saka Delivery KDS - Transmissão do Quadro por Server-Sent Events
+Um único observador de mudanças (o `OrderStore`) alimenta todas as telas
+conectadas, com fila limitada por cliente e ressincronização ao reconectar
+
+Protocolo (GET /events na API do quadro):
+    event: snapshot   {"revision", "orders"}               quadro ativo completo
+    event: delta      {"revision", "new", "status", "removed"}
+    : ping            comentário a cada `KEEPALIVE_SECONDS` sem mudanças
+
+Cada mensagem leva `id: <revisão>`. Ao reconectar, o navegador (ou o
+cliente) envia `Last-Event-ID`; se as mensagens seguintes ainda estão no
+histórico, só elas são reenviadas, senão o cliente recebe um snapshot.
+"""
+
+import asyncio
+import json
+import logging
+import socket
+from collections import deque
+from typing import Optional, Union
+
+from order_store import OrderStore
+
+# Intervalo entre verificações de mudanças no banco (PRAGMA data_version)
+WATCH_INTERVAL_SECONDS = 0.05
+
+# Mensagens pendentes por cliente antes de descartar e mandar um snapshot
+CLIENT_QUEUE_SIZE = 64
+
+# Buffer de envio do kernel por conexão. Sem limite, o Linux o aumenta até
+# vários MB e uma TV travada segura tudo isso antes de a fila perceber.
+SEND_BUFFER_BYTES = 128 * 1024
+
+# Mensagens guardadas para reenviar a clientes que reconectam
+HISTORY_SIZE = 256
+
+KEEPALIVE_SECONDS = 15.0
+RETRY_MS = 1000
+
+# Marcador na fila de um cliente atrasado: mandar snapshot em vez dos deltas perdidos
+_RESYNC = "resync"
+
+logger = logging.getLogger(__name__)
+
+
+class _Subscriber:
+    """Tela conectada: fila limitada de (revisão, mensagem SSE) e a conexão."""
+    
+    __slots__ = ("queue", "writer")
+    
+    def __init__(self, queue_size: int, writer: asyncio.StreamWriter):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.writer = writer
+
+
+def format_event(event: str, revision: int, payload: dict) -> bytes:
+    """Mensagem SSE com id = revisão e o JSON em uma única linha `data:`."""
+    data = json.dumps(payload, ensure_ascii=False)
+    return f"id: {revision}\nevent: {event}\ndata: {data}\n\n".encode("utf-8")
+
+
+class BoardStream:
+    """
+    Repassa os deltas do `OrderStore` para todas as telas conectadas.
+    
+    Uma tarefa chama `store.refresh()` a cada `store.check_interval`
+    segundos (em uma thread, pois o delta é lido do SQLite). O store avisa
+    o stream, que serializa o delta uma vez e coloca os mesmos bytes na fila
+    de cada cliente. Cada cliente tem sua própria tarefa de escrita: um
+    cliente lento só atrasa a si mesmo.
+    
+    Quando a fila de um cliente enche (ele não está lendo), os deltas
+    pendentes são descartados e o cliente recebe um snapshot do quadro
+    assim que voltar a ler.
+    """
+    
+    def __init__(
+        self,
+        store: OrderStore,
+        queue_size: int = CLIENT_QUEUE_SIZE,
+        history_size: int = HISTORY_SIZE,
+        keepalive: float = KEEPALIVE_SECONDS
+    ):
+        self.store = store
+        self.queue_size = queue_size
+        self.keepalive = keepalive
+        self.stats = {
+            "subscribers": 0, "connections": 0, "broadcasts": 0,
+            "resyncs": 0, "replayed": 0, "snapshots": 0
+        }
+        self._subscribers: set[_Subscriber] = set()
+        self._history: deque[tuple[int, bytes]] = deque(maxlen=history_size)
+        # Revisão a partir da qual o histórico está completo
+        self._history_floor = 0
+        self._snapshot: Optional[tuple[int, bytes]] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    async def start(self) -> None:
+        """Passa a ouvir o store e inicia a verificação periódica de mudanças."""
+        self._loop = asyncio.get_running_loop()
+        self._history_floor = self.store.revision
+        self.store.add_listener(self._on_delta)
+        self._task = asyncio.create_task(self._watch())
+    
+    async def stop(self) -> None:
+        """Para de verificar mudanças e encerra as conexões abertas."""
+        self.store.remove_listener(self._on_delta)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        for subscriber in self._subscribers:
+            _replace_queue(subscriber, None)
+            # Derruba a conexão na hora: close() esperaria esvaziar o buffer,
+            # e quem está parado em drain() (cliente que não lê) nunca acordaria
+            subscriber.writer.transport.abort()
+    
+    async def _watch(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.store.refresh)
+            except Exception:
+                logger.exception("Falha ao verificar mudanças no quadro")
+            await asyncio.sleep(self.store.check_interval)
+    
+    def _on_delta(self, delta: dict) -> None:
+        """Ouvinte do store: roda na thread do refresh e repassa para o laço de eventos."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._broadcast, delta)
+    
+    def _broadcast(self, delta: dict) -> None:
+        revision = delta["revision"]
+        message = format_event("delta", revision, delta)
+        if len(self._history) == self._history.maxlen:
+            self._history_floor = self._history[0][0]
+        self._history.append((revision, message))
+        self.stats["broadcasts"] += 1
+        
+        for subscriber in self._subscribers:
+            try:
+                subscriber.queue.put_nowait((revision, message))
+            except asyncio.QueueFull:
+                _replace_queue(subscriber, _RESYNC)
+                self.stats["resyncs"] += 1
+    
+    def _snapshot_message(self) -> tuple[int, bytes]:
+        """Snapshot do quadro ativo (da memória do store), serializado uma vez por revisão."""
+        board = self.store.get_board()
+        if self._snapshot is None or self._snapshot[0] != board["revision"]:
+            payload = {"revision": board["revision"], "orders": board["orders"]}
+            self._snapshot = (board["revision"], format_event("snapshot", board["revision"], payload))
+        self.stats["snapshots"] += 1
+        return self._snapshot
+    
+    def _catch_up(self, last_event_id: Optional[str]) -> tuple[list[bytes], int]:
+        """
+        Mensagens para um cliente que chega e a revisão em que ele fica.
+        
+        Com `Last-Event-ID` coberto pelo histórico, só o que ele perdeu;
+        sem ele, ou se já saiu do histórico (ou é de outro banco), um snapshot.
+        """
+        if last_event_id and last_event_id.isdigit():
+            last = int(last_event_id)
+            current = self._history[-1][0] if self._history else self._history_floor
+            if self._history_floor <= last <= current:
+                missed = [message for revision, message in self._history if revision > last]
+                self.stats["replayed"] += len(missed)
+                return missed, last
+        revision, message = self._snapshot_message()
+        return [message], revision
+    
+    def snapshot_stats(self) -> dict:
+        """Contadores do stream (para /health)."""
+        return {**self.stats, "history": len(self._history)}
+    
+    async def serve(self, writer: asyncio.StreamWriter, headers: dict[str, str]) -> None:
+        """
+        Atende uma conexão GET /events até o cliente desconectar.
+        
+        Inscreve o cliente antes de calcular o que ele perdeu, sem `await`
+        no meio: nenhum delta cai entre o histórico e a fila.
+        """
+        subscriber = _Subscriber(self.queue_size, writer)
+        self._subscribers.add(subscriber)
+        self.stats["subscribers"] += 1
+        self.stats["connections"] += 1
+        pending, sent = self._catch_up(headers.get("last-event-id"))
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER_BYTES)
+        
+        try:
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: text/event-stream; charset=utf-8\r\n"
+                b"Cache-Control: no-cache\r\n"
+                b"Connection: keep-alive\r\n\r\n"
+                + f"retry: {RETRY_MS}\n\n".encode("latin-1")
+                + b"".join(pending)
+            )
+            await writer.drain()
+            
+            while True:
+                try:
+                    item = await asyncio.wait_for(subscriber.queue.get(), self.keepalive)
+                except asyncio.TimeoutError:
+                    writer.write(b": ping\n\n")
+                    await writer.drain()
+                    continue
+                
+                if item is None:
+                    break
+                if item == _RESYNC:
+                    item = self._snapshot_message()
+                revision, message = item
+                # Deltas já contidos no snapshot ou no histórico enviado
+                if revision <= sent:
+                    continue
+                writer.write(message)
+                await writer.drain()
+                sent = revision
+        except ConnectionError:
+            pass
+        finally:
+            self._subscribers.discard(subscriber)
+            self.stats["subscribers"] -= 1
+            writer.close()
+
+
+def _replace_queue(subscriber: _Subscriber, marker: Union[str, None]) -> None:
+    """Descarta o que o cliente ainda não leu e deixa só o marcador (resync ou fim)."""
+    while not subscriber.queue.empty():
+        subscriber.queue.get_nowait()
+    subscriber.queue.put_nowait(marker)
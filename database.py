@@ -3,13 +3,64 @@ Saka Delivery KDS - Módulo de Banco de Dados
 Gerencia persistência de pedidos usando SQLite3
 """
 
+import json
+import os
+import queue
+import re
 import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
+from itertools import islice
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Iterator, Optional, Union
 
-# Caminho do banco de dados
-DB_PATH = Path(__file__).parent / "saka_delivery.db"
+import metrics
+from item_parser import parse_description
+
+# Caminho do banco de dados (pode ser sobrescrito por SAKA_DB_PATH)
+DB_PATH = Path(os.environ.get("SAKA_DB_PATH", Path(__file__).parent / "saka_delivery.db"))
+
+# Banco da thread/tarefa corrente, quando difere de DB_PATH (ver `use_database`)
+_current_path: ContextVar[Optional[str]] = ContextVar("saka_db_path", default=None)
+
+# Ajustes de conexão (aplicados uma única vez, quando a conexão é aberta)
+BUSY_TIMEOUT_MS = 5000
+CACHE_SIZE_KIB = 8192
+POOL_SIZE = 8
+
+# Tamanho padrão dos lotes de inserção em massa (um commit por lote)
+BULK_CHUNK_SIZE = 500
+
+# Pedidos movidos para o arquivo por transação durante a compactação
+ARCHIVE_BATCH_SIZE = 200
+
+# Tamanho padrão das páginas do quadro com finalizados
+PAGE_SIZE = 30
+
+# Resultados padrão da busca textual
+SEARCH_LIMIT = 20
+
+# Eventos acumulados desde o último snapshot do quadro antes de gravar outro
+SNAPSHOT_EVERY_EVENTS = 500
+
+# Lápides mantidas para leituras incrementais, em revisões contadas a partir
+# da atual (cada escrita soma uma; um dia movimentado fica abaixo de 2.000)
+TOMBSTONE_KEEP_REVISIONS = 10_000
+
+# Candidatos mais recentes ranqueados por busca: termos muito comuns ("açaí")
+# não obrigam a calcular o BM25 de todo o histórico
+SEARCH_CANDIDATES = 500
+
+# Tempos de preparo acima deste limite (em minutos) caem no último balde do p90
+KPI_PREP_MAX_MINUTES = 180
+
+# Datas são gravadas como inteiros: milissegundos desde a época Unix (UTC)
+MS_PER_MINUTE = 60_000
+MS_PER_HOUR = 60 * MS_PER_MINUTE
 
 # Status possíveis para os pedidos
 STATUS_NOVO = "novo"
@@ -18,6 +69,108 @@ STATUS_PRONTO = "pronto"
 STATUS_SAIU = "saiu"
 STATUS_CANCELADO = "cancelado"
 
+# Status que tiram o pedido do quadro ativo
+FINISHED_STATUSES = (STATUS_SAIU, STATUS_CANCELADO)
+
+# Ordem de exibição dos status no quadro
+STATUS_RANK = {
+    STATUS_NOVO: 1,
+    STATUS_PREPARANDO: 2,
+    STATUS_PRONTO: 3,
+    STATUS_SAIU: 4,
+    STATUS_CANCELADO: 5
+}
+
+# Máquina de estados: status de origem -> destinos permitidos
+# (novo -> preparando -> pronto -> saiu; qualquer ativo -> cancelado)
+STATUS_TRANSITIONS = {
+    STATUS_NOVO: (STATUS_PREPARANDO, STATUS_CANCELADO),
+    STATUS_PREPARANDO: (STATUS_PRONTO, STATUS_CANCELADO),
+    STATUS_PRONTO: (STATUS_SAIU, STATUS_CANCELADO),
+    STATUS_SAIU: (),
+    STATUS_CANCELADO: ()
+}
+
+# Inverso da tabela acima: status de destino -> origens aceitas
+_ALLOWED_FROM = {
+    target: tuple(source for source, targets in STATUS_TRANSITIONS.items() if target in targets)
+    for target in STATUS_RANK
+}
+
+# Maior rank ainda exibido no quadro ativo (novo, preparando, pronto)
+ACTIVE_MAX_RANK = STATUS_RANK[STATUS_PRONTO]
+
+# Maior rank que ainda precisa ser preparado (novo, preparando)
+PREP_MAX_RANK = STATUS_RANK[STATUS_PREPARANDO]
+
+# Consultas quentes do quadro. Todas devem ser resolvidas por índice, sem
+# ordenação em B-tree temporária (ver `explain_hot_queries()`). Os índices não
+# são de cobertura: o card usa todas as colunas, e um índice com todas elas
+# seria uma segunda cópia de `orders` a atualizar em cada escrita.
+_SQL_ACTIVE_ORDERS = """
+    SELECT * FROM orders 
+    WHERE status_rank <= ?
+    ORDER BY status_rank, created_at
+"""
+
+_SQL_ALL_ORDERS = """
+    SELECT * FROM orders 
+    ORDER BY status_rank, created_at
+"""
+
+# Paginação por chave (keyset): continua depois da última linha da página
+# anterior na ordem (status_rank, created_at, id), sem OFFSET
+_SQL_ORDERS_PAGE = """
+    SELECT * FROM orders 
+    WHERE status_rank <= ?
+    AND (status_rank, created_at, id) > (?, ?, ?)
+    ORDER BY status_rank, created_at, id
+    LIMIT ?
+"""
+
+_SQL_COUNT_BY_RANK = """
+    SELECT status_rank, COUNT(*) as count 
+    FROM orders 
+    WHERE status_rank <= ?
+    GROUP BY status_rank
+"""
+
+_SQL_FINISHED_BEFORE = """
+    SELECT id FROM orders 
+    WHERE status IN ('saiu', 'cancelado')
+    AND updated_at <= ?
+    LIMIT ?
+"""
+
+_SQL_CHANGED_SINCE = """
+    SELECT * FROM orders 
+    WHERE revision > ?
+    ORDER BY revision ASC
+"""
+
+# O que preparar: itens por produto e tamanho, e coberturas, dos pedidos
+# pendentes (faixa em idx_orders_board + chave primária dos itens). Agrupar e
+# ordenar pela soma usa B-tree temporária, mas só sobre os itens pendentes:
+# um índice por produto obrigaria a percorrer os itens de todo o histórico.
+_SQL_PREP_SUMMARY = """
+    SELECT 'item' AS kind, i.product AS name, i.size_ml, SUM(i.quantity) AS quantity
+    FROM orders o JOIN order_items i ON i.order_id = o.id
+    WHERE o.status_rank <= ?
+    GROUP BY i.product, i.size_ml
+    UNION ALL
+    SELECT 'topping', t.topping, NULL, SUM(t.quantity)
+    FROM orders o JOIN order_item_toppings t ON t.order_id = o.id
+    WHERE o.status_rank <= ?
+    GROUP BY t.topping
+    ORDER BY kind, quantity DESC, name
+"""
+
+# Tipos de evento do log de pedidos (`order_events`)
+EVENT_CREATED = "created"
+EVENT_STATUS = "status"
+EVENT_ARCHIVED = "archived"
+EVENT_DELETED = "deleted"
+
 # Mapeamento de fontes
 FONTE_IFOOD = "ifood"
 FONTE_99FOOD = "99food"
@@ -25,17 +178,288 @@ FONTE_WHATSAPP = "whatsapp"
 
 
 def get_connection() -> sqlite3.Connection:
-    """Cria e retorna uma conexão com o banco de dados."""
-    conn = sqlite3.connect(str(DB_PATH))
+    """
+    Cria e retorna uma nova conexão configurada com o banco de dados.
+    
+    A conexão usa WAL, synchronous=NORMAL, busy timeout e cache ajustado,
+    e o esquema é migrado antes, se necessário. Quem chama é responsável
+    por fechá-la; as funções deste módulo usam `pooled_connection()` para
+    reaproveitar conexões já abertas.
+    """
+    ensure_schema()
+    return _open_connection()
+
+
+def current_path() -> str:
+    """Banco usado pelas funções deste módulo na thread/tarefa corrente."""
+    return _current_path.get() or str(DB_PATH)
+
+
+def is_memory_path(path: str) -> bool:
+    """Indica se o caminho é um banco SQLite em memória compartilhado (URI `mode=memory`)."""
+    return path.startswith("file:") and "mode=memory" in path
+
+
+@contextmanager
+def use_database(path: Union[str, Path]) -> Iterator[None]:
+    """
+    Aponta as funções deste módulo para outro banco durante o bloco `with`.
+    
+    Vale só para a thread (ou tarefa asyncio) corrente, então bancos
+    diferentes podem ser usados em paralelo sem tocar em DB_PATH. Aceita
+    caminhos de arquivo e URIs SQLite ("file:nome?mode=memory&cache=shared").
+    """
+    token = _current_path.set(str(path))
+    try:
+        yield
+    finally:
+        _current_path.reset(token)
+
+
+def _open_connection() -> sqlite3.Connection:
+    """Abre uma conexão com o banco corrente e aplica os ajustes de desempenho."""
+    path = current_path()
+    conn = sqlite3.connect(
+        path,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False,  # A conexão pode trocar de thread dentro do pool
+        uri=path.startswith("file:")
+    )
     conn.row_factory = sqlite3.Row  # Permite acesso por nome de coluna
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KIB}")
     return conn
 
 
-def init_db() -> None:
-    """Inicializa o banco de dados e cria as tabelas necessárias."""
-    conn = get_connection()
-    cursor = conn.cursor()
+class ConnectionPool:
+    """
+    Pool limitado e thread-safe de conexões para um arquivo de banco.
+    
+    As conexões são criadas sob demanda até `max_size` e devolvidas ao pool
+    após o uso. Se todas estiverem em uso, `acquire()` aguarda uma liberação.
+    """
+    
+    def __init__(self, max_size: int = POOL_SIZE):
+        self.max_size = max_size
+        self._idle: queue.LifoQueue = queue.LifoQueue(maxsize=max_size)
+        self._created = 0
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> sqlite3.Connection:
+        """Obtém uma conexão ociosa ou cria uma nova se houver espaço."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        
+        with self._lock:
+            can_create = self._created < self.max_size
+            if can_create:
+                self._created += 1
+        
+        if can_create:
+            try:
+                return _open_connection()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        
+        return self._idle.get()
+    
+    def release(self, conn: sqlite3.Connection) -> None:
+        """Devolve a conexão ao pool, desfazendo transações pendentes."""
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put_nowait(conn)
+    
+    def close_all(self) -> None:
+        """Fecha todas as conexões ociosas do pool."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+# Um pool por banco, para respeitar mudanças em DB_PATH e `use_database`
+_pools: dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool() -> ConnectionPool:
+    """
+    Retorna o pool associado ao banco corrente.
+    
+    Em memória com cache compartilhado, conexões concorrentes recebem
+    SQLITE_LOCKED em vez de esperar o busy timeout; o pool tem uma só
+    conexão e as operações se enfileiram nela.
+    """
+    path = current_path()
+    pool = _pools.get(path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(path, ConnectionPool(1 if is_memory_path(path) else POOL_SIZE))
+    return pool
+
+
+@contextmanager
+def pooled_connection() -> Iterator[sqlite3.Connection]:
+    """
+    Empresta uma conexão do pool durante o bloco `with`.
+    
+    Em caso de exceção, a transação em aberto é desfeita antes de a conexão
+    voltar ao pool.
+    """
+    ensure_schema()
+    pool = _get_pool()
+    conn = pool.acquire()
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        pool.release(conn)
+
+
+def close_database(path: Union[str, Path]) -> None:
+    """
+    Fecha as conexões ociosas do pool de um banco específico.
+    
+    O banco também sai da lista de esquemas migrados: um banco em memória
+    some com a última conexão, e um novo com o mesmo nome começa vazio.
+    """
+    path = str(path)
+    with _pools_lock:
+        pool = _pools.pop(path, None)
+    if pool is not None:
+        pool.close_all()
+    _schema_ready.discard(path)
+
+
+def close_connections() -> None:
+    """Fecha as conexões ociosas de todos os pools (útil em testes e no shutdown)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    
+    for pool in pools:
+        pool.close_all()
+
+
+@contextmanager
+def temporary_database(prefix: str = "saka-") -> Iterator[Path]:
+    """
+    Aponta DB_PATH para um arquivo temporário vazio durante o bloco `with`.
+    
+    Usado por testes de carga e benchmarks, que não devem gravar no banco
+    real. O caminho também é exportado em SAKA_DB_PATH para que subprocessos
+    usem o mesmo arquivo; ao sair, as conexões são fechadas e o arquivo some.
+    """
+    global DB_PATH
+    with tempfile.TemporaryDirectory(prefix=prefix) as tmp:
+        path = Path(tmp) / "saka_delivery.db"
+        previous_path = DB_PATH
+        previous_env = os.environ.get("SAKA_DB_PATH")
+        
+        DB_PATH = path
+        os.environ["SAKA_DB_PATH"] = str(path)
+        init_db()
+        try:
+            yield path
+        finally:
+            close_connections()
+            DB_PATH = previous_path
+            if previous_env is None:
+                os.environ.pop("SAKA_DB_PATH", None)
+            else:
+                os.environ["SAKA_DB_PATH"] = previous_env
+
+
+# ============================================================================
+# DATAS (EPOCH EM MILISSEGUNDOS, UTC)
+# ============================================================================
+
+def now_ms() -> int:
+    """Instante atual em milissegundos desde a época Unix (UTC)."""
+    return time.time_ns() // 1_000_000
+
+
+def to_epoch_ms(value: Union[int, float, str, datetime, None]) -> Optional[int]:
+    """
+    Leitor de compatibilidade: converte qualquer data já gravada em epoch ms.
     
+    Aceita o formato atual (inteiro), números em texto e o formato legado
+    (`datetime.now().isoformat()`, hora local sem fuso). Datas ISO com fuso
+    são respeitadas; sem fuso, são interpretadas no horário local, como
+    eram gravadas.
+    
+    Returns:
+        Milissegundos desde a época ou None se o valor não for uma data
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value)
+    if isinstance(value, datetime):
+        return int(value.timestamp() * 1000)
+    
+    text = str(value).strip()
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return int(datetime.fromisoformat(text).timestamp() * 1000)
+    except ValueError:
+        return None
+
+
+def from_epoch_ms(value: int) -> datetime:
+    """Converte epoch ms em `datetime` no horário local (para exibição)."""
+    return datetime.fromtimestamp(value / 1000)
+
+
+# Colunas de data das tabelas de pedidos
+_TIMESTAMP_COLUMNS = ("created_at", "updated_at", "archived_at")
+
+
+def _order_from_row(row: sqlite3.Row) -> dict:
+    """
+    Converte uma linha em dicionário, normalizando datas legadas.
+    
+    Depois da migração 005 todas as datas já são inteiras; a conversão só
+    roda se alguma linha em texto aparecer (ex.: gravada por um processo
+    antigo durante a atualização).
+    """
+    order = dict(row)
+    for column in _TIMESTAMP_COLUMNS:
+        value = order.get(column)
+        if value is not None and type(value) is not int:
+            order[column] = to_epoch_ms(value) or 0
+    return order
+
+
+# ============================================================================
+# MIGRAÇÕES DE ESQUEMA
+# ============================================================================
+
+def _column_exists(cursor: sqlite3.Cursor, table: str, column: str) -> bool:
+    """Verifica se a tabela já possui a coluna informada."""
+    cursor.execute(f"PRAGMA table_info({table})")
+    return any(row[1] == column for row in cursor.fetchall())
+
+
+def _migration_001_orders(cursor: sqlite3.Cursor) -> None:
+    """Tabela de pedidos original."""
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS orders (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -52,88 +476,831 @@ def init_db() -> None:
     cursor.execute("""
         CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status)
     """)
+
+
+def _stamp_unrevised_orders(cursor: sqlite3.Cursor) -> None:
+    """
+    Dá uma revisão aos pedidos que ainda estão na revisão 0.
+    
+    Só pedidos anteriores às revisões ficam em 0 (toda escrita grava uma
+    revisão >= 1), e `get_orders_changed_since(0)` filtra `revision > 0`:
+    sem isso, a carga completa do quadro não os traria. Eles recebem a
+    revisão seguinte à atual, para que clientes já sincronizados também
+    os vejam.
+    """
+    cursor.execute("SELECT 1 FROM orders WHERE revision = 0 LIMIT 1")
+    if cursor.fetchone() is None:
+        return
+    cursor.execute("UPDATE sync_state SET revision = revision + 1 WHERE id = 1")
+    cursor.execute("UPDATE orders SET revision = (SELECT revision FROM sync_state WHERE id = 1) WHERE revision = 0")
+
+
+def _migration_002_revisions(cursor: sqlite3.Cursor) -> None:
+    """Revisão global, revisão por pedido e lápides para leituras incrementais."""
+    # Revisão global: incrementada a cada escrita em `orders`
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sync_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            revision INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("INSERT OR IGNORE INTO sync_state (id, revision) VALUES (1, 0)")
+    
+    if not _column_exists(cursor, "orders", "revision"):
+        cursor.execute("ALTER TABLE orders ADD COLUMN revision INTEGER NOT NULL DEFAULT 0")
+    _stamp_unrevised_orders(cursor)
+    
+    # Índice para consultas incrementais por revisão
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_orders_revision ON orders(revision)
+    """)
+    
+    # Lápides: pedidos removidos e a revisão em que saíram
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS order_tombstones (
+            order_id INTEGER PRIMARY KEY,
+            revision INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_tombstones_revision ON order_tombstones(revision)
+    """)
+
+
+def _migration_003_status_rank(cursor: sqlite3.Cursor) -> None:
+    """Rank de status gravado na linha e índices que dispensam ordenação temporária."""
+    if not _column_exists(cursor, "orders", "status_rank"):
+        cursor.execute("ALTER TABLE orders ADD COLUMN status_rank INTEGER NOT NULL DEFAULT 1")
+        cursor.executemany(
+            "UPDATE orders SET status_rank = ? WHERE status = ?",
+            [(rank, status) for status, rank in STATUS_RANK.items()]
+        )
+    
+    # Índice do quadro: filtra ativos (rank <= 3) e já entrega a ordem de exibição
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_orders_board ON orders(status_rank, created_at)
+    """)
+    
+    # Índice para limpeza de finalizados por status e data de atualização
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_orders_status_updated ON orders(status, updated_at)
+    """)
+    
+    # Substituído por idx_orders_status_updated, que cobre o mesmo prefixo
+    cursor.execute("DROP INDEX IF EXISTS idx_orders_status")
+
+
+def _migration_004_archive(cursor: sqlite3.Cursor) -> None:
+    """Tabela fria com o histórico de pedidos finalizados."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS orders_archive (
+            id INTEGER PRIMARY KEY,
+            source TEXT NOT NULL,
+            client_name TEXT NOT NULL,
+            description TEXT NOT NULL,
+            status TEXT NOT NULL,
+            created_at DATETIME NOT NULL,
+            updated_at DATETIME NOT NULL,
+            archived_at DATETIME NOT NULL
+        )
+    """)
+    
+    # Índice para consultas de histórico por período
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_archive_updated ON orders_archive(updated_at)
+    """)
+
+
+def _migration_005_epoch_timestamps(cursor: sqlite3.Cursor) -> None:
+    """
+    Datas ISO em texto viram inteiros (epoch ms, UTC) declarados como INTEGER.
+    
+    As tabelas são recriadas (procedimento padrão do SQLite para mudar o
+    tipo de uma coluna), convertendo cada valor com `to_epoch_ms`. Inteiros
+    comparam e ordenam mais barato que texto, e os índices existentes passam
+    a atender buscas por faixa (`updated_at < ?`) sem funções de data.
+    """
+    conn = cursor.connection
+    conn.create_function("to_epoch_ms", 1, to_epoch_ms, deterministic=True)
+    
+    # O AUTOINCREMENT não pode voltar atrás: IDs arquivados não podem ser reusados
+    cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'orders'")
+    row = cursor.fetchone()
+    last_id = row[0] if row else 0
+    
+    cursor.execute("""
+        CREATE TABLE orders_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT NOT NULL,
+            client_name TEXT NOT NULL,
+            description TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'novo',
+            created_at INTEGER NOT NULL,
+            updated_at INTEGER NOT NULL,
+            revision INTEGER NOT NULL DEFAULT 0,
+            status_rank INTEGER NOT NULL DEFAULT 1
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO orders_new 
+            (id, source, client_name, description, status, created_at, updated_at, revision, status_rank)
+        SELECT id, source, client_name, description, status,
+            COALESCE(to_epoch_ms(created_at), 0), COALESCE(to_epoch_ms(updated_at), 0),
+            revision, status_rank
+        FROM orders
+    """)
+    cursor.execute("DROP TABLE orders")
+    cursor.execute("ALTER TABLE orders_new RENAME TO orders")
+    cursor.execute("""
+        UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'orders'
+    """, (last_id,))
+    
+    cursor.execute("CREATE INDEX idx_orders_revision ON orders(revision)")
+    cursor.execute("CREATE INDEX idx_orders_board ON orders(status_rank, created_at)")
+    cursor.execute("CREATE INDEX idx_orders_status_updated ON orders(status, updated_at)")
+    
+    cursor.execute("""
+        CREATE TABLE orders_archive_new (
+            id INTEGER PRIMARY KEY,
+            source TEXT NOT NULL,
+            client_name TEXT NOT NULL,
+            description TEXT NOT NULL,
+            status TEXT NOT NULL,
+            created_at INTEGER NOT NULL,
+            updated_at INTEGER NOT NULL,
+            archived_at INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO orders_archive_new 
+            (id, source, client_name, description, status, created_at, updated_at, archived_at)
+        SELECT id, source, client_name, description, status,
+            COALESCE(to_epoch_ms(created_at), 0), COALESCE(to_epoch_ms(updated_at), 0),
+            COALESCE(to_epoch_ms(archived_at), 0)
+        FROM orders_archive
+    """)
+    cursor.execute("DROP TABLE orders_archive")
+    cursor.execute("ALTER TABLE orders_archive_new RENAME TO orders_archive")
+    cursor.execute("CREATE INDEX idx_archive_updated ON orders_archive(updated_at)")
+
+
+def _migration_006_kpis(cursor: sqlite3.Cursor) -> None:
+    """
+    Indicadores da cozinha agregados por hora (UTC) e fonte.
+    
+    As tabelas são mantidas incrementalmente pelas escritas de pedidos, na
+    mesma transação. O histórico anterior é reconstruído só para pedidos
+    criados, cancelados e entregues: o instante em que um pedido antigo
+    ficou pronto não foi gravado, então os tempos de preparo começam a
+    contar a partir desta migração.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS kpi_hourly (
+            hour_start INTEGER NOT NULL,
+            source TEXT NOT NULL,
+            created INTEGER NOT NULL DEFAULT 0,
+            ready INTEGER NOT NULL DEFAULT 0,
+            prep_total_ms INTEGER NOT NULL DEFAULT 0,
+            delivered INTEGER NOT NULL DEFAULT 0,
+            cancelled INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (hour_start, source)
+        ) WITHOUT ROWID
+    """)
+    
+    # Distribuição dos tempos de preparo (minutos inteiros) para o p90
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS kpi_prep_minutes (
+            hour_start INTEGER NOT NULL,
+            source TEXT NOT NULL,
+            minutes INTEGER NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (hour_start, source, minutes)
+        ) WITHOUT ROWID
+    """)
+    
+    backfill: list[tuple] = []
+    for table in ("orders", "orders_archive"):
+        cursor.execute(f"""
+            SELECT created_at - created_at % {MS_PER_HOUR}, source, COUNT(*)
+            FROM {table} GROUP BY 1, 2
+        """)
+        backfill.extend((hour, source, count, 0, 0, 0, 0) for hour, source, count in cursor.fetchall())
+        
+        cursor.execute(f"""
+            SELECT updated_at - updated_at % {MS_PER_HOUR}, source,
+                SUM(status = 'saiu'), SUM(status = 'cancelado')
+            FROM {table} WHERE status IN ('saiu', 'cancelado') GROUP BY 1, 2
+        """)
+        backfill.extend(
+            (hour, source, 0, 0, 0, delivered, cancelled)
+            for hour, source, delivered, cancelled in cursor.fetchall()
+        )
+    _bump_kpis(cursor, backfill)
+
+
+def _fts5_available(cursor: sqlite3.Cursor) -> bool:
+    """Indica se o SQLite em uso foi compilado com FTS5."""
+    cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+    return bool(cursor.fetchone()[0])
+
+
+def _migration_007_search(cursor: sqlite3.Cursor) -> None:
+    """
+    Índice de texto (FTS5) de cliente e descrição, do quadro e do arquivo.
+    
+    Cada pedido tem uma linha no índice, com rowid = id do pedido. Gatilhos
+    mantêm o índice em dia; quando o pedido vai para o arquivo, a linha é
+    mantida. O tokenizador remove acentos ("acai" encontra "Açaí"). Sem
+    FTS5 no SQLite, o passo não cria nada e `search_orders` usa LIKE.
+    """
+    if not _fts5_available(cursor):
+        return
+    
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS orders_fts USING fts5(
+            client_name, description,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    """)
+    
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS orders_fts_insert AFTER INSERT ON orders BEGIN
+            INSERT INTO orders_fts (rowid, client_name, description)
+            VALUES (new.id, new.client_name, new.description);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS orders_fts_update
+        AFTER UPDATE OF client_name, description ON orders BEGIN
+            DELETE FROM orders_fts WHERE rowid = old.id;
+            INSERT INTO orders_fts (rowid, client_name, description)
+            VALUES (new.id, new.client_name, new.description);
+        END
+    """)
+    # Ao arquivar, o pedido é copiado para orders_archive antes de sair de orders
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS orders_fts_delete AFTER DELETE ON orders
+        WHEN NOT EXISTS (SELECT 1 FROM orders_archive WHERE id = old.id) BEGIN
+            DELETE FROM orders_fts WHERE rowid = old.id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS orders_archive_fts_insert AFTER INSERT ON orders_archive
+        WHEN NOT EXISTS (SELECT 1 FROM orders_fts WHERE rowid = new.id) BEGIN
+            INSERT INTO orders_fts (rowid, client_name, description)
+            VALUES (new.id, new.client_name, new.description);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS orders_archive_fts_delete AFTER DELETE ON orders_archive
+        WHEN NOT EXISTS (SELECT 1 FROM orders WHERE id = old.id) BEGIN
+            DELETE FROM orders_fts WHERE rowid = old.id;
+        END
+    """)
+    
+    cursor.execute("DELETE FROM orders_fts")
+    cursor.execute("""
+        INSERT INTO orders_fts (rowid, client_name, description)
+        SELECT id, client_name, description FROM orders_archive
+        UNION ALL
+        SELECT id, client_name, description FROM orders
+        WHERE id NOT IN (SELECT id FROM orders_archive)
+    """)
+
+
+def _migration_008_order_items(cursor: sqlite3.Cursor) -> None:
+    """
+    Itens estruturados de cada pedido, extraídos da descrição na inserção.
+    
+    `order_item_toppings` repete a quantidade do item para que a soma das
+    coberturas não precise de junção com `order_items`. Como no índice de
+    busca, os itens acompanham o pedido no arquivo e só somem quando ele é
+    apagado de vez.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS order_items (
+            order_id INTEGER NOT NULL,
+            line INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            size_ml INTEGER,
+            product TEXT NOT NULL,
+            variant TEXT NOT NULL DEFAULT '',
+            PRIMARY KEY (order_id, line)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS order_item_toppings (
+            order_id INTEGER NOT NULL,
+            line INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            topping TEXT NOT NULL,
+            quantity INTEGER NOT NULL,
+            PRIMARY KEY (order_id, line, position)
+        ) WITHOUT ROWID
+    """)
+    
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS orders_items_delete AFTER DELETE ON orders
+        WHEN NOT EXISTS (SELECT 1 FROM orders_archive WHERE id = old.id) BEGIN
+            DELETE FROM order_items WHERE order_id = old.id;
+            DELETE FROM order_item_toppings WHERE order_id = old.id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS orders_archive_items_delete AFTER DELETE ON orders_archive
+        WHEN NOT EXISTS (SELECT 1 FROM orders WHERE id = old.id) BEGIN
+            DELETE FROM order_items WHERE order_id = old.id;
+            DELETE FROM order_item_toppings WHERE order_id = old.id;
+        END
+    """)
+    
+    cursor.execute("DELETE FROM order_items")
+    cursor.execute("DELETE FROM order_item_toppings")
+    cursor.execute("""
+        SELECT id, description FROM orders
+        UNION ALL
+        SELECT id, description FROM orders_archive
+        WHERE id NOT IN (SELECT id FROM orders)
+    """)
+    _insert_order_items(cursor, cursor.fetchall())
+
+
+def _migration_009_events(cursor: sqlite3.Cursor) -> None:
+    """
+    Log de eventos dos pedidos (só inserção) e snapshots periódicos do quadro.
+    
+    Cada escrita em pedidos grava seu evento na mesma transação. O histórico
+    anterior a esta migração não existe: os pedidos da tabela quente entram
+    como criados em `created_at` e, se já avançaram, com um único evento
+    para o status atual em `updated_at`.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS order_events (
+            seq INTEGER PRIMARY KEY,
+            at INTEGER NOT NULL,
+            order_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            status TEXT,
+            source TEXT,
+            client_name TEXT,
+            description TEXT
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_events_order ON order_events(order_id, seq)")
+    
+    # Estado da tabela quente até o evento `seq` (inclusive), em JSON
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS order_snapshots (
+            seq INTEGER PRIMARY KEY,
+            at INTEGER NOT NULL,
+            board TEXT NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_at ON order_snapshots(at)")
+    
+    cursor.execute("SELECT 1 FROM order_events LIMIT 1")
+    if cursor.fetchone():
+        return
+    cursor.execute(f"""
+        INSERT INTO order_events (at, order_id, kind, status, source, client_name, description)
+        SELECT at, order_id, kind, status, source, client_name, description FROM (
+            SELECT created_at AS at, id AS order_id, '{EVENT_CREATED}' AS kind, '{STATUS_NOVO}' AS status,
+                source, client_name, description
+            FROM orders
+            UNION ALL
+            SELECT updated_at, id, '{EVENT_STATUS}', status, NULL, NULL, NULL
+            FROM orders WHERE status != '{STATUS_NOVO}'
+        )
+        ORDER BY at, kind
+    """)
+
+
+def _migration_010_stamp_legacy_revisions(cursor: sqlite3.Cursor) -> None:
+    """
+    Corrige bancos que passaram pela migração 2 antes de ela carimbar os
+    pedidos existentes: eles ficaram na revisão 0, fora da carga completa.
+    """
+    _stamp_unrevised_orders(cursor)
+
+
+def _migration_011_tombstone_floor(cursor: sqlite3.Cursor) -> None:
+    """Revisão até a qual as lápides já foram descartadas (ver `prune_tombstones`)."""
+    if not _column_exists(cursor, "sync_state", "tombstone_floor"):
+        cursor.execute("ALTER TABLE sync_state ADD COLUMN tombstone_floor INTEGER NOT NULL DEFAULT 0")
+
+
+# Passos em ordem; o passo N leva o banco à versão N (PRAGMA user_version).
+# Cada passo deve ser idempotente: bancos anteriores ao controle de versão
+# (user_version = 0) podem já ter parte das tabelas e colunas.
+MIGRATIONS = [
+    _migration_001_orders,
+    _migration_002_revisions,
+    _migration_003_status_rank,
+    _migration_004_archive,
+    _migration_005_epoch_timestamps,
+    _migration_006_kpis,
+    _migration_007_search,
+    _migration_008_order_items,
+    _migration_009_events,
+    _migration_010_stamp_legacy_revisions,
+    _migration_011_tombstone_floor
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+# Caminhos já migrados neste processo
+_schema_ready: set[str] = set()
+_schema_lock = threading.Lock()
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    Aplica as migrações pendentes na conexão informada.
+    
+    Tudo roda em uma transação IMMEDIATE: se dois processos abrirem o
+    banco ao mesmo tempo, o segundo espera e encontra a versão já atual.
+    
+    Returns:
+        Versão do esquema após a migração
+    """
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        version = cursor.execute("PRAGMA user_version").fetchone()[0]
+        for number, step in enumerate(MIGRATIONS[version:], start=version + 1):
+            step(cursor)
+            cursor.execute(f"PRAGMA user_version = {number}")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    
+    return max(version, SCHEMA_VERSION)
+
+
+def ensure_schema() -> None:
+    """
+    Garante que o banco corrente está na versão atual do esquema.
+    
+    Roda as migrações uma única vez por processo e caminho; depois disso
+    custa apenas uma consulta a um conjunto em memória.
+    """
+    path = current_path()
+    if path in _schema_ready:
+        return
+    
+    with _schema_lock:
+        if path in _schema_ready:
+            return
+        conn = _open_connection()
+        try:
+            migrate(conn)
+        finally:
+            conn.close()
+        _schema_ready.add(path)
+
+
+def init_db() -> None:
+    """Inicializa o banco de dados, aplicando migrações pendentes."""
+    _schema_ready.discard(current_path())
+    ensure_schema()
+
+
+def _bump_revision(cursor: sqlite3.Cursor) -> int:
+    """
+    Incrementa a revisão global dentro da transação corrente.
+    
+    Deve ser chamada pela mesma conexão que faz a escrita, antes do commit,
+    para que revisão e alteração fiquem visíveis juntas.
+    """
+    cursor.execute("UPDATE sync_state SET revision = revision + 1 WHERE id = 1")
+    cursor.execute("SELECT revision FROM sync_state WHERE id = 1")
+    return cursor.fetchone()[0]
+
+
+def _add_tombstones(cursor: sqlite3.Cursor, order_ids: list[int], revision: int) -> None:
+    """Registra a remoção dos pedidos para que clientes incrementais saibam."""
+    cursor.executemany("""
+        INSERT OR REPLACE INTO order_tombstones (order_id, revision) VALUES (?, ?)
+    """, [(order_id, revision) for order_id in order_ids])
+
+
+def _hour_start(timestamp: int) -> int:
+    """Início da hora (UTC) que contém o instante, em epoch ms."""
+    return timestamp - timestamp % MS_PER_HOUR
+
+
+def _bump_kpis(cursor: sqlite3.Cursor, rows: list[tuple]) -> None:
+    """
+    Soma contadores em `kpi_hourly` dentro da transação corrente.
+    
+    Args:
+        rows: Tuplas (hour_start, source, created, ready, prep_total_ms, delivered, cancelled)
+    """
+    cursor.executemany("""
+        INSERT INTO kpi_hourly (hour_start, source, created, ready, prep_total_ms, delivered, cancelled)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (hour_start, source) DO UPDATE SET
+            created = created + excluded.created,
+            ready = ready + excluded.ready,
+            prep_total_ms = prep_total_ms + excluded.prep_total_ms,
+            delivered = delivered + excluded.delivered,
+            cancelled = cancelled + excluded.cancelled
+    """, rows)
+
+
+def _record_status_kpis(cursor: sqlite3.Cursor, order_id: int, new_status: str, now: int) -> None:
+    """Atualiza os indicadores da hora corrente após uma mudança de status."""
+    if new_status not in (STATUS_PRONTO, STATUS_SAIU, STATUS_CANCELADO):
+        return
+    
+    cursor.execute("SELECT source, created_at FROM orders WHERE id = ?", (order_id,))
+    source, created_at = cursor.fetchone()
+    hour = _hour_start(now)
+    
+    if new_status == STATUS_PRONTO:
+        prep_ms = max(0, now - created_at)
+        _bump_kpis(cursor, [(hour, source, 0, 1, prep_ms, 0, 0)])
+        cursor.execute("""
+            INSERT INTO kpi_prep_minutes (hour_start, source, minutes, count) VALUES (?, ?, ?, 1)
+            ON CONFLICT (hour_start, source, minutes) DO UPDATE SET count = count + 1
+        """, (hour, source, min(prep_ms // MS_PER_MINUTE, KPI_PREP_MAX_MINUTES)))
+    elif new_status == STATUS_SAIU:
+        _bump_kpis(cursor, [(hour, source, 0, 0, 0, 1, 0)])
+    else:
+        _bump_kpis(cursor, [(hour, source, 0, 0, 0, 0, 1)])
+
+
+def _insert_order_items(cursor: sqlite3.Cursor, orders: Iterable[tuple[int, str]]) -> None:
+    """
+    Grava os itens estruturados dos pedidos dentro da transação corrente.
+    
+    Args:
+        orders: Tuplas (order_id, description); o parsing é memorizado por texto
+    """
+    items: list[tuple] = []
+    toppings: list[tuple] = []
+    for order_id, description in orders:
+        for line, item in enumerate(parse_description(description), start=1):
+            items.append((order_id, line, item.quantity, item.size_ml, item.product, item.variant))
+            toppings.extend(
+                (order_id, line, position, topping, item.quantity)
+                for position, topping in enumerate(item.toppings, start=1)
+            )
+    
+    cursor.executemany("""
+        INSERT OR REPLACE INTO order_items (order_id, line, quantity, size_ml, product, variant)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, items)
+    cursor.executemany("""
+        INSERT OR REPLACE INTO order_item_toppings (order_id, line, position, topping, quantity)
+        VALUES (?, ?, ?, ?, ?)
+    """, toppings)
+
+
+def _append_events(cursor: sqlite3.Cursor, rows: list[tuple]) -> None:
+    """
+    Acrescenta eventos ao log dentro da transação corrente.
+    
+    Args:
+        rows: Tuplas (at, order_id, kind, status, source, client_name, description);
+            fonte, cliente e descrição só nos eventos de criação
+    """
+    cursor.executemany("""
+        INSERT INTO order_events (at, order_id, kind, status, source, client_name, description)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+
+
+def get_revision() -> int:
+    """
+    Retorna a revisão atual do banco.
+    
+    É um marcador barato de mudança: qualquer inserção, alteração de status
+    ou remoção de pedido (de qualquer processo) faz o valor aumentar.
+    """
+    with pooled_connection() as conn:
+        row = conn.execute("SELECT revision FROM sync_state WHERE id = 1").fetchone()
+    
+    return row[0] if row else 0
+
+
+def create_order(source: str, client_name: str, description: str) -> int:
+    """
+    Cria um novo pedido no banco de dados.
+    
+    Args:
+        source: Origem do pedido (ifood, 99food, whatsapp)
+        client_name: Nome do cliente
+        description: Descrição do pedido
+        
+    Returns:
+        ID do pedido criado
+    """
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        
+        now = now_ms()
+        revision = _bump_revision(cursor)
+        
+        cursor.execute("""
+            INSERT INTO orders (source, client_name, description, status, status_rank, created_at, updated_at, revision)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (source, client_name, description, STATUS_NOVO, STATUS_RANK[STATUS_NOVO], now, now, revision))
+        
+        order_id = cursor.lastrowid
+        _insert_order_items(cursor, [(order_id, description)])
+        _append_events(cursor, [(now, order_id, EVENT_CREATED, STATUS_NOVO, source, client_name, description)])
+        _bump_kpis(cursor, [(_hour_start(now), source, 1, 0, 0, 0, 0)])
+        conn.commit()
+    
+    return order_id
+
+
+def create_orders_bulk(
+    orders: Iterable[tuple[str, str, str]],
+    chunk_size: int = BULK_CHUNK_SIZE
+) -> list[int]:
+    """
+    Cria vários pedidos de uma vez, com um único commit por lote.
+    
+    Útil quando as plataformas reenviam pedidos represados: em vez de um
+    commit (e um fsync) por pedido, cada lote de até `chunk_size` pedidos
+    é gravado com `executemany` em uma só transação.
+    
+    Args:
+        orders: Tuplas (source, client_name, description)
+        chunk_size: Máximo de pedidos por transação
+        
+    Returns:
+        IDs dos pedidos criados, na mesma ordem da entrada
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size deve ser maior que zero")
+    
+    order_ids: list[int] = []
+    iterator = iter(orders)
+    
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        
+        while True:
+            chunk = list(islice(iterator, chunk_size))
+            if not chunk:
+                break
+            
+            now = now_ms()
+            revision = _bump_revision(cursor)
+            
+            cursor.executemany("""
+                INSERT INTO orders (source, client_name, description, status, status_rank, created_at, updated_at, revision)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, [
+                (source, client_name, description, STATUS_NOVO, STATUS_RANK[STATUS_NOVO], now, now, revision)
+                for source, client_name, description in chunk
+            ])
+            
+            # Todas as linhas do lote compartilham a revisão recém-criada
+            cursor.execute("SELECT id FROM orders WHERE revision = ? ORDER BY id", (revision,))
+            chunk_ids = [row[0] for row in cursor.fetchall()]
+            order_ids.extend(chunk_ids)
+            _insert_order_items(cursor, zip(chunk_ids, (description for _, _, description in chunk)))
+            _append_events(cursor, [
+                (now, order_id, EVENT_CREATED, STATUS_NOVO, source, client_name, description)
+                for order_id, (source, client_name, description) in zip(chunk_ids, chunk)
+            ])
+            
+            created_by_source: dict[str, int] = {}
+            for source, _, _ in chunk:
+                created_by_source[source] = created_by_source.get(source, 0) + 1
+            _bump_kpis(cursor, [
+                (_hour_start(now), source, count, 0, 0, 0, 0) for source, count in created_by_source.items()
+            ])
+            conn.commit()
+    
+    return order_ids
+
+
+def get_all_orders(include_finished: bool = False) -> list[dict]:
+    """
+    Retorna todos os pedidos ativos.
+    
+    Args:
+        include_finished: Se True, inclui pedidos finalizados (saiu, cancelado)
+        
+    Returns:
+        Lista de dicionários com os dados dos pedidos
+    """
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        
+        with metrics.stage("db.get_all_orders.sql"):
+            if include_finished:
+                cursor.execute(_SQL_ALL_ORDERS)
+            else:
+                cursor.execute(_SQL_ACTIVE_ORDERS, (ACTIVE_MAX_RANK,))
+            rows = cursor.fetchall()
     
-    conn.commit()
-    conn.close()
+    with metrics.stage("db.get_all_orders.to_dict"):
+        return [_order_from_row(row) for row in rows]
 
 
-def create_order(source: str, client_name: str, description: str) -> int:
+def get_orders_page(
+    include_finished: bool = True,
+    after: Optional[list] = None,
+    limit: int = PAGE_SIZE
+) -> dict:
     """
-    Cria um novo pedido no banco de dados.
+    Retorna uma página do quadro usando paginação por chave (keyset).
+    
+    O custo de cada página depende só de `limit`, não de quantas páginas
+    vêm antes: a consulta retoma o índice do quadro a partir do cursor.
     
     Args:
-        source: Origem do pedido (ifood, 99food, whatsapp)
-        client_name: Nome do cliente
-        description: Descrição do pedido
+        include_finished: Se True, inclui pedidos finalizados (saiu, cancelado)
+        after: Cursor `next_cursor` da página anterior (None = primeira página)
+        limit: Máximo de pedidos na página
         
     Returns:
-        ID do pedido criado
+        Dicionário com:
+            orders: Pedidos da página, na ordem de exibição
+            next_cursor: Cursor da próxima página ou None se esta for a última
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    now = datetime.now().isoformat()
+    max_rank = STATUS_RANK[STATUS_CANCELADO] if include_finished else ACTIVE_MAX_RANK
+    # Cursor inicial: antes de qualquer linha (ranks começam em 1)
+    rank, created_at, order_id = after if after else (0, 0, 0)
     
-    cursor.execute("""
-        INSERT INTO orders (source, client_name, description, status, created_at, updated_at)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (source, client_name, description, STATUS_NOVO, now, now))
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Busca uma linha a mais para saber se existe próxima página
+        cursor.execute(_SQL_ORDERS_PAGE, (max_rank, rank, created_at, order_id, limit + 1))
+        rows = cursor.fetchall()
     
-    order_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    orders = [_order_from_row(row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = orders[-1]
+        next_cursor = [last["status_rank"], last["created_at"], last["id"]]
     
-    return order_id
+    return {"orders": orders, "next_cursor": next_cursor}
 
 
-def get_all_orders(include_finished: bool = False) -> list[dict]:
+def get_orders_changed_since(revision: int) -> dict:
     """
-    Retorna todos os pedidos ativos.
+    Retorna apenas o que mudou desde a revisão informada.
     
     Args:
-        include_finished: Se True, inclui pedidos finalizados (saiu, cancelado)
+        revision: Última revisão conhecida pelo cliente (0 para carga completa)
         
+    Se as lápides posteriores a `revision` já foram descartadas
+    (`prune_tombstones`), o cliente não tem como saber o que saiu: a
+    resposta vira uma carga completa com `reset`, e o cliente deve trocar
+    seu estado pelo recebido.
+    
     Returns:
-        Lista de dicionários com os dados dos pedidos
+        Dicionário com:
+            revision: Revisão atual, a ser enviada na próxima chamada
+            changed: Pedidos inseridos ou alterados (inclusive finalizados)
+            removed: IDs de pedidos removidos do banco
+            reset: True se `changed` é uma carga completa
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    if include_finished:
-        cursor.execute("""
-            SELECT * FROM orders 
-            ORDER BY 
-                CASE status 
-                    WHEN 'novo' THEN 1 
-                    WHEN 'preparando' THEN 2 
-                    WHEN 'pronto' THEN 3 
-                    WHEN 'saiu' THEN 4 
-                    WHEN 'cancelado' THEN 5 
-                END,
-                created_at ASC
-        """)
-    else:
-        cursor.execute("""
-            SELECT * FROM orders 
-            WHERE status NOT IN ('saiu', 'cancelado')
-            ORDER BY 
-                CASE status 
-                    WHEN 'novo' THEN 1 
-                    WHEN 'preparando' THEN 2 
-                    WHEN 'pronto' THEN 3 
-                END,
-                created_at ASC
-        """)
-    
-    rows = cursor.fetchall()
-    conn.close()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Leitura consistente: revisão, pedidos e lápides do mesmo snapshot
+        cursor.execute("BEGIN")
+        cursor.execute("SELECT revision, tombstone_floor FROM sync_state WHERE id = 1")
+        current, floor = cursor.fetchone()
+        
+        reset = 0 < revision < floor
+        if reset:
+            revision = 0
+        
+        cursor.execute(_SQL_CHANGED_SINCE, (revision,))
+        changed = [_order_from_row(row) for row in cursor.fetchall()]
+        
+        removed = []
+        if revision > 0:
+            cursor.execute("""
+                SELECT order_id FROM order_tombstones 
+                WHERE revision > ?
+            """, (revision,))
+            removed = [row[0] for row in cursor.fetchall()]
+        
+        conn.commit()
     
-    return [dict(row) for row in rows]
+    return {
+        "revision": current,
+        "changed": changed,
+        "removed": removed,
+        "reset": reset
+    }
 
 
 def get_order_by_id(order_id: int) -> Optional[dict]:
     """
-    Busca um pedido específico pelo ID.
+    Busca um pedido específico pelo ID (no quadro ou no arquivo).
     
     Args:
         order_id: ID do pedido
@@ -141,48 +1308,158 @@ def get_order_by_id(order_id: int) -> Optional[dict]:
     Returns:
         Dicionário com dados do pedido ou None se não encontrado
     """
-    conn = get_connection()
-    cursor = conn.cursor()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT * FROM orders WHERE id = ?", (order_id,))
+        row = cursor.fetchone()
+        
+        # Pedidos finalizados podem já ter ido para o arquivo
+        if row is None:
+            cursor.execute("SELECT * FROM orders_archive WHERE id = ?", (order_id,))
+            row = cursor.fetchone()
     
-    cursor.execute("SELECT * FROM orders WHERE id = ?", (order_id,))
-    row = cursor.fetchone()
-    conn.close()
+    return _order_from_row(row) if row else None
+
+
+def can_transition(current_status: str, new_status: str) -> bool:
+    """Indica se a máquina de estados permite ir de `current_status` para `new_status`."""
+    return new_status in STATUS_TRANSITIONS.get(current_status, ())
+
+
+def _set_status(
+    cursor: sqlite3.Cursor,
+    order_id: int,
+    allowed_from: tuple[str, ...],
+    new_status: str,
+    now: int,
+    revision: int
+) -> bool:
+    """
+    Troca o status com um único UPDATE condicional (compare-and-set).
+    
+    Só altera a linha se o status atual estiver em `allowed_from`; assim
+    dois cliques simultâneos não sobrescrevem um ao outro. Os indicadores
+    da cozinha e o log de eventos são atualizados na mesma transação.
+    """
+    placeholders = ", ".join("?" * len(allowed_from))
+    cursor.execute(f"""
+        UPDATE orders 
+        SET status = ?, status_rank = ?, updated_at = ?, revision = ?
+        WHERE id = ? AND status IN ({placeholders})
+    """, (new_status, STATUS_RANK[new_status], now, revision, order_id, *allowed_from))
+    if cursor.rowcount == 0:
+        return False
     
-    return dict(row) if row else None
+    _record_status_kpis(cursor, order_id, new_status, now)
+    _append_events(cursor, [(now, order_id, EVENT_STATUS, new_status, None, None, None)])
+    return True
 
 
 def update_order_status(order_id: int, new_status: str) -> bool:
     """
-    Atualiza o status de um pedido.
+    Atualiza o status de um pedido, respeitando `STATUS_TRANSITIONS`.
     
     Args:
         order_id: ID do pedido
         new_status: Novo status (novo, preparando, pronto, saiu, cancelado)
         
     Returns:
-        True se a atualização foi bem sucedida, False caso contrário
+        True se a atualização foi bem sucedida, False se o pedido não existe,
+        o status é inválido ou a transição não é permitida a partir do status atual
     """
-    valid_statuses = [STATUS_NOVO, STATUS_PREPARANDO, STATUS_PRONTO, STATUS_SAIU, STATUS_CANCELADO]
+    allowed_from = _ALLOWED_FROM.get(new_status)
     
-    if new_status not in valid_statuses:
+    if not allowed_from:
         return False
     
-    conn = get_connection()
-    cursor = conn.cursor()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        
+        now = now_ms()
+        revision = _bump_revision(cursor)
+        
+        success = _set_status(cursor, order_id, allowed_from, new_status, now, revision)
+        if success:
+            conn.commit()
+        else:
+            conn.rollback()
     
-    now = datetime.now().isoformat()
+    return success
+
+
+def transition_orders(
+    order_ids: Optional[Iterable[int]],
+    expected_status: str,
+    new_status: str
+) -> dict:
+    """
+    Move vários pedidos de `expected_status` para `new_status` em uma transação.
     
-    cursor.execute("""
-        UPDATE orders 
-        SET status = ?, updated_at = ?
-        WHERE id = ?
-    """, (new_status, now, order_id))
+    Cada pedido só muda se ainda estiver em `expected_status` no momento da
+    escrita; os demais são devolvidos como conflitos, com o status atual,
+    para que a interface atualize apenas esses cards.
+    
+    Args:
+        order_ids: IDs a mover, ou None para todos os pedidos em `expected_status`
+            (ex.: "marcar todos em preparo como prontos")
+        expected_status: Status que a tela mostrava ao pedir a ação
+        new_status: Status de destino
+        
+    Returns:
+        Dicionário com:
+            updated: IDs alterados
+            conflicts: {id: status atual (ou None se o pedido não existe mais)}
+            
+    Raises:
+        ValueError: Se a transição não é permitida pela máquina de estados
+    """
+    if not can_transition(expected_status, new_status):
+        raise ValueError(f"Transição não permitida: {expected_status} -> {new_status}")
+    
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        
+        now = now_ms()
+        revision = _bump_revision(cursor)
+        
+        # O lock de escrita já está com esta transação: a lista não muda até o commit
+        if order_ids is None:
+            cursor.execute("SELECT id FROM orders WHERE status = ?", (expected_status,))
+            order_ids = [row[0] for row in cursor.fetchall()]
+        else:
+            order_ids = list(dict.fromkeys(order_ids))
+        
+        updated = [
+            order_id for order_id in order_ids
+            if _set_status(cursor, order_id, (expected_status,), new_status, now, revision)
+        ]
+        
+        conflicts = {}
+        updated_ids = set(updated)
+        missed = [order_id for order_id in order_ids if order_id not in updated_ids]
+        if missed:
+            placeholders = ", ".join("?" * len(missed))
+            cursor.execute(f"SELECT id, status FROM orders WHERE id IN ({placeholders})", missed)
+            current = dict(cursor.fetchall())
+            conflicts = {order_id: current.get(order_id) for order_id in missed}
+        
+        if updated:
+            conn.commit()
+        else:
+            conn.rollback()
     
-    success = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
+    return {"updated": updated, "conflicts": conflicts}
+
+
+def transition_order(order_id: int, expected_status: str, new_status: str) -> dict:
+    """
+    Move um pedido de `expected_status` para `new_status` (compare-and-set).
     
-    return success
+    Returns:
+        Mesmo formato de `transition_orders`
+    """
+    return transition_orders([order_id], expected_status, new_status)
 
 
 def delete_order(order_id: int) -> bool:
@@ -195,14 +1472,19 @@ def delete_order(order_id: int) -> bool:
     Returns:
         True se o pedido foi removido, False caso contrário
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("DELETE FROM orders WHERE id = ?", (order_id,))
-    
-    success = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        
+        revision = _bump_revision(cursor)
+        cursor.execute("DELETE FROM orders WHERE id = ?", (order_id,))
+        
+        success = cursor.rowcount > 0
+        if success:
+            _add_tombstones(cursor, [order_id], revision)
+            _append_events(cursor, [(now_ms(), order_id, EVENT_DELETED, None, None, None, None)])
+            conn.commit()
+        else:
+            conn.rollback()
     
     return success
 
@@ -214,18 +1496,12 @@ def get_orders_count_by_status() -> dict[str, int]:
     Returns:
         Dicionário com status como chave e contagem como valor
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT status, COUNT(*) as count 
-        FROM orders 
-        WHERE status NOT IN ('saiu', 'cancelado')
-        GROUP BY status
-    """)
-    
-    rows = cursor.fetchall()
-    conn.close()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute(_SQL_COUNT_BY_RANK, (ACTIVE_MAX_RANK,))
+        
+        rows = cursor.fetchall()
     
     counts = {
         STATUS_NOVO: 0,
@@ -233,37 +1509,609 @@ def get_orders_count_by_status() -> dict[str, int]:
         STATUS_PRONTO: 0
     }
     
+    status_by_rank = {rank: status for status, rank in STATUS_RANK.items()}
     for row in rows:
-        counts[row['status']] = row['count']
+        counts[status_by_rank[row['status_rank']]] = row['count']
     
     return counts
 
 
+def _archive_batch(cursor: sqlite3.Cursor, order_ids: list[int]) -> None:
+    """Copia os pedidos para o arquivo e os tira da tabela quente, na transação corrente."""
+    placeholders = ", ".join("?" * len(order_ids))
+    now = now_ms()
+    revision = _bump_revision(cursor)
+    cursor.execute(f"""
+        INSERT OR REPLACE INTO orders_archive 
+            (id, source, client_name, description, status, created_at, updated_at, archived_at)
+        SELECT id, source, client_name, description, status, created_at, updated_at, ?
+        FROM orders WHERE id IN ({placeholders})
+    """, (now, *order_ids))
+    cursor.execute(f"DELETE FROM orders WHERE id IN ({placeholders})", order_ids)
+    _add_tombstones(cursor, order_ids, revision)
+    _append_events(cursor, [(now, order_id, EVENT_ARCHIVED, None, None, None, None) for order_id in order_ids])
+
+
+def archive_orders(order_ids: Iterable[int]) -> int:
+    """
+    Arquiva pedidos finalizados específicos (usado pelo replay de eventos).
+    
+    Pedidos ativos ou inexistentes são ignorados.
+    
+    Returns:
+        Número de pedidos arquivados
+    """
+    order_ids = list(dict.fromkeys(order_ids))
+    if not order_ids:
+        return 0
+    
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        
+        placeholders = ", ".join("?" * len(order_ids))
+        cursor.execute(f"""
+            SELECT id FROM orders WHERE id IN ({placeholders}) AND status IN ('saiu', 'cancelado')
+        """, order_ids)
+        finished = [row[0] for row in cursor.fetchall()]
+        if finished:
+            _archive_batch(cursor, finished)
+            conn.commit()
+    
+    return len(finished)
+
+
+def archive_finished_orders(
+    hours: int = 0,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    max_batches: Optional[int] = None
+) -> int:
+    """
+    Move pedidos finalizados para `orders_archive` em lotes limitados.
+    
+    Cada lote é uma transação curta (copia, remove da tabela quente e
+    registra lápides), para não segurar o lock de escrita enquanto as TVs
+    e a ingestão continuam trabalhando.
+    
+    Args:
+        hours: Só move pedidos finalizados há mais que este número de horas
+        batch_size: Pedidos por transação
+        max_batches: Limite de lotes nesta chamada (None = até esvaziar)
+        
+    Returns:
+        Número de pedidos arquivados
+    """
+    # Inteiro no mesmo formato das linhas: faixa direta no índice (status, updated_at)
+    cutoff = now_ms() - int(hours * MS_PER_HOUR)
+    archived = 0
+    batches = 0
+    
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        
+        while max_batches is None or batches < max_batches:
+            cursor.execute(_SQL_FINISHED_BEFORE, (cutoff, batch_size))
+            order_ids = [row[0] for row in cursor.fetchall()]
+            if not order_ids:
+                break
+            
+            _archive_batch(cursor, order_ids)
+            conn.commit()
+            
+            archived += len(order_ids)
+            batches += 1
+            if len(order_ids) < batch_size:
+                break
+    
+    return archived
+
+
 def clear_old_orders(hours: int = 24) -> int:
     """
-    Remove pedidos finalizados mais antigos que o número de horas especificado.
+    Tira do quadro os pedidos finalizados mais antigos que o número de horas especificado.
+    
+    Os pedidos não são apagados: vão para o arquivo (`orders_archive`) e
+    continuam disponíveis em `get_archived_orders` e `get_order_by_id`.
     
     Args:
         hours: Número de horas para manter pedidos finalizados
         
     Returns:
-        Número de pedidos removidos
+        Número de pedidos arquivados
     """
-    conn = get_connection()
-    cursor = conn.cursor()
+    return archive_finished_orders(hours=hours)
+
+
+def _fts_query(text: str) -> str:
+    """
+    Converte o texto digitado em uma consulta FTS5 segura.
     
-    cursor.execute("""
-        DELETE FROM orders 
-        WHERE status IN ('saiu', 'cancelado')
-        AND datetime(updated_at) < datetime('now', ? || ' hours')
-    """, (f"-{hours}",))
+    Cada palavra vira um prefixo entre aspas ("aman"* encontra "Amanda") e
+    todas precisam aparecer; operadores e aspas digitados são ignorados.
+    """
+    words = re.findall(r"\w+", text)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search_orders(query: str, limit: int = SEARCH_LIMIT) -> list[dict]:
+    """
+    Busca pedidos pelo nome do cliente ou pela descrição, no quadro e no arquivo.
+    
+    Usa o índice FTS5 (ignora acentos e maiúsculas, aceita prefixos) com
+    ranking BM25, em que o nome do cliente pesa mais que a descrição. O
+    ranking considera os `SEARCH_CANDIDATES` pedidos mais recentes que
+    casam com a busca, para o custo não crescer com o histórico.
+    "#42" ou "42" também encontra o pedido de ID 42.
+    
+    Args:
+        query: Texto digitado (ex.: "amanda", "nutella pacoca")
+        limit: Máximo de pedidos retornados
+        
+    Returns:
+        Pedidos do mais relevante ao menos relevante. Cada dicionário traz
+        também `archived` (True se o pedido veio de `orders_archive`)
+    """
+    match = _fts_query(query)
+    if not match:
+        return []
+    
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'orders_fts'")
+        if cursor.fetchone():
+            cursor.execute("""
+                SELECT rowid FROM (
+                    SELECT rowid, bm25(orders_fts, 4.0, 1.0) AS score FROM orders_fts 
+                    WHERE orders_fts MATCH ?
+                    ORDER BY rowid DESC
+                    LIMIT ?
+                )
+                ORDER BY score, rowid DESC
+                LIMIT ?
+            """, (match, max(limit, SEARCH_CANDIDATES), limit))
+        else:
+            # SQLite sem FTS5: varredura com LIKE (todas as palavras, sem ranking)
+            words = re.findall(r"\w+", query)
+            condition = " AND ".join(["(client_name || ' ' || description) LIKE ?"] * len(words))
+            cursor.execute(f"""
+                SELECT id FROM (
+                    SELECT id, client_name, description FROM orders
+                    UNION ALL
+                    SELECT id, client_name, description FROM orders_archive
+                )
+                WHERE {condition}
+                ORDER BY id DESC
+                LIMIT ?
+            """, (*[f"%{word}%" for word in words], limit))
+        order_ids = [row[0] for row in cursor.fetchall()]
+        
+        # "#42": o pedido com esse ID vem primeiro
+        number = query.strip().lstrip("#")
+        if number.isdigit() and int(number) not in order_ids:
+            order_ids = [int(number), *order_ids][:limit]
+        
+        if not order_ids:
+            return []
+        
+        placeholders = ", ".join("?" * len(order_ids))
+        cursor.execute(f"SELECT * FROM orders WHERE id IN ({placeholders})", order_ids)
+        found = {row["id"]: {**_order_from_row(row), "archived": False} for row in cursor.fetchall()}
+        cursor.execute(f"SELECT * FROM orders_archive WHERE id IN ({placeholders})", order_ids)
+        for row in cursor.fetchall():
+            found.setdefault(row["id"], {**_order_from_row(row), "archived": True})
+    
+    return [found[order_id] for order_id in order_ids if order_id in found]
+
+
+def get_archived_orders(
+    since: Union[int, str, datetime, None] = None,
+    until: Union[int, str, datetime, None] = None,
+    limit: int = 200
+) -> list[dict]:
+    """
+    Consulta o histórico de pedidos arquivados, do mais recente ao mais antigo.
+    
+    Args:
+        since: Data mínima de finalização (updated_at), inclusive, em epoch ms,
+            texto ISO ou `datetime`
+        until: Data máxima de finalização (updated_at), exclusive, no mesmo formato
+        limit: Máximo de pedidos retornados
+        
+    Returns:
+        Lista de dicionários com os dados dos pedidos
+    """
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        
+        conditions = []
+        params: list = []
+        if since is not None:
+            conditions.append("updated_at >= ?")
+            params.append(to_epoch_ms(since))
+        if until is not None:
+            conditions.append("updated_at < ?")
+            params.append(to_epoch_ms(until))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        cursor.execute(f"""
+            SELECT * FROM orders_archive 
+            {where}
+            ORDER BY updated_at DESC
+            LIMIT ?
+        """, (*params, limit))
+        rows = cursor.fetchall()
+    
+    return [_order_from_row(row) for row in rows]
+
+
+def _prep_percentile(minutes_count: dict[int, int], pct: float) -> Optional[int]:
+    """Percentil (posição mais próxima) de uma distribuição {minutos: quantidade}."""
+    total = sum(minutes_count.values())
+    if not total:
+        return None
+    
+    target = pct / 100 * total
+    seen = 0
+    for minutes in sorted(minutes_count):
+        seen += minutes_count[minutes]
+        if seen >= target:
+            return minutes
+    return max(minutes_count)
+
+
+def _summarize_kpis(totals: dict, prep_minutes: dict[int, int], hours: int) -> dict:
+    """Indicadores derivados dos contadores somados de um período."""
+    created = totals["created"]
+    ready = totals["ready"]
+    return {
+        "orders": created,
+        "orders_per_hour": created / hours,
+        "ready": ready,
+        "delivered": totals["delivered"],
+        "cancelled": totals["cancelled"],
+        "cancel_rate": totals["cancelled"] / created if created else 0.0,
+        "prep_avg_min": totals["prep_total_ms"] / ready / MS_PER_MINUTE if ready else None,
+        "prep_p90_min": _prep_percentile(prep_minutes, 90)
+    }
+
+
+def get_kitchen_kpis(hours: int = 24) -> dict:
+    """
+    Indicadores da cozinha nas últimas `hours` horas (incluindo a hora corrente).
+    
+    Lê apenas as tabelas agregadas por hora e fonte, nunca o histórico de
+    pedidos: o custo depende de horas x fontes, não do volume de pedidos.
+    
+    Returns:
+        Dicionário com:
+            since: Início do período (epoch ms)
+            hours: Número de horas do período
+            total: Indicadores de todas as fontes
+            by_source: {fonte: indicadores}
+            hourly: [{"hour_start", "source", "orders", "cancelled"}], por hora
+        
+        Cada bloco de indicadores tem orders, orders_per_hour, ready,
+        delivered, cancelled, cancel_rate, prep_avg_min e prep_p90_min
+        (os tempos são None se nenhum pedido ficou pronto no período).
+    """
+    since = _hour_start(now_ms()) - (hours - 1) * MS_PER_HOUR
+    
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Leitura consistente: contadores e distribuição do mesmo snapshot
+        cursor.execute("BEGIN")
+        cursor.execute("""
+            SELECT hour_start, source, created, ready, prep_total_ms, delivered, cancelled
+            FROM kpi_hourly WHERE hour_start >= ?
+            ORDER BY hour_start, source
+        """, (since,))
+        hourly_rows = cursor.fetchall()
+        
+        cursor.execute("""
+            SELECT source, minutes, SUM(count) FROM kpi_prep_minutes 
+            WHERE hour_start >= ?
+            GROUP BY source, minutes
+        """, (since,))
+        prep_rows = cursor.fetchall()
+        conn.commit()
+    
+    counters = ("created", "ready", "prep_total_ms", "delivered", "cancelled")
+    totals = dict.fromkeys(counters, 0)
+    totals_by_source: dict[str, dict] = {}
+    hourly = []
+    for row in hourly_rows:
+        source_totals = totals_by_source.setdefault(row["source"], dict.fromkeys(counters, 0))
+        for counter in counters:
+            source_totals[counter] += row[counter]
+            totals[counter] += row[counter]
+        hourly.append({
+            "hour_start": row["hour_start"],
+            "source": row["source"],
+            "orders": row["created"],
+            "cancelled": row["cancelled"]
+        })
+    
+    prep_all: dict[int, int] = {}
+    prep_by_source: dict[str, dict[int, int]] = {}
+    for source, minutes, count in prep_rows:
+        prep_by_source.setdefault(source, {})[minutes] = count
+        prep_all[minutes] = prep_all.get(minutes, 0) + count
+    
+    return {
+        "since": since,
+        "hours": hours,
+        "total": _summarize_kpis(totals, prep_all, hours),
+        "by_source": {
+            source: _summarize_kpis(source_totals, prep_by_source.get(source, {}), hours)
+            for source, source_totals in totals_by_source.items()
+        },
+        "hourly": hourly
+    }
+
+
+def get_prep_summary() -> dict[str, list[dict]]:
+    """
+    O que a cozinha precisa preparar agora (pedidos novos e em preparo).
+    
+    Soma os itens gravados na inserção em uma única consulta indexada,
+    sem reinterpretar as descrições a cada renderização.
+    
+    Returns:
+        Dicionário com:
+            items: [{"product", "size_ml", "quantity"}], do mais pedido ao menos
+            toppings: [{"topping", "quantity"}], do mais pedido ao menos
+        
+        `size_ml` é None para itens sem tamanho na descrição.
+    """
+    with pooled_connection() as conn:
+        rows = conn.execute(_SQL_PREP_SUMMARY, (PREP_MAX_RANK, PREP_MAX_RANK)).fetchall()
+    
+    summary: dict[str, list[dict]] = {"items": [], "toppings": []}
+    for row in rows:
+        if row["kind"] == "item":
+            summary["items"].append({"product": row["name"], "size_ml": row["size_ml"], "quantity": row["quantity"]})
+        else:
+            summary["toppings"].append({"topping": row["name"], "quantity": row["quantity"]})
+    
+    return summary
+
+
+# Campos de cada pedido guardados nos snapshots, nesta ordem
+_SNAPSHOT_FIELDS = ("id", "source", "client_name", "description", "status", "created_at", "updated_at")
+
+# Maior seq possível (fim da cauda quando não há snapshot depois do instante)
+_MAX_SEQ = 2 ** 63 - 1
+
+
+def get_events(after_seq: int = 0, limit: int = 1000) -> list[dict]:
+    """
+    Página do log de eventos, em ordem de gravação (paginação por `seq`).
+    
+    Args:
+        after_seq: Último `seq` já lido (0 = desde o início)
+        limit: Máximo de eventos
+        
+    Returns:
+        Eventos com seq, at, order_id, kind, status, source, client_name e
+        description (os três últimos só em eventos de criação)
+    """
+    with pooled_connection() as conn:
+        rows = conn.execute("""
+            SELECT * FROM order_events WHERE seq > ? ORDER BY seq LIMIT ?
+        """, (after_seq, limit)).fetchall()
+    
+    return [dict(row) for row in rows]
+
+
+def get_order_events(order_id: int) -> list[dict]:
+    """Linha do tempo de um pedido: quando foi criado, confirmado, ficou pronto, saiu..."""
+    with pooled_connection() as conn:
+        rows = conn.execute("""
+            SELECT seq, at, kind, status FROM order_events WHERE order_id = ? ORDER BY seq
+        """, (order_id,)).fetchall()
+    
+    return [dict(row) for row in rows]
+
+
+def take_snapshot() -> Optional[int]:
+    """
+    Grava o estado atual da tabela quente como snapshot do log de eventos.
+    
+    Pedidos e último evento são lidos na mesma transação de escrita, então
+    o snapshot corresponde exatamente ao log até o seu `seq`.
+    
+    Returns:
+        `seq` do snapshot, ou None se não há eventos novos desde o último
+    """
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT seq, at FROM order_events ORDER BY seq DESC LIMIT 1")
+        last = cursor.fetchone()
+        cursor.execute("SELECT MAX(seq) FROM order_snapshots")
+        if last is None or cursor.fetchone()[0] == last["seq"]:
+            conn.rollback()
+            return None
+        
+        cursor.execute(f"SELECT {', '.join(_SNAPSHOT_FIELDS)} FROM orders ORDER BY id")
+        board = json.dumps([list(row) for row in cursor.fetchall()], ensure_ascii=False, separators=(",", ":"))
+        cursor.execute("""
+            INSERT INTO order_snapshots (seq, at, board) VALUES (?, ?, ?)
+        """, (last["seq"], last["at"], board))
+        conn.commit()
+    
+    return last["seq"]
+
+
+def prune_tombstones(keep_revisions: int = TOMBSTONE_KEEP_REVISIONS) -> int:
+    """
+    Descarta lápides de mais de `keep_revisions` revisões atrás.
+    
+    Clientes que pedirem um delta a partir de uma revisão anterior ao corte
+    recebem uma carga completa (ver `get_orders_changed_since`), então a
+    retenção só limita até onde vale a leitura incremental.
+    
+    Returns:
+        Quantidade de lápides removidas
+    """
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT revision, tombstone_floor FROM sync_state WHERE id = 1")
+        current, floor = cursor.fetchone()
+        
+        cutoff = current - keep_revisions
+        if cutoff <= floor:
+            conn.rollback()
+            return 0
+        
+        cursor.execute("DELETE FROM order_tombstones WHERE revision <= ?", (cutoff,))
+        pruned = cursor.rowcount
+        cursor.execute("UPDATE sync_state SET tombstone_floor = ? WHERE id = 1", (cutoff,))
+        conn.commit()
+    
+    return pruned
+
+
+def snapshot_if_due(min_events: int = SNAPSHOT_EVERY_EVENTS) -> Optional[int]:
+    """
+    Grava um snapshot se já houver `min_events` eventos depois do último.
+    
+    Chamado periodicamente pela compactação em segundo plano; verificar
+    custa duas leituras de chave primária.
+    
+    Returns:
+        `seq` do snapshot gravado, ou None
+    """
+    with pooled_connection() as conn:
+        last_event = conn.execute("SELECT MAX(seq) FROM order_events").fetchone()[0] or 0
+        last_snapshot = conn.execute("SELECT MAX(seq) FROM order_snapshots").fetchone()[0] or 0
+    
+    if last_event - last_snapshot < min_events:
+        return None
+    return take_snapshot()
+
+
+def _apply_events(board: dict[int, dict], rows: Iterable[sqlite3.Row]) -> None:
+    """Aplica eventos do log, em ordem, ao estado {order_id: pedido}."""
+    for row in rows:
+        order_id = row["order_id"]
+        if row["kind"] == EVENT_CREATED:
+            board[order_id] = {
+                "id": order_id,
+                "source": row["source"],
+                "client_name": row["client_name"],
+                "description": row["description"],
+                "status": row["status"],
+                "created_at": row["at"],
+                "updated_at": row["at"]
+            }
+        elif row["kind"] == EVENT_STATUS:
+            order = board.get(order_id)
+            if order is not None:
+                order["status"] = row["status"]
+                order["updated_at"] = row["at"]
+        else:
+            board.pop(order_id, None)
+
+
+def get_board_at(
+    at: Union[int, str, datetime],
+    include_finished: bool = False,
+    use_snapshots: bool = True
+) -> list[dict]:
+    """
+    Reconstrói o quadro como estava em um instante passado.
+    
+    Parte do snapshot mais recente até `at` e aplica só a cauda de eventos
+    até o snapshot seguinte, em vez de reaplicar o log inteiro.
+    
+    Args:
+        at: Instante (epoch ms, ISO ou datetime)
+        include_finished: Se True, inclui pedidos finalizados ainda não arquivados
+        use_snapshots: Se False, reaplica o log desde o início (para comparação)
+        
+    Returns:
+        Pedidos na ordem do quadro, com id, source, client_name, description,
+        status, created_at e updated_at
+    """
+    instant = to_epoch_ms(at)
+    if instant is None:
+        raise ValueError(f"Instante inválido: {at!r}")
+    board: dict[int, dict] = {}
+    start_seq, end_seq = 0, _MAX_SEQ
     
-    deleted = cursor.rowcount
-    conn.commit()
-    conn.close()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Snapshot e cauda do mesmo estado do banco
+        cursor.execute("BEGIN")
+        if use_snapshots:
+            cursor.execute("""
+                SELECT seq, board FROM order_snapshots WHERE at <= ? ORDER BY at DESC LIMIT 1
+            """, (instant,))
+            snapshot = cursor.fetchone()
+            if snapshot is not None:
+                start_seq = snapshot["seq"]
+                board = {item[0]: dict(zip(_SNAPSHOT_FIELDS, item)) for item in json.loads(snapshot["board"])}
+            
+            cursor.execute("SELECT seq FROM order_snapshots WHERE at > ? ORDER BY at LIMIT 1", (instant,))
+            following = cursor.fetchone()
+            if following is not None:
+                end_seq = following["seq"]
+        
+        cursor.execute("""
+            SELECT order_id, at, kind, status, source, client_name, description FROM order_events 
+            WHERE seq > ? AND seq <= ? AND at <= ?
+            ORDER BY seq
+        """, (start_seq, end_seq, instant))
+        _apply_events(board, cursor.fetchall())
+        conn.commit()
     
-    return deleted
+    orders = [
+        order for order in board.values()
+        if include_finished or STATUS_RANK[order["status"]] <= ACTIVE_MAX_RANK
+    ]
+    return sorted(orders, key=lambda order: (STATUS_RANK[order["status"]], order["created_at"], order["id"]))
+
 
+# Consultas quentes que agregam: podem agrupar e ordenar em B-tree
+# temporária, pois o fazem sobre poucas linhas já filtradas por índice
+AGGREGATE_HOT_QUERIES = {"prep_summary"}
 
-# Inicializa o banco de dados ao importar o módulo
-init_db()
+
+def explain_hot_queries() -> dict[str, list[str]]:
+    """
+    Retorna o EXPLAIN QUERY PLAN das consultas quentes do quadro.
+    
+    Usado por `tests/test_query_plans.py` para garantir que nenhuma
+    delas volte a varrer uma tabela nem, exceto o resumo de preparo
+    (`AGGREGATE_HOT_QUERIES`), a ordenar em B-tree temporária.
+    
+    Os planos usam índices sem cobertura de propósito: `orders` é lida
+    inteira (`SELECT *`), já que a tabela quente, compactada, tem poucas
+    centenas de linhas e cada busca pelo rowid cai em página já em cache.
+    
+    Returns:
+        Dicionário com o nome da consulta e as linhas do plano
+    """
+    queries = {
+        "active_orders": (_SQL_ACTIVE_ORDERS, (ACTIVE_MAX_RANK,)),
+        "all_orders": (_SQL_ALL_ORDERS, ()),
+        "orders_page": (_SQL_ORDERS_PAGE, (STATUS_RANK[STATUS_CANCELADO], 1, 0, 0, PAGE_SIZE + 1)),
+        "count_by_status": (_SQL_COUNT_BY_RANK, (ACTIVE_MAX_RANK,)),
+        "finished_before": (_SQL_FINISHED_BEFORE, (now_ms(), ARCHIVE_BATCH_SIZE)),
+        "changed_since": (_SQL_CHANGED_SINCE, (0,)),
+        "prep_summary": (_SQL_PREP_SUMMARY, (PREP_MAX_RANK, PREP_MAX_RANK)),
+    }
+    
+    plans = {}
+    with pooled_connection() as conn:
+        for name, (sql, params) in queries.items():
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+            plans[name] = [row[3] for row in rows]
+    
+    return plans
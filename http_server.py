@@ -0,0 +1,127 @@
+"""
+Saka Delivery KDS - Servidor HTTP/1.1 Mínimo
+Leitura de requisições e montagem de respostas compartilhadas pelo gateway
+de ingestão (`ingestion.py`) e pela API do quadro (`board_api.py`)
+
+Cada servidor só fornece a função de roteamento:
+    route(method, path, headers, body) -> (status, payload, cabeçalhos extras)
+
+`payload` pode ser um dict (JSON), bytes já serializados (JSON), str
+(texto puro, como o formato do Prometheus) ou None (resposta sem corpo).
+"""
+
+import asyncio
+import json
+import logging
+from typing import Awaitable, Callable, Optional, Union
+
+MAX_BODY_BYTES = 64 * 1024
+
+HTTP_REASONS = {
+    200: "OK",
+    201: "Created",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    413: "Payload Too Large",
+    422: "Unprocessable Entity",
+    500: "Internal Server Error",
+    503: "Service Unavailable"
+}
+
+Payload = Union[dict, bytes, str, None]
+Route = Callable[[str, str, dict[str, str], bytes], Awaitable[tuple[int, Payload, dict[str, str]]]]
+
+# Rotas GET que assumem a conexão (ex.: Server-Sent Events): (writer, cabeçalhos)
+StreamHandler = Callable[[asyncio.StreamWriter, dict[str, str]], Awaitable[None]]
+
+logger = logging.getLogger(__name__)
+
+
+async def read_headers(reader: asyncio.StreamReader) -> dict[str, str]:
+    """Lê os cabeçalhos HTTP até a linha em branco."""
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            return headers
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+
+def encode_response(status: int, payload: Payload, keep_alive: bool, extra: Optional[dict[str, str]] = None) -> bytes:
+    """Monta uma resposta HTTP/1.1 com corpo JSON, texto puro ou vazio (ver `Payload`)."""
+    if payload is None:
+        body, content_type = b"", None
+    elif isinstance(payload, str):
+        body, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+    elif isinstance(payload, bytes):
+        body, content_type = payload, "application/json; charset=utf-8"
+    else:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        content_type = "application/json; charset=utf-8"
+    
+    head = [f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}"]
+    if content_type:
+        head.append(f"Content-Type: {content_type}")
+    head.extend(f"{name}: {value}" for name, value in (extra or {}).items())
+    head.append(f"Content-Length: {len(body)}")
+    head.append(f"Connection: {'keep-alive' if keep_alive else 'close'}")
+    return ("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body
+
+
+def method_not_allowed(allowed: str) -> tuple[int, dict, dict[str, str]]:
+    """Resposta 405 com o cabeçalho `Allow`."""
+    return 405, {"error": f"Use {allowed}"}, {"Allow": allowed}
+
+
+async def serve_connection(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    route: Route,
+    streams: Optional[dict[str, StreamHandler]] = None,
+    max_body: int = MAX_BODY_BYTES
+) -> None:
+    """
+    Atende requisições HTTP/1.1 (com keep-alive) em uma conexão.
+    
+    Um GET para um caminho de `streams` entrega a conexão ao handler até o
+    cliente sair. Uma exceção em `route` vira 500 (e vai para o log), em
+    vez de derrubar a conexão sem resposta.
+    """
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+            path = target.split("?", 1)[0]
+            headers = await read_headers(reader)
+            length = int(headers.get("content-length", 0))
+            keep_alive = headers.get("connection", "").lower() != "close"
+            
+            if streams and method == "GET" and path in streams:
+                await streams[path](writer, headers)
+                return
+            
+            if length > max_body:
+                status, payload, extra, keep_alive = 413, {"error": "Corpo muito grande"}, {}, False
+            else:
+                body = await reader.readexactly(length) if length else b""
+                try:
+                    status, payload, extra = await route(method, path, headers, body)
+                except Exception:
+                    logger.exception("Falha ao atender %s %s", method, path)
+                    status, payload, extra = 500, {"error": "Erro interno"}, {}
+            
+            writer.write(encode_response(status, payload, keep_alive, extra))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
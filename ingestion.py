@@ -0,0 +1,458 @@
+"""
+Saka Delivery KDS - Gateway de Ingestão de Pedidos
+Recebe webhooks das plataformas (iFood, 99Food, WhatsApp) via HTTP,
+normaliza os payloads e grava no SQLite em micro-lotes
+
+Uso:
+    python ingestion.py serve [--host 0.0.0.0] [--port 8502]
+    python ingestion.py loadtest [--rate 200] [--duration 10] [--connections 4]
+
+Rotas:
+    POST /webhooks/ifood     {"id", "customer": {"name"}, "items": [str, ...]}
+    POST /webhooks/99food    {"order_id", "client_name", "description"}
+    POST /webhooks/whatsapp  {"client", "items"}  (JSON gerado pela IA)
+    POST /webhooks/whatsapp/chat  {"message"}  (conversa em texto, extraída pelo pipeline)
+    GET  /health             estatísticas do gateway
+    GET  /metrics            métricas no formato texto do Prometheus
+
+Cada POST só é respondido (201, {"order_id": N}) depois que o lote em que
+o pedido entrou foi gravado. Com a fila cheia, o gateway responde 503.
+Conversas do WhatsApp passam antes pelo pipeline de extração
+(`whatsapp_pipeline.py`), que roda fora do laço de eventos.
+"""
+
+import argparse
+import asyncio
+import json
+import queue
+import time
+from typing import Optional, Union
+
+import database as db
+import metrics
+import simulator
+from http_server import method_not_allowed, read_headers, serve_connection
+from whatsapp_pipeline import ExtractionError, ExtractionTimeout, WhatsAppPipeline
+
+# Limites do gateway
+QUEUE_MAX_SIZE = 10_000
+WRITER_BATCH_SIZE = 200
+WRITER_FLUSH_INTERVAL = 0.01  # segundos aguardando mais pedidos para o lote
+WHATSAPP_CHAT_PATH = "/webhooks/whatsapp/chat"
+
+
+class PayloadError(ValueError):
+    """Payload de webhook inválido para a plataforma informada."""
+
+
+# ============================================================================
+# NORMALIZAÇÃO DE PAYLOADS
+# ============================================================================
+
+def _require_text(value: object, field: str) -> str:
+    """Garante que o campo é um texto não vazio."""
+    if not isinstance(value, str) or not value.strip():
+        raise PayloadError(f"Campo obrigatório ausente ou vazio: {field}")
+    return value.strip()
+
+
+def _require_object(value: object, field: str) -> dict:
+    """Garante que o campo é um objeto JSON (ausente vale como objeto vazio)."""
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        raise PayloadError(f"Campo deve ser um objeto: {field}")
+    return value
+
+
+def normalize_ifood(payload: dict) -> tuple[str, str, str]:
+    """Converte o payload do iFood em (source, client_name, description)."""
+    customer = _require_object(payload.get("customer"), "customer")
+    items = payload.get("items")
+    if not isinstance(items, list) or not items:
+        raise PayloadError("Campo obrigatório ausente ou vazio: items")
+    
+    description = " + ".join(_require_text(item, "items[]") for item in items)
+    return db.FONTE_IFOOD, _require_text(customer.get("name"), "customer.name"), description
+
+
+def normalize_99food(payload: dict) -> tuple[str, str, str]:
+    """Converte o payload do 99Food em (source, client_name, description)."""
+    return (
+        db.FONTE_99FOOD,
+        _require_text(payload.get("client_name"), "client_name"),
+        _require_text(payload.get("description"), "description")
+    )
+
+
+def normalize_whatsapp(payload: dict) -> tuple[str, str, str]:
+    """Converte o JSON da IA do WhatsApp em (source, client_name, description)."""
+    return (
+        db.FONTE_WHATSAPP,
+        _require_text(payload.get("client"), "client"),
+        _require_text(payload.get("items"), "items")
+    )
+
+
+NORMALIZERS = {
+    db.FONTE_IFOOD: normalize_ifood,
+    db.FONTE_99FOOD: normalize_99food,
+    db.FONTE_WHATSAPP: normalize_whatsapp
+}
+
+
+def normalize_payload(platform: str, payload: object) -> tuple[str, str, str]:
+    """
+    Normaliza o payload de uma plataforma para os argumentos de `db.create_order`.
+    
+    Raises:
+        PayloadError: Plataforma desconhecida ou payload incompleto
+    """
+    normalizer = NORMALIZERS.get(platform)
+    if normalizer is None:
+        raise PayloadError(f"Plataforma desconhecida: {platform}")
+    if not isinstance(payload, dict):
+        raise PayloadError("O corpo deve ser um objeto JSON")
+    return normalizer(payload)
+
+
+# ============================================================================
+# GATEWAY (FILA + ESCRITOR EM LOTES + SERVIDOR HTTP)
+# ============================================================================
+
+class IngestionGateway:
+    """
+    Recebe pedidos, enfileira em memória e grava em micro-lotes.
+    
+    Um único escritor consome a fila: pega o primeiro pedido disponível,
+    junta o que mais chegar em até `flush_interval` segundos (no máximo
+    `batch_size` pedidos) e grava tudo com `db.create_orders_bulk`.
+    
+    Conversas do WhatsApp são extraídas pelo `pipeline` (threads próprias)
+    e o pedido resultante entra na mesma fila de gravação.
+    """
+    
+    def __init__(
+        self,
+        batch_size: int = WRITER_BATCH_SIZE,
+        flush_interval: float = WRITER_FLUSH_INTERVAL,
+        queue_size: int = QUEUE_MAX_SIZE,
+        pipeline: Optional[WhatsAppPipeline] = None
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self.pipeline = pipeline or WhatsAppPipeline(write=False)
+        self.stats = {"received": 0, "written": 0, "rejected": 0, "batches": 0, "largest_batch": 0}
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+    
+    async def start(self, host: str = "127.0.0.1", port: int = 8502) -> int:
+        """Inicia o escritor e o servidor HTTP. Retorna a porta efetiva."""
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._writer_task = asyncio.create_task(self._writer_loop())
+        self.pipeline.start()
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server.sockets[0].getsockname()[1]
+    
+    async def stop(self) -> None:
+        """Para de aceitar conexões, grava o que restou na fila e encerra."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        await asyncio.to_thread(self.pipeline.stop)
+        if self._queue is not None:
+            await self._queue.join()
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+            try:
+                await self._writer_task
+            except asyncio.CancelledError:
+                pass
+    
+    async def submit(self, order: tuple[str, str, str]) -> int:
+        """
+        Enfileira um pedido normalizado e aguarda sua gravação.
+        
+        Raises:
+            asyncio.QueueFull: Fila cheia (o chamador deve responder 503)
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((order, future))
+        self.stats["received"] += 1
+        return await future
+    
+    async def _writer_loop(self) -> None:
+        """Consome a fila e grava os pedidos em lotes."""
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            await self._flush(batch)
+    
+    async def _flush(self, batch: list) -> None:
+        """Grava um lote e resolve as respostas pendentes."""
+        orders = [order for order, _ in batch]
+        try:
+            order_ids = await asyncio.to_thread(db.create_orders_bulk, orders, self.batch_size)
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+        else:
+            for (_, future), order_id in zip(batch, order_ids):
+                if not future.done():
+                    future.set_result(order_id)
+            self.stats["written"] += len(order_ids)
+            self.stats["batches"] += 1
+            self.stats["largest_batch"] = max(self.stats["largest_batch"], len(order_ids))
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+    
+    async def _route(
+        self,
+        method: str,
+        path: str,
+        headers: dict[str, str],
+        body: bytes
+    ) -> tuple[int, Union[dict, str], dict[str, str]]:
+        """Despacha uma requisição e retorna (status HTTP, corpo JSON ou texto, cabeçalhos extras)."""
+        if path == "/health":
+            if method != "GET":
+                return method_not_allowed("GET")
+            return 200, {
+                "status": "ok",
+                "queue_depth": self._queue.qsize(),
+                **self.stats,
+                "whatsapp": self.pipeline.snapshot()
+            }, {}
+        
+        if path == "/metrics":
+            if method != "GET":
+                return method_not_allowed("GET")
+            return 200, metrics.export_prometheus(), {}
+        
+        if not path.startswith("/webhooks/"):
+            return 404, {"error": "Rota não encontrada"}, {}
+        if method != "POST":
+            return method_not_allowed("POST")
+        
+        if path == WHATSAPP_CHAT_PATH:
+            return await self._route_whatsapp_chat(body)
+        
+        platform = path[len("/webhooks/"):].strip("/")
+        try:
+            order = normalize_payload(platform, json.loads(body or b"null"))
+        except json.JSONDecodeError:
+            return 400, {"error": "JSON inválido"}, {}
+        except PayloadError as exc:
+            status = 404 if platform not in NORMALIZERS else 422
+            return status, {"error": str(exc)}, {}
+        
+        return await self._store(order)
+    
+    async def _route_whatsapp_chat(self, body: bytes) -> tuple[int, dict, dict[str, str]]:
+        """Extrai o pedido de uma conversa do WhatsApp no pipeline e o grava."""
+        try:
+            payload = json.loads(body or b"null")
+        except json.JSONDecodeError:
+            return 400, {"error": "JSON inválido"}, {}
+        message = payload.get("message") if isinstance(payload, dict) else None
+        if not isinstance(message, str) or not message.strip():
+            return 422, {"error": "Campo obrigatório ausente ou vazio: message"}, {}
+        
+        try:
+            order = await asyncio.wrap_future(self.pipeline.submit(message))
+        except queue.Full:
+            self.stats["rejected"] += 1
+            return 503, {"error": "Fila de extração cheia, tente novamente"}, {}
+        except ExtractionError as exc:
+            return 422, {"error": str(exc)}, {}
+        except ExtractionTimeout:
+            return 503, {"error": "Extração não respondeu a tempo, tente novamente"}, {}
+        except Exception:
+            return 500, {"error": "Falha na extração do pedido"}, {}
+        
+        return await self._store(order)
+    
+    async def _store(self, order: tuple[str, str, str]) -> tuple[int, dict, dict[str, str]]:
+        """Grava um pedido normalizado pela fila do escritor e monta a resposta."""
+        try:
+            order_id = await self.submit(order)
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            return 503, {"error": "Fila de ingestão cheia, tente novamente"}, {}
+        except Exception:
+            return 500, {"error": "Falha ao gravar o pedido"}, {}
+        
+        return 201, {"order_id": order_id}, {}
+    
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Atende requisições HTTP/1.1 (com keep-alive) em uma conexão."""
+        await serve_connection(reader, writer, self._route)
+
+
+# ============================================================================
+# CLIENTES SUBSTITUTOS (REPLAY DOS PAYLOADS DO SIMULADOR)
+# ============================================================================
+
+async def run_standin_client(
+    host: str,
+    port: int,
+    platform: str,
+    rate: float,
+    duration: float,
+    latencies: list[float]
+) -> int:
+    """
+    Envia payloads do simulador para o gateway em ritmo constante.
+    
+    Args:
+        platform: Fonte cujo formato de payload será usado (FONTE_*)
+        rate: Pedidos por segundo desta conexão
+        duration: Duração do envio em segundos
+        latencies: Lista que recebe a latência de cada ack, em segundos
+    
+    Returns:
+        Número de pedidos aceitos (HTTP 201)
+    """
+    loop = asyncio.get_running_loop()
+    reader, writer = await asyncio.open_connection(host, port)
+    make_payload = simulator.PAYLOAD_FACTORIES[platform]
+    interval = 1 / rate
+    next_send = loop.time()
+    end = next_send + duration
+    accepted = 0
+    
+    try:
+        while loop.time() < end:
+            body = json.dumps(make_payload()).encode("utf-8")
+            request = (
+                f"POST /webhooks/{platform} HTTP/1.1\r\n"
+                f"Host: {host}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n"
+            ).encode("latin-1") + body
+            
+            start = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            
+            status_line = await reader.readline()
+            headers = await read_headers(reader)
+            await reader.readexactly(int(headers.get("content-length", 0)))
+            latencies.append(time.perf_counter() - start)
+            
+            if status_line.split(b" ", 2)[1] == b"201":
+                accepted += 1
+            
+            next_send += interval
+            await asyncio.sleep(max(0.0, next_send - loop.time()))
+    finally:
+        writer.close()
+    
+    return accepted
+
+
+async def run_load_test(rate: float, duration: float, connections: int, port: int = 0) -> dict:
+    """
+    Sobe um gateway local e dispara clientes substitutos das três plataformas.
+    
+    A taxa total é dividida igualmente entre `connections` conexões por
+    plataforma. Retorna vazão sustentada e latências de ack em ms.
+    
+    Grava no banco corrente; pela linha de comando, o teste roda sobre um
+    banco temporário (`db.temporary_database`).
+    """
+    gateway = IngestionGateway()
+    port = await gateway.start("127.0.0.1", port)
+    latencies: list[float] = []
+    per_connection = rate / (len(NORMALIZERS) * connections)
+    
+    start = time.perf_counter()
+    results = await asyncio.gather(*(
+        run_standin_client("127.0.0.1", port, platform, per_connection, duration, latencies)
+        for platform in NORMALIZERS
+        for _ in range(connections)
+    ))
+    elapsed = time.perf_counter() - start
+    await gateway.stop()
+    
+    accepted = sum(results)
+    return {
+        "target_rate": rate,
+        "accepted": accepted,
+        "orders_per_second": accepted / elapsed,
+        "ack_p50_ms": metrics.percentile(latencies, 50) * 1000,
+        "ack_p95_ms": metrics.percentile(latencies, 95) * 1000,
+        "ack_p99_ms": metrics.percentile(latencies, 99) * 1000,
+        "batches": gateway.stats["batches"],
+        "largest_batch": gateway.stats["largest_batch"]
+    }
+
+
+# ============================================================================
+# LINHA DE COMANDO
+# ============================================================================
+
+async def _serve(host: str, port: int) -> None:
+    """Executa o gateway até ser interrompido."""
+    if metrics.ENABLED_BY_DEFAULT:
+        metrics.enable()
+    gateway = IngestionGateway()
+    port = await gateway.start(host, port)
+    print(f"Gateway de ingestão ouvindo em http://{host}:{port} (banco: {db.DB_PATH})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await gateway.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Gateway de ingestão de pedidos do Saka Delivery KDS")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    serve = commands.add_parser("serve", help="Recebe webhooks das plataformas")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8502)
+    
+    loadtest = commands.add_parser("loadtest", help="Mede vazão e latência com clientes substitutos")
+    loadtest.add_argument("--rate", type=float, default=200, help="Pedidos por segundo (total)")
+    loadtest.add_argument("--duration", type=float, default=10, help="Duração em segundos")
+    loadtest.add_argument("--connections", type=int, default=4, help="Conexões por plataforma")
+    
+    args = parser.parse_args()
+    
+    if args.command == "serve":
+        try:
+            asyncio.run(_serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+    else:
+        # Os pedidos sintéticos vão para um banco descartável, nunca para o da loja
+        with db.temporary_database(prefix="saka-ingestion-"):
+            result = asyncio.run(run_load_test(args.rate, args.duration, args.connections))
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
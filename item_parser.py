@@ -0,0 +1,152 @@
+"""
+Saka Delivery KDS - Interpretação das Descrições de Pedidos
+Transforma a descrição em texto livre ("2x Açaí 300ml + Morango") em itens
+estruturados: quantidade, tamanho, produto base e coberturas
+"""
+
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+# As descrições se repetem muito (cardápio fixo): poucas centenas cobrem o dia
+PARSE_CACHE_SIZE = 1024
+
+# Maior inteiro que o SQLite guarda em order_items (quantidade e tamanho)
+MAX_INTEGER = 2**63 - 1
+
+# "2x " no início de um trecho abre um novo item
+_QUANTITY = re.compile(r"^(\d+)\s*[xX]\s+(.*)$")
+
+# Tamanho em ml ou litros: "500ml", "1L", "1,5 l"
+_SIZE = re.compile(r"(\d+(?:[.,]\d+)?)\s*(ml|l)\b", re.IGNORECASE)
+
+# Item interno de um combo: "Combo Família (3x Açaí 400ml)"
+_COMBO = re.compile(r"^(.*?)\s*\(\s*(\d+\s*[xX]\s+[^)]*)\)\s*(.*)$")
+
+
+class LineItem(NamedTuple):
+    """Um item do pedido; `toppings` vale para cada unidade da quantidade."""
+    quantity: int
+    size_ml: Optional[int]
+    product: str
+    variant: str
+    toppings: tuple[str, ...]
+
+
+def _clean(text: str) -> str:
+    """Remove espaços repetidos e nas pontas."""
+    return " ".join(text.split())
+
+
+def _size_ml(amount: str, unit: str) -> int:
+    """Converte o tamanho encontrado no texto para mililitros."""
+    value = float(amount.replace(",", "."))
+    return round(value * 1000) if unit.lower() == "l" else round(value)
+
+
+def _parse_head(text: str, quantity: int) -> tuple[int, Optional[int], str, str]:
+    """
+    Interpreta o trecho principal de um item (sem coberturas).
+    
+    Um parêntese com quantidade é um combo ("Combo Família (3x Açaí 400ml)")
+    quando o tamanho está dentro dele. Se o tamanho está fora ("Açaí
+    (2x Copo) 300ml") ou o conteúdo não é um item ("Açaí (2x )"), o
+    parêntese é só uma observação e vai para a variação.
+    
+    Returns:
+        Tupla (quantidade, tamanho_ml, produto, variação)
+    """
+    combo = _COMBO.match(text)
+    if combo:
+        name, inner, rest = combo.groups()
+        inner_match = _QUANTITY.match(_clean(inner))
+        outside = _clean(f"{name} {rest}")
+        if inner_match and not _SIZE.search(outside):
+            inner_quantity, size_ml, product, variant = _parse_head(inner_match.group(2), int(inner_match.group(1)))
+            variant = _clean(" ".join(part for part in (name, variant, rest) if part))
+            return quantity * inner_quantity, size_ml, product, variant
+        
+        note = f"({_clean(inner)})"
+        if outside:
+            quantity, size_ml, product, variant = _parse_head(outside, quantity)
+            return quantity, size_ml, product, _clean(f"{variant} {note}")
+        return quantity, None, note, ""
+    
+    size = _SIZE.search(text)
+    if not size:
+        return quantity, None, text, ""
+    
+    product = _clean(text[:size.start()])
+    variant = _clean(text[size.end():])
+    if not product:
+        product, variant = variant, ""
+    return quantity, _size_ml(*size.groups()), product or _clean(text), variant
+
+
+def _unparsed(description: str) -> list[LineItem]:
+    """Descrição fora do padrão: um único item com o texto inteiro como produto."""
+    return [LineItem(1, None, _clean(description), "", ())]
+
+
+def _parse_items(description: str) -> list[LineItem]:
+    """
+    Itens da descrição (ver `parse_description`).
+    
+    Quantidade ou tamanho que não cabem em order_items tornam a descrição
+    inteira fora do padrão.
+    """
+    items: list[LineItem] = []
+    
+    for part in description.split("+"):
+        part = _clean(part)
+        if not part:
+            continue
+        
+        quantity_match = _QUANTITY.match(part)
+        if quantity_match or not items:
+            quantity, text = (int(quantity_match.group(1)), quantity_match.group(2)) if quantity_match else (1, part)
+            quantity, size_ml, product, variant = _parse_head(text, quantity)
+            if not 0 < quantity <= MAX_INTEGER or (size_ml is not None and not 0 <= size_ml <= MAX_INTEGER):
+                return _unparsed(description)
+            items.append(LineItem(quantity, size_ml, product, variant, ()))
+        else:
+            items[-1] = items[-1]._replace(toppings=items[-1].toppings + (part,))
+    
+    return items
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_description(description: Optional[str]) -> tuple[LineItem, ...]:
+    """
+    Quebra a descrição de um pedido em itens estruturados.
+    
+    Trechos são separados por "+"; um trecho que começa com quantidade
+    ("1x Água de Coco") abre um novo item, os demais são coberturas do item
+    anterior. Sem quantidade explícita, o item conta como 1. Descrições fora
+    do padrão viram um único item com o texto inteiro como produto; nenhum
+    texto levanta exceção, pois isto roda dentro da gravação do pedido.
+    Descrição vazia ou None não tem itens.
+    
+    Memorizado pelo texto: o resultado é imutável e compartilhado.
+    
+    Example:
+        >>> parse_description("2x Açaí 300ml + Morango + Leite em Pó")
+        (LineItem(quantity=2, size_ml=300, product='Açaí', variant='', toppings=('Morango', 'Leite em Pó')),)
+    """
+    if not description:
+        return ()
+    try:
+        return tuple(_parse_items(description))
+    except (ValueError, OverflowError):
+        # Números que o Python não converte: mais dígitos que o limite de
+        # int() ou tamanho que vira float infinito
+        return tuple(_unparsed(description))
+
+
+def format_size(size_ml: Optional[int]) -> str:
+    """Tamanho para exibição ("500ml", "1L"; "—" sem tamanho)."""
+    if size_ml is None:
+        return "—"
+    if size_ml >= 1000 and size_ml % 100 == 0:
+        return f"{size_ml / 1000:g}L"
+    return f"{size_ml}ml"
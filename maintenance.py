@@ -0,0 +1,83 @@
+"""
+Saka Delivery KDS - Manutenção em Segundo Plano
+Compacta a tabela quente movendo pedidos finalizados para o arquivo e
+grava snapshots periódicos do log de eventos e descarta lápides antigas
+"""
+
+import logging
+import threading
+from typing import Optional
+
+import database as db
+
+# Pedidos finalizados ficam no quadro ("Mostrar finalizados") por este tempo
+ARCHIVE_AFTER_HOURS = 2
+
+# Intervalo entre rodadas de compactação
+COMPACTION_INTERVAL_SECONDS = 60
+
+# Lotes por rodada, para limitar o trabalho de cada ciclo
+COMPACTION_MAX_BATCHES = 10
+
+logger = logging.getLogger(__name__)
+
+
+class Compactor:
+    """
+    Thread de fundo que arquiva pedidos finalizados periodicamente.
+    
+    Cada rodada move no máximo `max_batches` lotes de
+    `db.ARCHIVE_BATCH_SIZE` pedidos, mantendo a tabela `orders` pequena
+    sem longas transações.
+    """
+    
+    def __init__(
+        self,
+        archive_after_hours: float = ARCHIVE_AFTER_HOURS,
+        interval: float = COMPACTION_INTERVAL_SECONDS,
+        max_batches: int = COMPACTION_MAX_BATCHES
+    ):
+        self.archive_after_hours = archive_after_hours
+        self.interval = interval
+        self.max_batches = max_batches
+        self.total_archived = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def run_once(self) -> int:
+        """
+        Executa uma rodada de compactação e retorna quantos pedidos moveu.
+        
+        Aproveita a rodada para gravar um snapshot do quadro no log de
+        eventos, se já houver eventos suficientes desde o último, e para
+        descartar lápides antigas (`db.prune_tombstones`).
+        """
+        archived = db.archive_finished_orders(
+            hours=self.archive_after_hours,
+            max_batches=self.max_batches
+        )
+        self.total_archived += archived
+        db.snapshot_if_due()
+        db.prune_tombstones()
+        return archived
+    
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Falha na compactação de pedidos finalizados")
+    
+    def start(self) -> "Compactor":
+        """Inicia a thread (daemon) se ainda não estiver rodando."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="saka-compactor", daemon=True)
+            self._thread.start()
+        return self
+    
+    def stop(self) -> None:
+        """Sinaliza a parada e aguarda a thread terminar."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,358 @@
+"""
+Saka Delivery KDS - Instrumentação de Desempenho
+Mede tempo, linhas e erros das funções do banco e das etapas de
+renderização em histogramas de janela deslizante, com exportação no
+formato texto do Prometheus
+"""
+
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from typing import Callable, Optional
+
+# Coleta ligada por padrão; SAKA_METRICS=0 desliga desde a inicialização
+ENABLED_BY_DEFAULT = os.environ.get("SAKA_METRICS", "1") != "0"
+
+# Limites superiores dos baldes, em segundos (o último balde é +Inf)
+BUCKET_BOUNDS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5
+)
+
+# Janela deslizante do painel: WINDOW_SLOTS fatias de SLOT_SECONDS cada
+SLOT_SECONDS = 10
+WINDOW_SLOTS = 6
+
+# Funções de database.py que não são operações de banco ou que rodam em
+# toda chamada (medi-las só somaria ruído às demais)
+_SKIPPED_DB_FUNCTIONS = {
+    "now_ms", "to_epoch_ms", "from_epoch_ms", "can_transition",
+    "ensure_schema", "pooled_connection", "close_connections", "close_database",
+    "current_path", "is_memory_path", "use_database", "temporary_database"
+}
+
+
+class RollingHistogram:
+    """
+    Histograma de latências de uma operação.
+    
+    Mantém os totais desde o início (para o Prometheus) e um anel de
+    `WINDOW_SLOTS` fatias com os últimos `SLOT_SECONDS * WINDOW_SLOTS`
+    segundos (para o painel). Registrar custa uma busca binária nos
+    baldes e alguns incrementos sob um lock.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total_buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.total_count = 0
+        self.total_sum = 0.0
+        self.total_rows = 0
+        self.total_errors = 0
+        # Cada fatia: [id da fatia, baldes, soma, linhas, erros]
+        self._slots = [[-1, [0] * (len(BUCKET_BOUNDS) + 1), 0.0, 0, 0] for _ in range(WINDOW_SLOTS)]
+    
+    def _slot(self, now: float) -> list:
+        """Fatia corrente do anel, zerada se pertencer a uma volta anterior."""
+        slot_id = int(now // SLOT_SECONDS)
+        slot = self._slots[slot_id % WINDOW_SLOTS]
+        if slot[0] != slot_id:
+            slot[0] = slot_id
+            slot[1] = [0] * (len(BUCKET_BOUNDS) + 1)
+            slot[2] = 0.0
+            slot[3] = 0
+            slot[4] = 0
+        return slot
+    
+    def record(self, seconds: float, rows: Optional[int] = None, error: bool = False) -> None:
+        """Registra uma execução."""
+        index = bisect_left(BUCKET_BOUNDS, seconds)
+        with self._lock:
+            slot = self._slot(time.monotonic())
+            slot[1][index] += 1
+            slot[2] += seconds
+            self.total_buckets[index] += 1
+            self.total_count += 1
+            self.total_sum += seconds
+            if rows:
+                slot[3] += rows
+                self.total_rows += rows
+            if error:
+                slot[4] += 1
+                self.total_errors += 1
+    
+    def window(self) -> dict:
+        """
+        Resumo da janela deslizante.
+        
+        Returns:
+            Dicionário com count, rows, errors, mean_ms, p50_ms, p95_ms e p99_ms
+        """
+        current = int(time.monotonic() // SLOT_SECONDS)
+        buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+        total_sum = 0.0
+        rows = errors = 0
+        with self._lock:
+            for slot_id, slot_buckets, slot_sum, slot_rows, slot_errors in self._slots:
+                if current - slot_id >= WINDOW_SLOTS:
+                    continue
+                for index, count in enumerate(slot_buckets):
+                    buckets[index] += count
+                total_sum += slot_sum
+                rows += slot_rows
+                errors += slot_errors
+        
+        count = sum(buckets)
+        return {
+            "count": count,
+            "rows": rows,
+            "errors": errors,
+            "mean_ms": total_sum / count * 1000 if count else 0.0,
+            "p50_ms": _bucket_quantile(buckets, 0.50) * 1000,
+            "p95_ms": _bucket_quantile(buckets, 0.95) * 1000,
+            "p99_ms": _bucket_quantile(buckets, 0.99) * 1000
+        }
+
+
+def _bucket_quantile(buckets: list[int], quantile: float) -> float:
+    """Estima o quantil interpolando linearmente dentro do balde que o contém."""
+    total = sum(buckets)
+    if not total:
+        return 0.0
+    
+    target = quantile * total
+    seen = 0
+    for index, count in enumerate(buckets):
+        if count and seen + count >= target:
+            if index == len(BUCKET_BOUNDS):
+                return BUCKET_BOUNDS[-1]  # balde +Inf: o melhor limite conhecido
+            lower = BUCKET_BOUNDS[index - 1] if index else 0.0
+            return lower + (BUCKET_BOUNDS[index] - lower) * (target - seen) / count
+        seen += count
+    return BUCKET_BOUNDS[-1]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """
+    Percentil exato de uma amostra, por posição mais próxima.
+    
+    Usado pelos testes de carga e benchmarks, que guardam cada latência;
+    os histogramas acima estimam pelos baldes.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+# ============================================================================
+# REGISTRO GLOBAL
+# ============================================================================
+
+_histograms: dict[str, RollingHistogram] = {}
+_histograms_lock = threading.Lock()
+_enabled = False
+
+# Funções originais substituídas por `instrument()`: (objeto, nome) -> função
+_originals: dict[tuple[object, str], Callable] = {}
+
+
+def histogram(name: str) -> RollingHistogram:
+    """Histograma da operação `name`, criado na primeira utilização."""
+    hist = _histograms.get(name)
+    if hist is None:
+        with _histograms_lock:
+            hist = _histograms.setdefault(name, RollingHistogram())
+    return hist
+
+
+def is_enabled() -> bool:
+    """Indica se a coleta está ligada."""
+    return _enabled
+
+
+def _count_rows(result: object) -> Optional[int]:
+    """Linhas devolvidas por uma função do banco, quando fizer sentido."""
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, dict):
+        for key in ("orders", "changed", "updated"):
+            if isinstance(result.get(key), list):
+                return len(result[key])
+    return None
+
+
+def _timed(name: str, func: Callable) -> Callable:
+    """Envolve `func` registrando tempo, linhas e erros em `name`."""
+    hist = histogram(name)
+    
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            hist.record(time.perf_counter() - start, error=True)
+            raise
+        hist.record(time.perf_counter() - start, _count_rows(result))
+        return result
+    
+    return wrapper
+
+
+def instrument(owner: object, names: list[str], prefix: str) -> None:
+    """
+    Substitui as funções `names` de `owner` (módulo ou classe) por versões medidas.
+    
+    Quem chama via atributo (`db.get_all_orders(...)`) passa a ser medido;
+    `disable()` devolve as funções originais, sem custo residual.
+    """
+    for name in names:
+        key = (owner, name)
+        if key in _originals:
+            continue
+        original = getattr(owner, name)
+        _originals[key] = original
+        setattr(owner, name, _timed(f"{prefix}.{name}", original))
+
+
+def _database_functions() -> list[str]:
+    """Funções públicas de database.py que fazem operações no banco."""
+    import database as db
+    
+    return [
+        name for name, value in vars(db).items()
+        if callable(value) and not name.startswith("_") and not isinstance(value, type)
+        and getattr(value, "__module__", None) == db.__name__ and name not in _SKIPPED_DB_FUNCTIONS
+    ]
+
+
+def enable() -> None:
+    """Liga a coleta e instrumenta as funções públicas de database.py."""
+    global _enabled
+    import database as db
+    
+    instrument(db, _database_functions(), "db")
+    # Tempo para obter uma conexão (reaproveitada ou aberta agora)
+    instrument(db.ConnectionPool, ["acquire"], "db.pool")
+    _enabled = True
+
+
+def disable() -> None:
+    """Desliga a coleta e restaura as funções originais."""
+    global _enabled
+    _enabled = False
+    for (owner, name), original in _originals.items():
+        setattr(owner, name, original)
+    _originals.clear()
+
+
+def reset() -> None:
+    """Descarta todos os histogramas."""
+    with _histograms_lock:
+        _histograms.clear()
+
+
+class _Stage:
+    """Context manager que mede um trecho de código em um histograma."""
+    
+    __slots__ = ("hist", "start")
+    
+    def __init__(self, hist: RollingHistogram):
+        self.hist = hist
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.hist.record(time.perf_counter() - self.start, error=exc_type is not None)
+        return False
+
+
+_NULL_STAGE = nullcontext()
+
+
+def stage(name: str):
+    """
+    Mede um trecho com `with metrics.stage("app.render.board_html"):`.
+    
+    Desligado, devolve um context manager vazio compartilhado.
+    """
+    if not _enabled:
+        return _NULL_STAGE
+    return _Stage(histogram(name))
+
+
+# ============================================================================
+# EXPORTAÇÃO
+# ============================================================================
+
+def snapshot() -> list[dict]:
+    """Resumo da janela deslizante de cada operação, da mais lenta (p95) à mais rápida."""
+    with _histograms_lock:
+        items = list(_histograms.items())
+    
+    rows = [{"operation": name, **hist.window()} for name, hist in items]
+    rows = [row for row in rows if row["count"]]
+    return sorted(rows, key=lambda row: row["p95_ms"], reverse=True)
+
+
+def _label(value: str) -> str:
+    """Escapa um valor de label do Prometheus."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def export_prometheus() -> str:
+    """Todos os histogramas no formato texto do Prometheus (totais desde o início)."""
+    with _histograms_lock:
+        items = sorted(_histograms.items())
+    
+    lines = [
+        "# HELP saka_operation_duration_seconds Duração das operações instrumentadas.",
+        "# TYPE saka_operation_duration_seconds histogram"
+    ]
+    rows_lines = [
+        "# HELP saka_operation_rows_total Linhas devolvidas pelas operações.",
+        "# TYPE saka_operation_rows_total counter"
+    ]
+    error_lines = [
+        "# HELP saka_operation_errors_total Execuções que terminaram em exceção.",
+        "# TYPE saka_operation_errors_total counter"
+    ]
+    
+    for name, hist in items:
+        label = f'operation="{_label(name)}"'
+        with hist._lock:
+            buckets = list(hist.total_buckets)
+            count, total_sum = hist.total_count, hist.total_sum
+            total_rows, total_errors = hist.total_rows, hist.total_errors
+        
+        cumulative = 0
+        for bound, bucket in zip(BUCKET_BOUNDS, buckets):
+            cumulative += bucket
+            lines.append(f'saka_operation_duration_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+        lines.append(f'saka_operation_duration_seconds_bucket{{{label},le="+Inf"}} {count}')
+        lines.append(f"saka_operation_duration_seconds_sum{{{label}}} {total_sum:.6f}")
+        lines.append(f"saka_operation_duration_seconds_count{{{label}}} {count}")
+        rows_lines.append(f"saka_operation_rows_total{{{label}}} {total_rows}")
+        error_lines.append(f"saka_operation_errors_total{{{label}}} {total_errors}")
+    
+    return "\n".join(lines + rows_lines + error_lines) + "\n"
+
+
+def write_prometheus(path: str) -> None:
+    """
+    Grava a exportação em arquivo (ex.: para o textfile collector do node_exporter).
+    
+    Escreve em um arquivo temporário e renomeia, para o coletor nunca ler
+    um arquivo pela metade.
+    """
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        file.write(export_prometheus())
+    os.replace(temp_path, path)
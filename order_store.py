@@ -0,0 +1,261 @@
+"""
+Saka Delivery KDS - Armazenamento Compartilhado de Pedidos
+Mantém os pedidos ativos em memória, compartilhados por todas as sessões
+do processo, com escrita direta (write-through) no SQLite
+"""
+
+import sqlite3
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+import database as db
+
+# Intervalo mínimo entre verificações de mudanças feitas por outros processos
+CHECK_INTERVAL_SECONDS = 0.25
+
+ACTIVE_STATUSES = (db.STATUS_NOVO, db.STATUS_PREPARANDO, db.STATUS_PRONTO)
+
+# Ouvinte de mudanças: recebe {"revision", "new", "status", "removed"} (ver `add_listener`)
+DeltaListener = Callable[[dict], None]
+
+
+class OrderStore:
+    """
+    Cópia em memória do quadro ativo (novo, preparando, pronto).
+    
+    - Leituras não tocam no banco: contadores são mantidos incrementalmente
+      (O(1)) e a lista ordenada só é refeita quando algo muda.
+    - Escritas passam pelo store, vão direto para `database.py` e em seguida
+      o store aplica apenas o delta (`db.get_orders_changed_since`).
+    - Escritas de outros processos são detectadas com `PRAGMA data_version`
+      em uma conexão dedicada, no máximo a cada `check_interval` segundos.
+    - Ouvintes (`add_listener`) recebem o delta do quadro a cada refresh que
+      muda algo, qualquer que seja a origem da escrita.
+    """
+    
+    def __init__(self, check_interval: float = CHECK_INTERVAL_SECONDS):
+        self.check_interval = check_interval
+        self._lock = threading.RLock()
+        self._orders: dict[int, dict] = {}
+        self._ids_by_status: dict[str, set[int]] = {status: set() for status in ACTIVE_STATUSES}
+        self._sorted: Optional[list[dict]] = None
+        self._revision = 0
+        self._watch_conn: Optional[sqlite3.Connection] = None
+        self._data_version: Optional[int] = None
+        self._last_check = 0.0
+        self._listeners: list[DeltaListener] = []
+        self.refresh(force=True)
+    
+    def add_listener(self, listener: DeltaListener) -> None:
+        """
+        Registra uma função chamada a cada mudança no quadro ativo.
+        
+        O delta tem `revision`, `new` (pedidos que entraram no quadro),
+        `status` (pedidos que mudaram de status, inclusive para saiu ou
+        cancelado, que saem do quadro) e `removed` (IDs removidos ou
+        arquivados). A chamada acontece na thread que fez o refresh, com o
+        lock do store: o ouvinte deve só repassar o delta, sem bloquear.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+    
+    def remove_listener(self, listener: DeltaListener) -> None:
+        """Remove um ouvinte registrado com `add_listener`."""
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+    
+    # ----- Sincronização -----
+    
+    def _data_version_changed(self) -> bool:
+        """Indica se algum commit aconteceu no banco desde a última verificação."""
+        if self._watch_conn is None:
+            self._watch_conn = db.get_connection()
+        
+        version = self._watch_conn.execute("PRAGMA data_version").fetchone()[0]
+        changed = version != self._data_version
+        self._data_version = version
+        return changed
+    
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Aplica mudanças pendentes do banco.
+        
+        Args:
+            force: Ignora o intervalo mínimo e o data_version e lê o delta
+        
+        Returns:
+            True se algum pedido mudou
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force:
+                if now - self._last_check < self.check_interval:
+                    return False
+                self._last_check = now
+                if not self._data_version_changed():
+                    return False
+            else:
+                self._last_check = now
+            
+            delta = db.get_orders_changed_since(self._revision)
+            if delta["revision"] == self._revision:
+                return False
+            if delta["reset"]:
+                # Carga completa: o que não veio nela saiu do banco
+                loaded = {order["id"] for order in delta["changed"]}
+                delta["removed"] = [order_id for order_id in self._orders if order_id not in loaded]
+            
+            board_delta = self._board_delta(delta) if self._listeners else None
+            for order in delta["changed"]:
+                self._apply(order)
+            for order_id in delta["removed"]:
+                self._discard(order_id)
+            
+            self._revision = delta["revision"]
+            if board_delta is not None and (board_delta["new"] or board_delta["status"] or board_delta["removed"]):
+                for listener in self._listeners:
+                    listener(board_delta)
+            return bool(delta["changed"] or delta["removed"])
+    
+    def _board_delta(self, delta: dict) -> dict:
+        """Classifica o delta do banco em relação ao quadro ativo, antes de aplicá-lo."""
+        new, changed_status = [], []
+        for order in delta["changed"]:
+            previous = self._orders.get(order["id"])
+            if previous is None:
+                if order["status"] in self._ids_by_status:
+                    new.append(order)
+            elif previous["status"] != order["status"]:
+                changed_status.append(order)
+        removed = [order_id for order_id in delta["removed"] if order_id in self._orders]
+        return {"revision": delta["revision"], "new": new, "status": changed_status, "removed": removed}
+    
+    def _apply(self, order: dict) -> None:
+        """Insere, atualiza ou remove um pedido conforme seu novo status."""
+        self._discard(order["id"])
+        if order["status"] in self._ids_by_status:
+            self._orders[order["id"]] = order
+            self._ids_by_status[order["status"]].add(order["id"])
+        self._sorted = None
+    
+    def _discard(self, order_id: int) -> None:
+        """Remove um pedido dos índices em memória, se estiver lá."""
+        order = self._orders.pop(order_id, None)
+        if order is not None:
+            self._ids_by_status[order["status"]].discard(order_id)
+            self._sorted = None
+    
+    # ----- Leituras (servidas da memória) -----
+    
+    @property
+    def revision(self) -> int:
+        """Revisão do banco refletida no store."""
+        self.refresh()
+        return self._revision
+    
+    def get_counts(self) -> dict[str, int]:
+        """Contagem de pedidos ativos por status, como `db.get_orders_count_by_status`."""
+        self.refresh()
+        with self._lock:
+            return self._counts()
+    
+    def get_orders(self) -> list[dict]:
+        """Pedidos ativos na ordem do quadro, como `db.get_all_orders()` (cópias)."""
+        self.refresh()
+        with self._lock:
+            return [dict(order) for order in self._sorted_orders()]
+    
+    def get_board(self) -> dict:
+        """
+        Revisão, pedidos ativos e contagens lidos do mesmo estado.
+        
+        Chamadas separadas a `revision`, `get_orders` e `get_counts` podem
+        pegar um refresh no meio; aqui os três saem juntos, sob o lock. Os
+        pedidos são cópias: alterá-los não afeta o store.
+        """
+        self.refresh()
+        with self._lock:
+            return {
+                "revision": self._revision,
+                "orders": [dict(order) for order in self._sorted_orders()],
+                "counts": self._counts()
+            }
+    
+    def _counts(self) -> dict[str, int]:
+        return {status: len(ids) for status, ids in self._ids_by_status.items()}
+    
+    def _sorted_orders(self) -> list[dict]:
+        """Lista ordenada em cache, refeita só depois de uma mudança (chamar com o lock)."""
+        if self._sorted is None:
+            self._sorted = sorted(
+                self._orders.values(),
+                key=lambda o: (db.STATUS_RANK[o["status"]], o["created_at"], o["id"])
+            )
+        return self._sorted
+    
+    def get_order(self, order_id: int) -> Optional[dict]:
+        """Pedido ativo pelo ID; recorre ao banco para pedidos finalizados."""
+        self.refresh()
+        with self._lock:
+            order = self._orders.get(order_id)
+            if order is not None:
+                return dict(order)
+        return db.get_order_by_id(order_id)
+    
+    # ----- Escritas (write-through) -----
+    
+    def create_order(self, source: str, client_name: str, description: str) -> int:
+        """Cria o pedido no banco e o incorpora ao store."""
+        order_id = db.create_order(source, client_name, description)
+        self.refresh(force=True)
+        return order_id
+    
+    def create_orders_bulk(self, orders: Iterable[tuple[str, str, str]]) -> list[int]:
+        """Cria vários pedidos no banco e os incorpora ao store."""
+        order_ids = db.create_orders_bulk(orders)
+        self.refresh(force=True)
+        return order_ids
+    
+    def update_order_status(self, order_id: int, new_status: str) -> bool:
+        """Atualiza o status no banco e reflete a mudança no store."""
+        success = db.update_order_status(order_id, new_status)
+        if success:
+            self.refresh(force=True)
+        return success
+    
+    def transition_order(self, order_id: int, expected_status: str, new_status: str) -> dict:
+        """Compare-and-set de um pedido (ver `db.transition_order`)."""
+        return self.transition_orders([order_id], expected_status, new_status)
+    
+    def transition_orders(
+        self,
+        order_ids: Optional[Iterable[int]],
+        expected_status: str,
+        new_status: str
+    ) -> dict:
+        """
+        Compare-and-set em lote (ver `db.transition_orders`).
+        
+        Conflitos também forçam o refresh: o pedido mudou em outra tela e o
+        store precisa mostrar o status atual.
+        """
+        result = db.transition_orders(order_ids, expected_status, new_status)
+        if result["updated"] or result["conflicts"]:
+            self.refresh(force=True)
+        return result
+    
+    def delete_order(self, order_id: int) -> bool:
+        """Remove o pedido do banco e do store."""
+        success = db.delete_order(order_id)
+        if success:
+            self.refresh(force=True)
+        return success
+    
+    def clear_old_orders(self, hours: int = 24) -> int:
+        """Arquiva finalizados antigos no banco (não afeta o quadro ativo)."""
+        deleted = db.clear_old_orders(hours)
+        if deleted:
+            self.refresh(force=True)
+        return deleted
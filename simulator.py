@@ -0,0 +1,116 @@
+"""
+Saka Delivery KDS - Simulador de Pedidos
+Massas de dados das plataformas usadas pelo painel Debug, pelo gateway
+de ingestão e pelos benchmarks
+"""
+
+import random
+import uuid
+
+import database as db
+
+# ============================================================================
+# MASSAS DE DADOS POR PLATAFORMA
+# ============================================================================
+
+IFOOD_ITEMS = [
+    "1x Açaí 500ml Tradicional + Granola + Leite Condensado + Banana",
+    "2x Açaí 300ml + Morango + Leite em Pó",
+    "1x Açaí 700ml Premium + Frutas Variadas + Mel + Paçoca",
+    "1x Açaí 500ml + Nutella + Morango + Granola",
+    "2x Açaí 400ml Fitness + Whey + Banana + Aveia"
+]
+IFOOD_CLIENTS = ["Maria Silva", "João Santos", "Ana Oliveira", "Pedro Costa", "Julia Lima"]
+
+FOOD99_ITEMS = [
+    "1x Açaí 600ml + Frutas da Estação + Granola + Mel",
+    "1x Açaí Bowl Grande + Banana + Morango + Kiwi",
+    "2x Açaí 350ml Tradicional + Leite Condensado",
+    "1x Açaí 500ml + Nutella + Amendoim + Leite em Pó",
+    "1x Combo Família (3x Açaí 400ml) + Coberturas Variadas"
+]
+FOOD99_CLIENTS = ["Carlos Mendes", "Fernanda Souza", "Ricardo Lima", "Patrícia Santos", "Bruno Alves"]
+
+# JSON já processado pela IA a partir da conversa no WhatsApp
+WHATSAPP_ORDERS = [
+    {"client": "Thiago Ferreira", "items": "2x Açaí 500ml + 1x Suco Natural Laranja 500ml"},
+    {"client": "Amanda Costa", "items": "1x Açaí 700ml com tudo + 1x Água de Coco"},
+    {"client": "Rafael Martins", "items": "3x Açaí 300ml Kids + Confete + Granola"},
+    {"client": "Camila Rocha", "items": "1x Açaí 1L para viagem + Potes extras de cobertura"},
+    {"client": "Lucas Pereira", "items": "2x Açaí Fitness 500ml + Whey + Banana + Sem açúcar"}
+]
+
+# Conversas como chegam no WhatsApp, antes da IA (ver `whatsapp_pipeline.py`)
+WHATSAPP_CHAT_TEMPLATES = [
+    "Oi! Aqui é {client} 😊\n{items}\nObrigado!",
+    "Boa noite, meu nome é {client}.\nQueria pedir:\n{items}",
+    "Olá\nNome: {client}\nPedido: {items}\nPode mandar pra entrega?"
+]
+
+
+# ============================================================================
+# PEDIDOS NORMALIZADOS (source, client_name, description)
+# ============================================================================
+
+def random_ifood_order() -> tuple[str, str, str]:
+    """Sorteia um pedido iFood já no formato aceito por `db.create_order`."""
+    return db.FONTE_IFOOD, random.choice(IFOOD_CLIENTS), random.choice(IFOOD_ITEMS)
+
+
+def random_99food_order() -> tuple[str, str, str]:
+    """Sorteia um pedido 99Food já no formato aceito por `db.create_order`."""
+    return db.FONTE_99FOOD, random.choice(FOOD99_CLIENTS), random.choice(FOOD99_ITEMS)
+
+
+def random_whatsapp_order() -> tuple[str, str, str]:
+    """Sorteia um pedido WhatsApp já no formato aceito por `db.create_order`."""
+    order = random.choice(WHATSAPP_ORDERS)
+    return db.FONTE_WHATSAPP, order["client"], order["items"]
+
+
+def whatsapp_chat_message() -> str:
+    """Sorteia uma mensagem de WhatsApp em texto livre, ainda sem a extração da IA."""
+    order = random.choice(WHATSAPP_ORDERS)
+    return random.choice(WHATSAPP_CHAT_TEMPLATES).format(**order)
+
+
+RANDOM_ORDER_FACTORIES = (random_ifood_order, random_99food_order, random_whatsapp_order)
+
+
+def random_order() -> tuple[str, str, str]:
+    """Sorteia um pedido de qualquer plataforma."""
+    return random.choice(RANDOM_ORDER_FACTORIES)()
+
+
+# ============================================================================
+# PAYLOADS NO FORMATO DE CADA PLATAFORMA (webhooks)
+# ============================================================================
+
+def ifood_payload() -> dict:
+    """Payload de webhook no formato simplificado do iFood."""
+    return {
+        "id": uuid.uuid4().hex,
+        "customer": {"name": random.choice(IFOOD_CLIENTS)},
+        "items": [random.choice(IFOOD_ITEMS)]
+    }
+
+
+def food99_payload() -> dict:
+    """Payload de webhook no formato simplificado do 99Food."""
+    return {
+        "order_id": uuid.uuid4().hex,
+        "client_name": random.choice(FOOD99_CLIENTS),
+        "description": random.choice(FOOD99_ITEMS)
+    }
+
+
+def whatsapp_payload() -> dict:
+    """JSON entregue pela IA do WhatsApp."""
+    return dict(random.choice(WHATSAPP_ORDERS))
+
+
+PAYLOAD_FACTORIES = {
+    db.FONTE_IFOOD: ifood_payload,
+    db.FONTE_99FOOD: food99_payload,
+    db.FONTE_WHATSAPP: whatsapp_payload
+}
@@ -0,0 +1,69 @@
+"""
+Saka Delivery KDS - Configuração compartilhada dos testes
+Cada teste que pede `database` roda sobre um banco SQLite próprio e vazio;
+`legacy_database` cria um banco no formato original, antes das migrações
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+# Permite importar os módulos do projeto ao rodar `pytest` da raiz ou de tests/
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import database as db  # noqa: E402
+
+# Pedidos do banco legado: (source, client_name, description, status)
+LEGACY_ORDERS = [
+    ("ifood", "Ana", "1x Açaí 300ml", "novo"),
+    ("99food", "Bruno", "2x Açaí 500ml + Granola", "pronto"),
+    ("whatsapp", "Carla", "1x Cupuaçu 700ml", "saiu"),
+    ("ifood", "Dani", "Açaí (2x )", "cancelado"),
+]
+
+
+@pytest.fixture
+def database(tmp_path: Path) -> Iterator[Path]:
+    """Aponta `database.py` para um arquivo temporário durante o teste."""
+    path = tmp_path / "test.db"
+    with db.use_database(path):
+        db.ensure_schema()
+        yield path
+    db.close_database(path)
+
+
+@pytest.fixture
+def legacy_database(tmp_path: Path) -> Iterator[Path]:
+    """
+    Banco no formato original: sem user_version, datas ISO e só a tabela
+    orders, com `LEGACY_ORDERS`. A primeira operação sobre ele migra o esquema.
+    """
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE orders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT NOT NULL,
+            client_name TEXT NOT NULL,
+            description TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'novo',
+            created_at DATETIME NOT NULL,
+            updated_at DATETIME NOT NULL
+        )
+    """)
+    conn.executemany(
+        "INSERT INTO orders (source, client_name, description, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            (source, client, description, status, f"2024-05-10T19:{minute:02d}:00", f"2024-05-10T20:{minute:02d}:00")
+            for minute, (source, client, description, status) in enumerate(LEGACY_ORDERS)
+        ]
+    )
+    conn.commit()
+    conn.close()
+    yield path
+    db.close_database(path)
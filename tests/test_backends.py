@@ -0,0 +1,138 @@
+"""
+Os três backends de `backends.py` se comportam igual nas operações básicas
+do quadro: ordem de exibição, máquina de estados, contagens, remoção e
+arquivamento.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterator
+
+import pytest
+
+import backends
+import database as db
+
+CORE_FIELDS = ("id", "source", "client_name", "description", "status", "created_at", "updated_at")
+
+
+def open_backend(kind: str, directory: Path) -> backends.OrderBackend:
+    """Backend vazio; o de arquivo grava em `directory`."""
+    return backends.open_backend(kind, directory / f"{kind}.db")
+
+
+@pytest.fixture(params=list(backends.BACKENDS))
+def backend(request, tmp_path: Path) -> Iterator[backends.OrderBackend]:
+    backend = open_backend(request.param, tmp_path)
+    yield backend
+    backend.close()
+
+
+def create_three(backend: backends.OrderBackend) -> list[int]:
+    return [
+        backend.create_order(db.FONTE_IFOOD, "Ana", "1x Açaí 300ml"),
+        backend.create_order(db.FONTE_99FOOD, "Bruno", "2x Açaí 500ml com granola"),
+        backend.create_order(db.FONTE_WHATSAPP, "Carla", "1x Cupuaçu 700ml")
+    ]
+
+
+def check_create_and_get(backend: backends.OrderBackend) -> None:
+    first, second, third = create_three(backend)
+    assert len({first, second, third}) == 3, "IDs repetidos"
+    order = backend.get_order_by_id(second)
+    assert order is not None, "pedido criado não encontrado"
+    assert set(CORE_FIELDS) <= order.keys(), f"campos faltando: {order.keys()}"
+    assert (order["source"], order["client_name"], order["status"]) == (db.FONTE_99FOOD, "Bruno", db.STATUS_NOVO)
+    assert isinstance(order["created_at"], int) and order["created_at"] == order["updated_at"]
+    assert backend.get_order_by_id(third + 1000) is None, "ID inexistente devolveu pedido"
+
+
+def check_board_order(backend: backends.OrderBackend) -> None:
+    first, second, third = create_three(backend)
+    assert backend.update_order_status(third, db.STATUS_PREPARANDO)
+    assert backend.update_order_status(first, db.STATUS_PREPARANDO)
+    assert backend.update_order_status(first, db.STATUS_PRONTO)
+    ids = [order["id"] for order in backend.get_all_orders()]
+    assert ids == [second, third, first], f"ordem do quadro: {ids}"
+
+
+def check_state_machine(backend: backends.OrderBackend) -> None:
+    first, second, _ = create_three(backend)
+    assert not backend.update_order_status(first, db.STATUS_PRONTO), "pulou etapa"
+    assert not backend.update_order_status(first, "inexistente"), "aceitou status inválido"
+    assert not backend.update_order_status(9999, db.STATUS_PREPARANDO), "atualizou pedido inexistente"
+    for status in (db.STATUS_PREPARANDO, db.STATUS_PRONTO, db.STATUS_SAIU):
+        assert backend.update_order_status(first, status), f"recusou {status}"
+    assert not backend.update_order_status(first, db.STATUS_CANCELADO), "cancelou pedido que já saiu"
+    assert backend.update_order_status(second, db.STATUS_CANCELADO)
+    assert not backend.update_order_status(second, db.STATUS_NOVO), "reabriu cancelado"
+    assert backend.get_order_by_id(first)["status"] == db.STATUS_SAIU
+
+
+def check_finished_filter_and_counts(backend: backends.OrderBackend) -> None:
+    first, second, third = create_three(backend)
+    backend.update_order_status(first, db.STATUS_CANCELADO)
+    backend.update_order_status(second, db.STATUS_PREPARANDO)
+    counts = backend.get_orders_count_by_status()
+    assert counts == {db.STATUS_NOVO: 1, db.STATUS_PREPARANDO: 1, db.STATUS_PRONTO: 0}, f"contagens: {counts}"
+    assert [order["id"] for order in backend.get_all_orders()] == [third, second]
+    assert [order["id"] for order in backend.get_all_orders(include_finished=True)] == [third, second, first]
+
+
+def check_delete(backend: backends.OrderBackend) -> None:
+    first, second, _ = create_three(backend)
+    assert backend.delete_order(first)
+    assert not backend.delete_order(first), "removeu duas vezes"
+    assert backend.get_order_by_id(first) is None
+    assert backend.get_orders_count_by_status()[db.STATUS_NOVO] == 2
+    assert backend.create_order(db.FONTE_IFOOD, "Dani", "1x Açaí 300ml") not in (first, second), "reusou ID"
+
+
+def check_clear_old_orders(backend: backends.OrderBackend) -> None:
+    first, second, third = create_three(backend)
+    backend.update_order_status(first, db.STATUS_CANCELADO)
+    for status in (db.STATUS_PREPARANDO, db.STATUS_PRONTO, db.STATUS_SAIU):
+        backend.update_order_status(second, status)
+    
+    assert backend.clear_old_orders(hours=1) == 0, "arquivou pedidos recentes"
+    assert backend.clear_old_orders(hours=0) == 2
+    assert [order["id"] for order in backend.get_all_orders(include_finished=True)] == [third]
+    archived = backend.get_order_by_id(second)
+    assert archived is not None and archived["status"] == db.STATUS_SAIU, "arquivado sumiu"
+    assert not backend.delete_order(second), "removeu pedido do arquivo"
+    assert not backend.update_order_status(first, db.STATUS_NOVO)
+
+
+CHECKS: list[Callable[[backends.OrderBackend], None]] = [
+    check_create_and_get,
+    check_board_order,
+    check_state_machine,
+    check_finished_filter_and_counts,
+    check_delete,
+    check_clear_old_orders
+]
+
+
+@pytest.mark.parametrize("check", CHECKS, ids=lambda check: check.__name__.removeprefix("check_"))
+def test_backend(backend, check):
+    check(backend)
+
+
+def test_backends_in_parallel_threads(tmp_path):
+    """Todas as verificações, 4 vezes, em threads: bancos diferentes no mesmo processo não se misturam."""
+    jobs = [
+        (kind, check, tmp_path / f"{round_}-{check.__name__}")
+        for round_ in range(4) for kind in backends.BACKENDS for check in CHECKS
+    ]
+    
+    def run(job: tuple) -> None:
+        kind, check, directory = job
+        directory.mkdir(exist_ok=True)
+        backend = open_backend(kind, directory)
+        try:
+            check(backend)
+        finally:
+            backend.close()
+    
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(run, jobs))
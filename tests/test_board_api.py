@@ -0,0 +1,126 @@
+"""Rotas da API do quadro (`board_api.BoardAPI`) sobre o servidor de `http_server`."""
+
+import asyncio
+import json
+import threading
+from typing import Optional
+
+import pytest
+
+from conftest import LEGACY_ORDERS
+
+import database as db
+from board_api import BoardAPI
+from http_server import read_headers
+from order_store import OrderStore
+
+
+async def request(
+    port: int,
+    method: str,
+    path: str,
+    headers: Optional[dict] = None,
+    payload: object = None
+) -> tuple[int, dict, Optional[dict]]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    lines = [f"{method} {path} HTTP/1.1", "Connection: close", f"Content-Length: {len(body)}"]
+    lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+    status = int((await reader.readline()).split(b" ", 2)[1])
+    response_headers = await read_headers(reader)
+    content = await reader.readexactly(int(response_headers.get("content-length", 0)))
+    writer.close()
+    return status, response_headers, json.loads(content) if content else None
+
+
+async def first_event(port: int) -> tuple[str, dict]:
+    """Conecta em /events e devolve o tipo e o JSON da primeira mensagem."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET /events HTTP/1.1\r\n\r\n")
+    assert int((await reader.readline()).split(b" ", 2)[1]) == 200
+    await read_headers(reader)
+    
+    fields = {}
+    while "data" not in fields:
+        name, _, value = (await reader.readline()).decode("utf-8").rstrip("\n").partition(": ")
+        if name in ("event", "data"):
+            fields[name] = value
+    writer.close()
+    return fields["event"], json.loads(fields["data"])
+
+
+def run_against_api(scenario) -> object:
+    async def main():
+        api = BoardAPI()
+        port = await api.start("127.0.0.1", 0)
+        try:
+            return await scenario(port)
+        finally:
+            await api.stop()
+    
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize("method, path, allowed", [
+    ("POST", "/transitions", "GET"),
+    ("DELETE", "/health", "GET"),
+    ("POST", "/orders", "GET"),
+    ("POST", "/events", "GET"),
+    ("GET", "/orders/1/status", "POST"),
+])
+def test_wrong_method_is_405(database, method, path, allowed):
+    status, headers, body = run_against_api(lambda port: request(port, method, path))
+    assert status == 405
+    assert headers["allow"] == allowed and "error" in body
+
+
+def test_board_etag_and_transition(database):
+    order_id = db.create_order(db.FONTE_IFOOD, "Ana", "1x Açaí 300ml")
+    
+    async def scenario(port: int) -> None:
+        status, headers, board = await request(port, "GET", "/orders")
+        assert status == 200 and [order["id"] for order in board["orders"]] == [order_id]
+        
+        status, _, body = await request(port, "GET", "/orders", {"If-None-Match": headers["etag"]})
+        assert status == 304 and body is None
+        
+        move = {"from": db.STATUS_NOVO, "to": db.STATUS_PREPARANDO}
+        assert (await request(port, "POST", f"/orders/{order_id}/status", payload=move))[0] == 200
+        status, _, body = await request(port, "POST", f"/orders/{order_id}/status", payload=move)
+        assert status == 409 and body["status"] == db.STATUS_PREPARANDO
+        assert (await request(port, "POST", f"/orders/{order_id}/status", payload={"from": "novo"}))[0] == 422
+    
+    run_against_api(scenario)
+
+
+def test_reads_refresh_the_store_off_the_event_loop(database, monkeypatch):
+    order_id = db.create_order(db.FONTE_IFOOD, "Ana", "1x Açaí 300ml")
+    on_loop = []
+    refresh = OrderStore.refresh
+    
+    def recording_refresh(store: OrderStore, force: bool = False) -> bool:
+        if threading.current_thread() is threading.main_thread():
+            on_loop.append(force)
+        return refresh(store, force)
+    
+    monkeypatch.setattr(OrderStore, "refresh", recording_refresh)
+    
+    async def scenario(port: int) -> list:
+        on_loop.clear()
+        for path in ("/orders", "/orders/counts", "/health", f"/orders/{order_id}"):
+            assert (await request(port, "GET", path))[0] == 200
+        move = {"from": db.STATUS_NOVO, "to": db.STATUS_PREPARANDO}
+        assert (await request(port, "POST", f"/orders/{order_id}/status", payload=move))[0] == 200
+        return on_loop
+    
+    assert run_against_api(scenario) == []
+
+
+def test_subscriber_on_migrated_database_gets_legacy_orders(legacy_database):
+    with db.use_database(legacy_database):
+        event, payload = run_against_api(first_event)
+    
+    active = [name for _, name, _, status in LEGACY_ORDERS if status not in (db.STATUS_SAIU, db.STATUS_CANCELADO)]
+    assert event == "snapshot" and payload["revision"] >= 1
+    assert sorted(order["client_name"] for order in payload["orders"]) == sorted(active)
@@ -0,0 +1,79 @@
+"""Normalização de webhooks e respostas do gateway para payloads malformados."""
+
+import asyncio
+import json
+
+import pytest
+
+import database as db
+from http_server import read_headers
+from ingestion import IngestionGateway, PayloadError, normalize_payload
+
+
+@pytest.mark.parametrize("platform, payload", [
+    (db.FONTE_IFOOD, {"id": "1", "customer": "Ana", "items": ["1x Açaí 300ml"]}),
+    (db.FONTE_IFOOD, {"id": "1", "customer": ["Ana"], "items": ["1x Açaí 300ml"]}),
+    (db.FONTE_IFOOD, {"id": "1", "customer": {"name": "Ana"}, "items": "1x Açaí 300ml"}),
+    (db.FONTE_IFOOD, {"id": "1", "customer": {"name": "Ana"}, "items": [{"name": "Açaí"}]}),
+    (db.FONTE_99FOOD, {"order_id": "1", "client_name": {"first": "Bruno"}, "description": "1x Açaí"}),
+    (db.FONTE_WHATSAPP, {"client": "Carla", "items": ["1x Açaí 300ml"]}),
+    (db.FONTE_WHATSAPP, []),
+])
+def test_malformed_payload_raises_payload_error(platform, payload):
+    with pytest.raises(PayloadError):
+        normalize_payload(platform, payload)
+
+
+def test_normalize_ifood():
+    payload = {"id": "1", "customer": {"name": " Ana "}, "items": ["1x Açaí 300ml", "1x Água"]}
+    assert normalize_payload(db.FONTE_IFOOD, payload) == (db.FONTE_IFOOD, "Ana", "1x Açaí 300ml + 1x Água")
+
+
+async def _request(port: int, method: str, path: str, payload: object = None) -> tuple[int, dict, dict]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+    )
+    status = int((await reader.readline()).split(b" ", 2)[1])
+    headers = await read_headers(reader)
+    response = json.loads(await reader.readexactly(int(headers["content-length"])))
+    writer.close()
+    return status, headers, response
+
+
+def run_against_gateway(scenario) -> object:
+    async def main():
+        gateway = IngestionGateway()
+        port = await gateway.start("127.0.0.1", 0)
+        try:
+            return await scenario(port)
+        finally:
+            await gateway.stop()
+    
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize("method, path, allowed", [
+    ("POST", "/health", "GET"),
+    ("DELETE", "/metrics", "GET"),
+    ("GET", "/webhooks/ifood", "POST"),
+    ("GET", "/webhooks/whatsapp/chat", "POST"),
+])
+def test_wrong_method_is_405(database, method, path, allowed):
+    status, headers, body = run_against_gateway(lambda port: _request(port, method, path))
+    assert status == 405
+    assert headers["allow"] == allowed and "error" in body
+
+
+def test_gateway_answers_422_for_non_object_customer(database):
+    async def scenario(port: int) -> list[tuple[int, dict, dict]]:
+        return [
+            await _request(port, "POST", "/webhooks/ifood", {"customer": "Ana", "items": ["1x Açaí 300ml"]}),
+            await _request(port, "POST", "/webhooks/ifood", {"customer": {"name": "Ana"}, "items": ["1x Açaí 300ml"]})
+        ]
+    
+    (bad_status, _, bad), (ok_status, _, ok) = run_against_gateway(scenario)
+    assert bad_status == 422 and "customer" in bad["error"]
+    assert ok_status == 201
+    assert db.get_order_by_id(ok["order_id"])["client_name"] == "Ana"
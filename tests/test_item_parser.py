@@ -0,0 +1,63 @@
+"""Interpretação das descrições em itens (`item_parser.parse_description`)."""
+
+import pytest
+
+import database as db
+from item_parser import LineItem, format_size, parse_description
+
+
+def test_plain_item():
+    assert parse_description("1x Açaí 500ml") == (LineItem(1, 500, "Açaí", "", ()),)
+    assert parse_description("Cupuaçu 1,5L Zero") == (LineItem(1, 1500, "Cupuaçu", "Zero", ()),)
+    assert parse_description("1x Água de Coco") == (LineItem(1, None, "Água de Coco", "", ()),)
+
+
+def test_toppings_belong_to_previous_item():
+    assert parse_description("2x Açaí 300ml + Morango + Leite em Pó + 1x Água de Coco") == (
+        LineItem(2, 300, "Açaí", "", ("Morango", "Leite em Pó")),
+        LineItem(1, None, "Água de Coco", "", ())
+    )
+
+
+def test_combo_multiplies_inner_quantity():
+    assert parse_description("2x Combo Família (3x Açaí 400ml) + Granola") == (
+        LineItem(6, 400, "Açaí", "Combo Família", ("Granola",)),
+    )
+
+
+def test_parenthesis_with_size_outside_is_a_note():
+    assert parse_description("3x Açaí (2x Copo) 300ml") == (LineItem(3, 300, "Açaí", "(2x Copo)", ()),)
+
+
+@pytest.mark.parametrize("description, product", [
+    ("Açaí (2x )", "Açaí"),
+    ("(2x )", "(2x)"),
+    ("99999999999999999999x Açaí", "99999999999999999999x Açaí"),
+    ("Açaí 999999999999999999999999L", "Açaí 999999999999999999999999L"),
+    ("Açaí " + "9" * 400 + "ml", "Açaí " + "9" * 400 + "ml"),
+    ("9" * 5000 + "x Açaí", "9" * 5000 + "x Açaí"),
+])
+def test_malformed_description_is_one_item(description, product):
+    items = parse_description(description)
+    assert len(items) == 1
+    assert items[0].quantity == 1 and items[0].product == product
+
+
+def test_empty_description_has_no_items():
+    assert parse_description("") == ()
+    assert parse_description(None) == ()
+
+
+def test_format_size():
+    assert [format_size(size) for size in (None, 300, 1000, 1500, 1250)] == ["—", "300ml", "1L", "1.5L", "1250ml"]
+
+
+def test_bulk_insert_with_malformed_description(database):
+    order_ids = db.create_orders_bulk([
+        (db.FONTE_99FOOD, "Ana", "1x Açaí 500ml"),
+        (db.FONTE_99FOOD, "Bob", "Açaí (2x )")
+    ])
+    assert len(order_ids) == 2
+    assert [order["client_name"] for order in db.get_all_orders()] == ["Ana", "Bob"]
+    products = {row["product"] for rows in db.get_prep_summary().values() for row in rows}
+    assert "Açaí" in products
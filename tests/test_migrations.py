@@ -0,0 +1,48 @@
+"""Migrações de esquema sobre bancos no formato original."""
+
+import sqlite3
+
+from conftest import LEGACY_ORDERS
+
+import database as db
+
+
+def test_full_load_returns_every_legacy_order(legacy_database):
+    with db.use_database(legacy_database):
+        delta = db.get_orders_changed_since(0)
+        active = db.get_all_orders()
+    
+    assert delta["revision"] >= 1
+    assert sorted(order["client_name"] for order in delta["changed"]) == sorted(row[1] for row in LEGACY_ORDERS)
+    assert delta["removed"] == []
+    assert {order["id"] for order in active} <= {order["id"] for order in delta["changed"]}
+
+
+def test_repair_of_database_migrated_without_stamps(legacy_database):
+    with db.use_database(legacy_database):
+        db.ensure_schema()
+    db.close_database(legacy_database)
+    
+    # Estado deixado pela migração 2 antiga: pedidos e sync_state na revisão 0
+    conn = sqlite3.connect(legacy_database)
+    conn.execute("UPDATE orders SET revision = 0")
+    conn.execute("UPDATE sync_state SET revision = 0")
+    conn.execute("PRAGMA user_version = 9")
+    conn.commit()
+    conn.close()
+    
+    with db.use_database(legacy_database):
+        delta = db.get_orders_changed_since(0)
+    
+    assert delta["revision"] == 1
+    assert len(delta["changed"]) == len(LEGACY_ORDERS)
+    assert {order["revision"] for order in delta["changed"]} == {1}
+
+
+def test_new_orders_after_upgrade_are_incremental(legacy_database):
+    with db.use_database(legacy_database):
+        before = db.get_orders_changed_since(0)["revision"]
+        order_id = db.create_order(db.FONTE_IFOOD, "Eva", "1x Açaí 300ml")
+        delta = db.get_orders_changed_since(before)
+    
+    assert [order["id"] for order in delta["changed"]] == [order_id]
@@ -0,0 +1,71 @@
+"""Store em memória: sincronização com o banco e leituras do quadro."""
+
+import database as db
+from order_store import OrderStore
+
+
+def test_prune_tombstones_keeps_recent_revisions(database):
+    first, second = db.create_orders_bulk([("ifood", "Ana", "1x Açaí"), ("ifood", "Bruno", "1x Açaí")])
+    db.delete_order(first)
+    since = db.get_orders_changed_since(0)["revision"]
+    db.delete_order(second)
+    
+    assert db.prune_tombstones(keep_revisions=1) == 1
+    assert db.prune_tombstones(keep_revisions=1) == 0
+    
+    delta = db.get_orders_changed_since(since)
+    assert delta["removed"] == [second]
+    assert not delta["reset"]
+
+
+def test_store_behind_pruned_tombstones_reloads(database):
+    store = OrderStore()
+    kept, gone = store.create_orders_bulk([("ifood", "Ana", "1x Açaí"), ("ifood", "Bruno", "1x Açaí")])
+    deltas = []
+    store.add_listener(deltas.append)
+    
+    # Outro processo remove um pedido e a compactação descarta a lápide
+    db.delete_order(gone)
+    db.create_order("whatsapp", "Carla", "1x Cupuaçu")
+    db.prune_tombstones(keep_revisions=0)
+    
+    assert store.refresh(force=True)
+    assert [order["id"] for order in store.get_orders()][:1] == [kept]
+    assert gone not in {order["id"] for order in store.get_orders()}
+    assert deltas[-1]["removed"] == [gone]
+    assert store.get_counts()[db.STATUS_NOVO] == 2
+
+
+def test_store_loads_orders_from_legacy_database(legacy_database):
+    with db.use_database(legacy_database):
+        store = OrderStore()
+        board = store.get_board()
+        expected = db.get_all_orders()
+    
+    assert [order["client_name"] for order in board["orders"]] == ["Ana", "Bruno"]
+    assert board["orders"] == expected
+    assert board["counts"] == {db.STATUS_NOVO: 1, db.STATUS_PREPARANDO: 0, db.STATUS_PRONTO: 1}
+
+
+def test_orders_created_together_keep_id_order(database):
+    store = OrderStore()
+    first, second, third = store.create_orders_bulk([("ifood", name, "1x Açaí") for name in ("Ana", "Bruno", "Carla")])
+    
+    # Mesmo created_at: o desempate é o ID, não a ordem em que mudaram
+    store.update_order_status(third, db.STATUS_PREPARANDO)
+    store.update_order_status(first, db.STATUS_PREPARANDO)
+    
+    assert [order["id"] for order in store.get_orders()] == [second, first, third]
+    assert store.get_orders() == db.get_all_orders()
+
+
+def test_reads_return_copies(database):
+    store = OrderStore()
+    order_id = store.create_order("ifood", "Ana", "1x Açaí")
+    
+    store.get_order(order_id)["status"] = db.STATUS_SAIU
+    store.get_orders()[0]["client_name"] = "Outra"
+    store.get_board()["orders"][0]["description"] = ""
+    
+    assert store.get_order(order_id) == db.get_order_by_id(order_id)
+    assert store.get_counts()[db.STATUS_NOVO] == 1
@@ -0,0 +1,34 @@
+"""
+Nenhuma consulta quente do quadro pode varrer uma tabela sem índice nem,
+fora as agregações (`db.AGGREGATE_HOT_QUERIES`), ordenar em B-tree
+temporária (EXPLAIN QUERY PLAN de `db.explain_hot_queries`).
+"""
+
+import database as db
+
+
+def is_regression(step: str, aggregate: bool = False) -> bool:
+    """Varredura de uma tabela sem índice ou, fora das agregações, ordenação temporária."""
+    full_scan = step.startswith("SCAN ") and " USING " not in step
+    return full_scan or ("TEMP B-TREE" in step and not aggregate)
+
+
+def test_regression_detects_temp_sort_and_full_scan():
+    assert is_regression("USE TEMP B-TREE FOR ORDER BY")
+    assert is_regression("SCAN orders")
+    assert is_regression("SCAN i")
+    assert not is_regression("USE TEMP B-TREE FOR GROUP BY", aggregate=True)
+    assert not is_regression("SCAN orders USING INDEX idx_orders_board")
+    assert not is_regression("SEARCH orders USING INDEX idx_orders_board (status_rank<?)")
+
+
+def test_hot_queries_use_indexes(database):
+    plans = db.explain_hot_queries()
+    assert plans, "nenhuma consulta quente"
+    assert db.AGGREGATE_HOT_QUERIES <= plans.keys()
+    
+    regressions = {
+        name: " | ".join(steps) for name, steps in plans.items()
+        if not steps or any(is_regression(step, name in db.AGGREGATE_HOT_QUERIES) for step in steps)
+    }
+    assert not regressions, f"consultas sem índice: {regressions}"
@@ -0,0 +1,32 @@
+"""Exportação e replay de linhas do tempo (`replay.py`)."""
+
+from conftest import LEGACY_ORDERS
+
+import database as db
+import replay
+
+
+def test_replay_of_migrated_legacy_database(legacy_database, tmp_path):
+    with db.use_database(legacy_database):
+        timeline = replay.export_timeline()
+    
+    # Um "created" por pedido e um único salto para o status atual (novo -> pronto, novo -> saiu, ...)
+    assert [kind for _, kind, _, _ in timeline].count(db.EVENT_CREATED) == len(LEGACY_ORDERS)
+    assert len(timeline) == len(LEGACY_ORDERS) + 3
+    
+    target = tmp_path / "replay.db"
+    with db.use_database(target):
+        result = replay.replay(timeline)
+        statuses = [order["status"] for order in db.get_all_orders(include_finished=True)]
+    db.close_database(target)
+    
+    # novo -> pronto e novo -> saiu são recusados pela máquina de estados; novo -> cancelado não
+    assert result["skipped"] == 2
+    assert sorted(statuses) == ["cancelado", "novo", "novo", "novo"]
+
+
+def test_replay_of_synthetic_night(database):
+    timeline = replay.synthetic_night(orders=20, hours=1, seed=3)
+    result = replay.replay(timeline)
+    assert result["skipped"] == 0
+    assert len(result["order_ids"]) == 20
@@ -0,0 +1,39 @@
+"""Pipeline de extração do WhatsApp: tempo limite e ocupação do pool."""
+
+import threading
+
+import pytest
+
+from whatsapp_pipeline import ExtractionTimeout, WhatsAppPipeline, extract_standin
+
+MESSAGE = "Oi, aqui é a Ana! Pedido: 1x Açaí 500ml"
+
+
+def test_timed_out_call_keeps_its_slot():
+    release = threading.Event()
+    calls = []
+    
+    def extractor(message: str) -> dict:
+        calls.append(message)
+        if len(calls) == 1:
+            release.wait()
+        return extract_standin(message)
+    
+    pipeline = WhatsAppPipeline(extractor=extractor, workers=1, timeout=0.05, retries=0, write=False).start()
+    try:
+        with pytest.raises(ExtractionTimeout):
+            pipeline.submit(MESSAGE).result(timeout=1)
+        assert pipeline.snapshot()["stalled"] == 1
+        
+        # O único slot segue com a chamada presa: a próxima nem chega ao extrator
+        with pytest.raises(ExtractionTimeout, match="ocupado"):
+            pipeline.submit(MESSAGE + " + Granola").result(timeout=1)
+        assert len(calls) == 1
+        
+        release.set()
+        assert pipeline.submit(MESSAGE + " + Morango").result(timeout=1)[1] == "Ana"
+        assert pipeline.snapshot()["stalled"] == 0
+    finally:
+        release.set()
+        pipeline.stop()
+
@@ -0,0 +1,355 @@
+"""
+Saka Delivery KDS - Pipeline de Mensagens do WhatsApp
+Extrai pedidos de conversas em texto livre (etapa da "IA") em um pool
+limitado de threads ou processos, com tempo limite, novas tentativas e
+cache por conteúdo, sem travar o quadro nem as outras plataformas
+"""
+
+import hashlib
+import logging
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable, Optional
+
+import database as db
+import metrics
+
+# Limites do pipeline
+EXTRACT_WORKERS = 4
+EXTRACT_TIMEOUT_SECONDS = 5.0
+EXTRACT_RETRIES = 2
+RETRY_BACKOFF_SECONDS = 0.05  # dobra a cada nova tentativa
+PIPELINE_QUEUE_SIZE = 1_000
+EXTRACT_CACHE_SIZE = 4_096
+
+# Extrator: recebe o texto da conversa e devolve {"client", "items"}
+Extractor = Callable[[str], dict]
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionError(ValueError):
+    """A mensagem não contém um pedido reconhecível (não adianta tentar de novo)."""
+
+
+class ExtractionTimeout(TimeoutError):
+    """O extrator não respondeu dentro do tempo limite em nenhuma tentativa."""
+
+
+# ============================================================================
+# EXTRATOR LOCAL (SUBSTITUTO DETERMINÍSTICO DA IA)
+# ============================================================================
+
+_NAME = r"([A-ZÀ-Ý][a-zà-ÿ]+(?: (?:[A-ZÀ-Ý][a-zà-ÿ]+|d[aeo]s?))*)"
+_CLIENT_PATTERNS = (
+    re.compile(rf"(?i:\baqui é )(?:o |a )?{_NAME}"),
+    re.compile(rf"(?i:\bmeu nome é ){_NAME}"),
+    re.compile(rf"^\s*(?i:nome:)\s*{_NAME}", re.MULTILINE)
+)
+
+# Itens começam na primeira quantidade da linha: "Pedido: 2x Açaí 500ml"
+_ITEMS_LINE = re.compile(r"\b\d+\s*x\s.*$", re.IGNORECASE | re.MULTILINE)
+
+
+def extract_standin(message: str, delay: float = 0.0) -> dict:
+    """
+    Extrai cliente e itens de uma conversa sem chamar a IA.
+    
+    Reconhece os formatos de `simulator.WHATSAPP_CHAT_TEMPLATES`: o nome
+    vem de "aqui é", "meu nome é" ou "Nome:", e os itens são as linhas a
+    partir da primeira quantidade ("2x ..."). Sempre dá o mesmo resultado
+    para o mesmo texto, o que permite testar o pipeline sem rede.
+    
+    Args:
+        message: Texto da conversa
+        delay: Pausa em segundos simulando o tempo de resposta da IA
+    
+    Raises:
+        ExtractionError: Nome do cliente ou itens não encontrados
+    """
+    if delay:
+        time.sleep(delay)
+    
+    client = next((match.group(1) for pattern in _CLIENT_PATTERNS if (match := pattern.search(message))), None)
+    items = [match.group(0).strip() for match in _ITEMS_LINE.finditer(message)]
+    if not client or not items:
+        raise ExtractionError("Mensagem sem nome do cliente ou sem itens")
+    return {"client": client, "items": " + ".join(items)}
+
+
+def to_order(payload: object) -> tuple[str, str, str]:
+    """
+    Valida a saída do extrator e a converte em argumentos de `db.create_order`.
+    
+    Raises:
+        ExtractionError: Saída sem `client` ou `items` em texto
+    """
+    if not isinstance(payload, dict):
+        raise ExtractionError("O extrator deve devolver um objeto JSON")
+    client = payload.get("client")
+    items = payload.get("items")
+    if not isinstance(client, str) or not client.strip() or not isinstance(items, str) or not items.strip():
+        raise ExtractionError("Saída do extrator sem client ou items")
+    return db.FONTE_WHATSAPP, client.strip(), items.strip()
+
+
+def message_key(message: str) -> str:
+    """Chave do cache: hash do texto com espaços normalizados."""
+    return hashlib.sha256(" ".join(message.split()).encode("utf-8")).hexdigest()
+
+
+# ============================================================================
+# PIPELINE (FILA LIMITADA + POOL DE EXTRAÇÃO + GRAVAÇÃO)
+# ============================================================================
+
+class WhatsAppPipeline:
+    """
+    Fila limitada de mensagens processada por `workers` threads.
+    
+    Cada thread tira uma mensagem da fila, consulta o cache por hash do
+    conteúdo e, se preciso, chama o extrator no pool (threads, ou processos
+    com `use_processes=True` para extratores pesados em CPU). Cada chamada
+    tem `timeout` segundos; falhas e estouros são tentados de novo até
+    `retries` vezes, com espera crescente. `ExtractionError` não é repetida.
+    
+    Com `write=True`, o pedido extraído é gravado com `db.create_order` e o
+    Future de `submit` devolve o ID; com `write=False`, devolve a tupla
+    (source, client_name, description) para quem grava em lote (gateway).
+    
+    O pool nunca recebe mais que `workers` chamadas ao mesmo tempo, então
+    nenhuma espera na fila interna dele e o tempo limite conta a partir do
+    início da execução. Uma chamada que estourou o tempo não é interrompida:
+    o pedido é liberado, mas ela segue ocupando seu slot até terminar
+    (`stalled` em `snapshot`). Sem slot livre em `timeout` segundos, a
+    tentativa conta como estouro.
+    """
+    
+    def __init__(
+        self,
+        extractor: Extractor = extract_standin,
+        workers: int = EXTRACT_WORKERS,
+        timeout: float = EXTRACT_TIMEOUT_SECONDS,
+        retries: int = EXTRACT_RETRIES,
+        queue_size: int = PIPELINE_QUEUE_SIZE,
+        cache_size: int = EXTRACT_CACHE_SIZE,
+        use_processes: bool = False,
+        write: bool = True
+    ):
+        if workers < 1:
+            raise ValueError("workers deve ser maior que zero")
+        
+        self.extractor = extractor
+        self.workers = workers
+        self.timeout = timeout
+        self.retries = retries
+        self.cache_size = cache_size
+        self.use_processes = use_processes
+        self.write = write
+        self.stats = {
+            "received": 0, "completed": 0, "failed": 0, "rejected": 0,
+            "cache_hits": 0, "retries": 0, "timeouts": 0, "stalled": 0
+        }
+        self.latency = metrics.RollingHistogram()
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._cache: OrderedDict[str, tuple[str, str, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(workers)
+        self._stalled: set[Future] = set()
+        self._threads: list[threading.Thread] = []
+        self._executor = None
+        self._started_at: Optional[float] = None
+    
+    def start(self) -> "WhatsAppPipeline":
+        """Cria o pool e inicia as threads (daemon), se ainda não estiverem rodando."""
+        if self._threads:
+            return self
+        
+        executor_class = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+        self._executor = executor_class(max_workers=self.workers)
+        self._started_at = time.perf_counter()
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"saka-whatsapp-{index}", daemon=True)
+            for index in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+    
+    def stop(self) -> None:
+        """Processa o que restou na fila, encerra as threads e o pool."""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+    
+    def submit(self, message: str) -> Future:
+        """
+        Enfileira uma mensagem sem esperar a extração.
+        
+        Returns:
+            Future com o ID do pedido gravado (ou a tupla normalizada, se
+            `write=False`). Falhas chegam como ExtractionError,
+            ExtractionTimeout ou a exceção do extrator/banco.
+        
+        Raises:
+            queue.Full: Fila cheia (o chamador deve recusar ou tentar depois)
+        """
+        future: Future = Future()
+        try:
+            self._queue.put_nowait((message, future, time.perf_counter()))
+        except queue.Full:
+            self._count("rejected")
+            raise
+        self._count("received")
+        return future
+    
+    def queue_depth(self) -> int:
+        """Mensagens aguardando uma thread livre."""
+        return self._queue.qsize()
+    
+    def snapshot(self) -> dict:
+        """Contadores, profundidade da fila, vazão e latência (janela deslizante)."""
+        with self._lock:
+            stats = dict(self.stats)
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        window = self.latency.window()
+        return {
+            **stats,
+            "queue_depth": self.queue_depth(),
+            "messages_per_second": stats["completed"] / elapsed if elapsed else 0.0,
+            "latency_p50_ms": window["p50_ms"],
+            "latency_p95_ms": window["p95_ms"],
+            "latency_p99_ms": window["p99_ms"]
+        }
+    
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.stats[name] += amount
+    
+    def _release_slot(self, call: Future) -> None:
+        with self._lock:
+            if call in self._stalled:
+                self._stalled.discard(call)
+                self.stats["stalled"] -= 1
+        self._slots.release()
+    
+    def _mark_stalled(self, call: Future) -> None:
+        """Conta a chamada que estourou o tempo até ela liberar o slot."""
+        with self._lock:
+            if not call.done():
+                self._stalled.add(call)
+                self.stats["stalled"] += 1
+    
+    def _call_extractor(self, message: str) -> Future:
+        """
+        Envia a mensagem ao pool assim que houver slot livre.
+        
+        Raises:
+            ExtractionTimeout: Todos os slots seguem ocupados após `timeout` segundos
+        """
+        if not self._slots.acquire(timeout=self.timeout):
+            raise ExtractionTimeout(f"Pool de extração ocupado por {self.timeout:g}s")
+        try:
+            call = self._executor.submit(self.extractor, message)
+        except BaseException:
+            self._slots.release()
+            raise
+        call.add_done_callback(self._release_slot)
+        return call
+    
+    def _cached(self, key: str) -> Optional[tuple[str, str, str]]:
+        with self._lock:
+            order = self._cache.get(key)
+            if order is not None:
+                self._cache.move_to_end(key)
+                self.stats["cache_hits"] += 1
+            return order
+    
+    def _remember(self, key: str, order: tuple[str, str, str]) -> None:
+        with self._lock:
+            self._cache[key] = order
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+    
+    def extract(self, message: str) -> tuple[str, str, str]:
+        """
+        Extrai o pedido de uma mensagem (cache, pool, tempo limite e novas tentativas).
+        
+        Roda na thread de quem chama; o pipeline usa a partir das suas threads.
+        """
+        key = message_key(message)
+        order = self._cached(key)
+        if order is not None:
+            return order
+        
+        error: Exception = ExtractionTimeout("Extrator não respondeu")
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self._count("retries")
+                time.sleep(RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+            
+            start = time.perf_counter()
+            try:
+                call = self._call_extractor(message)
+                start = time.perf_counter()
+                order = to_order(call.result(timeout=self.timeout))
+            except ExtractionError:
+                raise
+            except ExtractionTimeout as exc:
+                self._count("timeouts")
+                error = exc
+            except FutureTimeoutError:
+                self._count("timeouts")
+                self._mark_stalled(call)
+                error = ExtractionTimeout(f"Extrator não respondeu em {self.timeout:g}s")
+            except Exception as exc:
+                error = exc
+            else:
+                if metrics.is_enabled():
+                    metrics.histogram("whatsapp.extract").record(time.perf_counter() - start)
+                self._remember(key, order)
+                return order
+            
+            if metrics.is_enabled():
+                metrics.histogram("whatsapp.extract").record(time.perf_counter() - start, error=True)
+        
+        raise error
+    
+    def _worker(self) -> None:
+        """Consome a fila até receber o sinal de parada (None)."""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            
+            message, future, enqueued_at = item
+            if not future.set_running_or_notify_cancel():
+                self._queue.task_done()
+                continue
+            
+            failed = False
+            try:
+                order = self.extract(message)
+                future.set_result(db.create_order(*order) if self.write else order)
+            except Exception as exc:
+                failed = True
+                level = logging.DEBUG if isinstance(exc, ExtractionError) else logging.WARNING
+                logger.log(level, "Falha ao processar mensagem do WhatsApp: %s", exc)
+                future.set_exception(exc)
+            finally:
+                seconds = time.perf_counter() - enqueued_at
+                self.latency.record(seconds, error=failed)
+                if metrics.is_enabled():
+                    metrics.histogram("whatsapp.message").record(seconds, error=failed)
+                self._count("failed" if failed else "completed")
+                self._queue.task_done()